@@ -0,0 +1,190 @@
+"""
+Inventory Forecasting
+Projects when each drug runs out from its real dosing rate (frequency, custom
+days and duplicate schedule rows such as Amoxicillin three times a day) and
+when it should be reordered.
+
+Forecasts are cached per user and patched one drug at a time on every
+dispense, so /api/inventory is a dictionary lookup; a nightly pass rebuilds
+everything so dates roll forward even for users who never open the app.
+"""
+
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from config import Config
+from monitoring.log import get_logger
+
+log = get_logger(__name__)
+
+StockRow = namedtuple('StockRow', 'med_id user_id patient_id patient name dosage stock max_stock '
+                                  'frequency days last_taken instructions')
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def drug_key(row):
+    """Rows for the same patient, drug and strength share one supply forecast"""
+    return (row.patient_id, row.name.strip().lower(), (row.dosage or '').strip().lower())
+
+
+def doses_per_day(row):
+    if row.frequency == "Daily":
+        return 1.0
+    return sum(1 for day in WEEKDAYS if row.days and day in row.days) / 7.0
+
+
+def empty_date(row, today, horizon):
+    """First scheduled day this row has no pill left for, or None past the horizon"""
+    taken_today = row.last_taken == today.isoformat()
+    if row.frequency == "Daily":
+        offset = row.stock + (1 if taken_today else 0)
+        return today + timedelta(days=offset) if offset <= horizon else None
+    weekdays = {i for i, name in enumerate(WEEKDAYS) if row.days and name in row.days}
+    remaining = row.stock
+    for offset in range(horizon + 1):
+        day = today + timedelta(days=offset)
+        if offset == 0 and taken_today:
+            continue  # Today's dose is already out of the drawer
+        if day.weekday() in weekdays:
+            if remaining <= 0:
+                return day
+            remaining -= 1
+    return None
+
+
+def forecast_drug(rows, today, lead_days, critical_days, horizon):
+    empties = [d for d in (empty_date(row, today, horizon) for row in rows) if d is not None]
+    empty_on = min(empties) if empties else None
+    days_left = (empty_on - today).days if empty_on else None
+    if days_left is not None and days_left <= critical_days:
+        status = 'low'
+    elif days_left is not None and days_left <= lead_days:
+        status = 'warning'
+    else:
+        status = 'ok'
+    return {
+        'daily_rate': round(sum(doses_per_day(row) for row in rows), 3),
+        'days_until_empty': days_left,
+        'empty_on': empty_on.isoformat() if empty_on else None,
+        'reorder_on': max(today, empty_on - timedelta(days=lead_days)).isoformat() if empty_on else None,
+        'status': status,
+    }
+
+
+class InventoryForecaster:
+    def __init__(self, load_rows, lead_days=Config.REORDER_LEAD_DAYS,
+                 critical_days=Config.STOCK_CRITICAL_DAYS, horizon=Config.FORECAST_HORIZON_DAYS):
+        """
+        Args:
+            load_rows (callable): (user_id=None) -> [StockRow], all users when None
+            lead_days (int): Days of supply needed to cover a reorder
+            critical_days (int): At or below this many days the drug is 'low'
+            horizon (int): Days looked ahead; longer supplies report None
+        """
+        self.load_rows = load_rows
+        self.lead_days = lead_days
+        self.critical_days = critical_days
+        self.horizon = horizon
+        self.rows = {}  # user_id -> {med_id: StockRow}
+        self.forecasts = {}  # user_id -> {drug_key: forecast}
+        self.built_on = {}  # user_id -> date the forecasts are relative to
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.nightly_hooks = []  # Housekeeping callables run after each nightly rebuild
+
+    def _forecast(self, rows, today):
+        return forecast_drug(rows, today, self.lead_days, self.critical_days, self.horizon)
+
+    def _build(self, user_id, rows, today):
+        rows = {row.med_id: row for row in rows}
+        groups = {}
+        for row in rows.values():
+            groups.setdefault(drug_key(row), []).append(row)
+        forecasts = {key: self._forecast(group, today) for key, group in groups.items()}
+        with self.lock:
+            self.rows[user_id] = rows
+            self.forecasts[user_id] = forecasts
+            self.built_on[user_id] = today
+
+    def for_user(self, user_id):
+        """[(StockRow, forecast)] in medication order; builds the user's cache if stale"""
+        today = date.today()
+        with self.lock:
+            fresh = self.built_on.get(user_id) == today
+        if not fresh:
+            self._build(user_id, self.load_rows(user_id), today)
+        with self.lock:
+            forecasts = self.forecasts[user_id]
+            return [(row, forecasts[drug_key(row)]) for _, row in sorted(self.rows[user_id].items())]
+
+    def update_stock(self, user_id, med_id, stock, last_taken):
+        """Dispense/undo hook: re-projects only the drug that changed"""
+        with self.lock:
+            rows = self.rows.get(user_id)
+            if rows is None or med_id not in rows:
+                return False
+            rows[med_id] = rows[med_id]._replace(stock=stock, last_taken=last_taken)
+            key = drug_key(rows[med_id])
+            group = [row for row in rows.values() if drug_key(row) == key]
+            self.forecasts[user_id][key] = self._forecast(group, self.built_on[user_id])
+        return True
+
+    def invalidate(self, user_id):
+        """Schedule edits: rebuild lazily on the next read"""
+        with self.lock:
+            self.built_on.pop(user_id, None)
+
+    def rebuild_all(self):
+        """Recompute every user's forecasts from one query"""
+        today = date.today()
+        by_user = {}
+        for row in self.load_rows():
+            by_user.setdefault(row.user_id, []).append(row)
+        for user_id, rows in by_user.items():
+            self._build(user_id, rows, today)
+        with self.lock:
+            for user_id in set(self.rows) - set(by_user):
+                del self.rows[user_id], self.forecasts[user_id], self.built_on[user_id]
+        return len(by_user)
+
+    def low_stock(self):
+        """(user_id, forecast) for every drug that is 'low' or due for reorder"""
+        with self.lock:
+            return [(user_id, dict(forecast)) for user_id, forecasts in self.forecasts.items()
+                    for forecast in forecasts.values() if forecast['status'] != 'ok']
+
+    # ---------- nightly batch ----------
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='forecast-nightly', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            # Short waits so a suspended laptop or clock change can't skip a night
+            if self.stop_event.wait(min((midnight - now).total_seconds() + 1, 3600)):
+                return
+            if datetime.now().date() != now.date():
+                try:
+                    users = self.rebuild_all()
+                    log.info("Nightly forecast rebuilt", users=users, flagged=len(self.low_stock()))
+                except Exception as e:
+                    log.error("Nightly forecast failed", error=e)
+                for hook in self.nightly_hooks:
+                    try:
+                        hook()
+                    except Exception as e:
+                        log.error("Nightly hook failed", hook=getattr(hook, '__name__', repr(hook)), error=e)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
@@ -1,27 +1,65 @@
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import hashlib
+import threading
 import time
+import uuid
 import smtplib
+from functools import wraps
 from email.mime.text import MIMEText
 from dotenv import load_dotenv 
 
-from flask import Flask, render_template, redirect, url_for, request, jsonify, flash
+from flask import Flask, render_template, redirect, url_for, request, jsonify, flash, g, Response, send_file, session, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, update, select, delete, func, or_, case, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
 import google.generativeai as genai
 
+from config import Config
+from analytics.forecast import InventoryForecaster, StockRow
+from database.bulk_import import SetupImportError, parse_csv, parse_json, diff_plan, new_med_row
+from database.backup import BackupService, list_snapshots
+from database.db_manager import DatabaseManager
+from database.engine import get_engine
+from database.migrations import migrate
+from database.sharding import DIRECTORY_TABLES, ShardRouter, check_site, current_site, use_site
+from extensions.admission import Admission
+from extensions.encoding import MSGPACK, Encoding, Table, preferred_format, respond
+from extensions.assets import Assets
+from extensions.identity import SESSION_KEY, IdentityCache, MedicationView, PatientView, session_claims
+from assistant.executor import AIExecutor, AIUnavailable, CircuitBreaker
+from assistant.intent import engine_for, tokenize
+from fleet import dispatcher
+from fleet.registry import FleetRegistry
+from fleet.telemetry import TelemetryIngestor
+from hardware.recorder import ClipRecorder
+from hardware.sources import SerialLogReplaySource
+from navigation.hpa import check_map, planner_for
+from workers.pool import Backpressure, get_pool
+from monitoring import metrics
+from monitoring.alerts import BUS as alert_bus
+from monitoring.profiler import RollingProfiler, profile_for, to_collapsed
+from monitoring.log import configure_logging, get_logger, request_id_var
+from scheduling.reminders import Dose, ReminderScheduler
+
 # ==================== LOAD ENV VARIABLES ====================
 load_dotenv() 
+configure_logging()
+log = get_logger(__name__)
 
 # ==================== CONFIGURATION ====================
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default-secret-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'database', 'medical_robot.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = Config.DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # --- EMAIL CONFIGURATION (For SOS Alerts) ---
@@ -31,10 +69,45 @@ SENDER_EMAIL = os.getenv('MAIL_USERNAME', 'your-project-email@gmail.com')
 SENDER_PASSWORD = os.getenv('MAIL_PASSWORD', 'your-app-password') 
 CAREGIVER_EMAIL = "caregiver-email@example.com" 
 
-db = SQLAlchemy(app)
+class SharedEngineSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy on the same engine (and pool, and write lock) as DatabaseManager"""
+
+    def _make_engine(self, bind_key, options, app):
+        return get_engine(options['url'])
+
+
+class TenantSession(Session):
+    """Sends tenant tables to the active site's shard (see database.sharding); accounts stay in the main database"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        site = active_site() if bind is None and mapper is not None else None
+        if site is not None and sa_inspect(mapper).local_table.name not in DIRECTORY_TABLES:
+            leased = self.info.setdefault('leased_sites', set())
+            if site in leased: return shards.engine_for(site)
+            leased.add(site)
+            return shards.acquire(site)  # Pinned until the transaction ends, so the LRU can't close it under us
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(TenantSession, 'after_transaction_end')
+def _release_site_leases(session_, transaction):
+    if transaction.parent is not None: return
+    for site in session_.info.pop('leased_sites', ()):
+        shards.release(site)
+
+
+db = SharedEngineSQLAlchemy(app, session_options={'class_': TenantSession})
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+assets = Assets(app)
+encoding = Encoding(app)
+# Anything unlisted: reads are polls, other methods writes
+admission = Admission(app, routes={
+    'handle_request': 'emergency',
+    'toggle_task': 'dispense', 'dispatch_doses': 'dispense', 'complete_trip': 'dispense',
+    'video_feed': 'stream', 'robot_video': 'stream', 'get_clip': 'stream',
+})
 
 CORS(app)
 
@@ -52,25 +125,32 @@ if GOOGLE_API_KEY and "PASTE_YOUR_KEY_HERE" not in GOOGLE_API_KEY:
             if 'generateContent' in m.supported_generation_methods:
                 model = genai.GenerativeModel(m.name)
                 AI_AVAILABLE = True
-                print(f"✅ AI Connected: {m.name}")
+                log.info("AI connected", model=m.name)
                 break
     except Exception as e:
-        print(f"❌ AI Connection Failed: {e}")
+        log.error("AI connection failed", error=e)
 else:
-    print("⚠️  Google API Key not found or invalid in .env file.")
+    log.warning("Google API key not found or invalid in .env file")
+
+# Remote calls go through a bounded pool so a slow upstream can't pin request threads
+ai_executor = AIExecutor(
+    lambda prompt: model.generate_content(prompt).text,
+    max_concurrency=Config.AI_MAX_CONCURRENCY, timeout=Config.AI_TIMEOUT,
+    breaker=CircuitBreaker(Config.AI_BREAKER_FAILURES, Config.AI_BREAKER_RESET))
 
 # ==================== DATABASE MODELS ====================
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(150), nullable=False)
+    site = db.Column(db.String(64))  # Care site whose shard holds this user's data (when sharding is on)
     patients = db.relationship('Patient', backref='caregiver', lazy=True)
 
 class Patient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    medications = db.relationship('Medication', backref='patient', lazy=True)
+    medications = db.relationship('Medication', backref='patient', lazy=True, cascade='all, delete-orphan')
 
 class Medication(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -100,11 +180,276 @@ class UserMap(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     grid_data = db.Column(db.Text, nullable=False)
 
+class RobotMap(db.Model):
+    """Per-robot floor plan; UserMap stays the default for robot-less requests"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    robot_id = db.Column(db.Integer, nullable=False)
+    grid_data = db.Column(db.Text, nullable=False)
+    __table_args__ = (db.UniqueConstraint('user_id', 'robot_id'),)
+
+class IdempotencyKey(db.Model):
+    """Remembers the response of a write so client retries replay it instead of re-applying"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    response = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (db.UniqueConstraint('user_id', 'key'),)
+
+class DoseEvent(db.Model):
+    """Append-only ledger: one row per dose taken or undone"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medication.id'), nullable=False, index=True)
+    scheduled_slot = db.Column(db.String(16), nullable=False)  # 'YYYY-MM-DD HH:MM'
+    taken_at = db.Column(db.DateTime, default=datetime.now)
+    source = db.Column(db.String(20), default='dashboard')  # dashboard, voice, api
+    kind = db.Column(db.String(10), default='taken')  # taken, undone
+
+class DailyAdherence(db.Model):
+    """Per-user daily rollup maintained incrementally from DoseEvent writes"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.String(10), nullable=False)  # 'YYYY-MM-DD'
+    scheduled = db.Column(db.Integer, default=0)
+    taken = db.Column(db.Integer, default=0)
+    __table_args__ = (db.UniqueConstraint('user_id', 'day'),)
+
+class ChangeLog(db.Model):
+    """Per-user change feed behind /api/sync (dose events and logs are append-only and synced by id)"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    entity = db.Column(db.String(20), nullable=False)  # medication
+    entity_id = db.Column(db.Integer)  # None for 'reset'
+    op = db.Column(db.String(10), nullable=False)  # upsert, delete, reset (resend every row)
+    changed_at = db.Column(db.DateTime, default=datetime.now)
+
+# ==================== SITES ====================
+shards = ShardRouter(get_engine(), db.metadata) if Config.SHARDING_ENABLED else None
+
+def active_site():
+    """Site whose shard tenant queries go to right now; None means the main database"""
+    if shards is None: return None
+    site = current_site.get()
+    if site is None and has_app_context(): site = g.get('site')
+    return site
+
+def site_of(user):
+    return user.site or Config.DEFAULT_SITE
+
+def sites_for(user_id=None):
+    """Sites to query for one user's rows (every shard when None); [None] without sharding"""
+    if shards is None: return [None]
+    if user_id is None: return shards.sites()
+    identity = identities.identity(user_id)
+    return [site_of(identity)] if identity else []
+
+# ==================== IDENTITY ====================
+def load_identity_claims(user_id):
+    """Session claims straight from the User table (cache miss path)"""
+    user = db.session.get(User, user_id)
+    return session_claims(user) if user else None
+
+def load_identity_patients(user_id):
+    """The user's patients and medications as detached tuples, in two queries"""
+    patients = db.session.execute(select(Patient.id, Patient.name).where(Patient.user_id == user_id).order_by(Patient.id)).all()
+    meds = {}
+    fields = MedicationView._fields
+    for row in db.session.execute(select(*[getattr(Medication, f) for f in fields])
+                                  .where(Medication.patient_id.in_([p.id for p in patients])).order_by(Medication.id)):
+        meds.setdefault(row.patient_id, []).append(MedicationView(*row))
+    return [PatientView(p.id, p.name, tuple(meds.get(p.id, ()))) for p in patients]
+
+identities = IdentityCache(load_identity_claims, load_identity_patients)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    identity = identities.identity(int(user_id), session.get(SESSION_KEY))
+    if identity is not None and shards is not None: g.site = site_of(identity)
+    return identity
+
+def remember_identity(user):
+    login_user(user)
+    if shards is not None: g.site = site_of(user)
+    session[SESSION_KEY] = session_claims(user)
+
+def mark_identity_stale(user_id):
+    """Queue a cache invalidation for when the current transaction commits"""
+    db.session.info.setdefault('stale_identities', set()).add(user_id)
+
+def on_commit(callback, *args):
+    """Queue callback(*args) for when the current transaction commits; a rollback drops it"""
+    db.session.info.setdefault('on_commit', []).append((callback, args))
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stale_identities(session_):
+    for user_id in session_.info.pop('stale_identities', ()):
+        identities.invalidate(user_id)
+    # Callbacks may query, which the committed transaction no longer allows; they run once it has ended
+    session_.info['committed'] = session_.info.pop('on_commit', [])
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _run_on_commit(session_, transaction):
+    if transaction.parent is not None: return
+    for callback, args in session_.info.pop('committed', ()):
+        try: callback(*args)
+        except Exception as e: log.error("After-commit callback failed", callback=callback.__name__, error=e)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_stale_identities(session_):
+    session_.info.pop('stale_identities', None)
+    session_.info.pop('on_commit', None)
+
+# ==================== FLEET ====================
+_fleet = None
+dispatch_lock = threading.Lock()
+
+def get_fleet():
+    """Fleet registry backed by DatabaseManager, created on first use"""
+    global _fleet
+    if _fleet is None:
+        _fleet = FleetRegistry(DatabaseManager())
+    return _fleet
+
+_telemetry = None
+
+def get_telemetry():
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = TelemetryIngestor(get_fleet())
+    return _telemetry
+
+# ==================== VITALS ====================
+_vitals = None
+
+def get_vitals():
+    """HC-05 reader (simulated, or replaying Config.VITALS_REPLAY), created on first use"""
+    global _vitals
+    if _vitals is None:
+        from hardware.bluetooth_hc05 import BluetoothManager
+        source = SerialLogReplaySource(Config.VITALS_REPLAY, speed=Config.REPLAY_SPEED) if Config.VITALS_REPLAY else None
+        _vitals = BluetoothManager(source=source)
+        _vitals.subscribe(store_vitals)
+    return _vitals
+
+def store_vitals(vitals):
+    """Persists each reading for the history chart; out-of-range fields of that reading raise an alert"""
+    alert = get_fleet().db.log_vitals(vitals.get('heart_rate'), vitals.get('spo2'), vitals.get('temperature'))
+    if alert:
+        alert_bus.publish('vitals_alert', **{field: vitals[field] for field in ('heart_rate', 'spo2', 'temperature')
+                                             if vitals.get(field) is not None})
+
+# ==================== BACKUPS ====================
+_backups = None
+
+def backup_sources():
+    """Every SQLite file holding app data: the main database and each site's shard"""
+    with app.app_context():
+        main_path = db.engine.url.database
+    sources = {}
+    if main_path and main_path != ':memory:':
+        sources[os.path.splitext(os.path.basename(main_path))[0]] = main_path
+    if shards is not None:
+        for site in shards.sites():
+            sources[f'shard-{site}'] = shards.path_for(site)
+    return sources
+
+def get_backups():
+    """Periodic online snapshots, created on first use"""
+    global _backups
+    if _backups is None:
+        _backups = BackupService(backup_sources)
+    return _backups
+
+# ==================== CLIPS ====================
+_recorder = None
+
+def get_recorder():
+    """Event clip recorder fed by robot #1's camera, created on first use"""
+    global _recorder
+    if _recorder is None:
+        _recorder = ClipRecorder()
+    return _recorder
+
+def record_alert_clip(alert):
+    get_recorder().trigger(alert['kind'], **{k: v for k, v in alert.items() if k not in ('id', 'kind', 'ts')})
+
+# ==================== REMINDERS ====================
+def load_reminder_doses(user_id=None):
+    """Scheduled medications as Dose tuples (uses the caller's app context)"""
+    doses = []
+    for site in sites_for(user_id):
+        with use_site(site):
+            query = db.session.query(Medication, Patient).join(Patient)
+            if user_id is not None:
+                query = query.filter(Patient.user_id == user_id)
+            doses += [Dose(med.id, patient.user_id, patient.name, med.name, med.schedule_time, med.frequency, med.days)
+                      for med, patient in query]
+    return doses
+
+def reminder_dose_taken(med_id, day_str):
+    with app.app_context():
+        for site in sites_for():
+            with use_site(site):
+                med = db.session.get(Medication, med_id)
+            if med is not None:
+                return med.last_taken == day_str
+        return None
+
+reminders = ReminderScheduler(
+    load_reminder_doses, reminder_dose_taken, alert_bus, state_path=Config.REMINDER_STATE_PATH,
+    escalate_after=Config.REMINDER_ESCALATE_AFTER * 60, missed_after=Config.REMINDER_MISSED_AFTER * 60,
+    water_interval=Config.WATER_REMINDER_INTERVAL * 3600)
+
+def record_missed_dose(alert):
+    """Missed doses show up in the activity log next to dispenses"""
+    with app.app_context(), use_site(next(iter(sites_for(alert['user_id'])), None)):
+        db.session.add(ActivityLog(user_id=alert['user_id'], action=f"Missed {alert['medication']}",
+                                   details=f"{alert['patient']} - scheduled {alert['slot']}"))
+        db.session.commit()
+
+# ==================== FORECASTING ====================
+def load_stock_rows(user_id=None):
+    """Medications as StockRow tuples for the forecaster (own app context)"""
+    rows = []
+    with app.app_context():
+        for site in sites_for(user_id):
+            with use_site(site):
+                query = db.session.query(Medication, Patient).join(Patient)
+                if user_id is not None:
+                    query = query.filter(Patient.user_id == user_id)
+                rows += [StockRow(med.id, patient.user_id, patient.id, patient.name, med.name, med.dosage, med.stock,
+                                  med.max_stock, med.frequency, med.days, med.last_taken, med.instructions)
+                         for med, patient in query]
+    return rows
+
+forecaster = InventoryForecaster(load_stock_rows)
+
+alert_bus.subscribe(lambda alert: log.info("Alert", **alert))
+alert_bus.subscribe(record_missed_dose, kinds={'dose_missed'})
+alert_bus.subscribe(record_alert_clip, kinds={'vitals_alert', 'fall_suspected'})
 
 # ==================== HELPER FUNCTIONS ====================
+def admin_required(view):
+    """Restricts a view to usernames listed in Config.ADMIN_USERS"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.username not in Config.ADMIN_USERS:
+            return jsonify({'success': False, 'message': 'Admin only'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def robot_or_login_required(view):
+    """Lets robots authenticate with the X-Robot-Token shared secret instead of a session"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Robot-Token')
+        if Config.ROBOT_TOKEN and token == Config.ROBOT_TOKEN: return view(*args, **kwargs)
+        if not current_user.is_authenticated: return login_manager.unauthorized()
+        return view(*args, **kwargs)
+    return wrapper
+
 def get_user_context():
     if not current_user.is_authenticated: return "No user logged in."
     context = []
@@ -115,11 +460,70 @@ def get_user_context():
         context.append(p_info)
     return "\n\n".join(context)
 
+def is_due_on(med, day):
+    """Same rule get_schedule uses: daily meds, or custom days like 'Mon,Wed'"""
+    return (med.frequency == "Daily") or bool(med.days and day.strftime("%a") in med.days)
+
+def count_scheduled_doses(user_id, day):
+    meds = Medication.query.join(Patient).filter(Patient.user_id == user_id).all()
+    return sum(1 for med in meds if is_due_on(med, day))
+
+def ensure_daily_rollup(user_id, day_str):
+    """Creates the day's adherence row if missing (race-safe via INSERT OR IGNORE)"""
+    day = datetime.strptime(day_str, "%Y-%m-%d")
+    db.session.execute(sqlite_insert(DailyAdherence).values(
+        user_id=user_id, day=day_str, scheduled=count_scheduled_doses(user_id, day), taken=0
+    ).on_conflict_do_nothing())
+
+def open_daily_rollups(now=None):
+    """
+    Nightly, just after midnight: today's adherence row for every user with
+    patients, so the day is tracked even if nothing is dispensed and the
+    stats GET never has to write.
+    """
+    day = now or datetime.now()
+    day_str = day.strftime("%Y-%m-%d")
+    with app.app_context():
+        for site in sites_for():
+            with use_site(site):
+                for user_id in db.session.execute(select(Patient.user_id).distinct()).scalars():
+                    ensure_daily_rollup(user_id, day_str)
+                db.session.commit()
+
+forecaster.nightly_hooks.append(open_daily_rollups)
+
+def bump_adherence(user_id, day_str, delta):
+    ensure_daily_rollup(user_id, day_str)
+    db.session.execute(
+        update(DailyAdherence)
+        .where(DailyAdherence.user_id == user_id, DailyAdherence.day == day_str)
+        .values(taken=DailyAdherence.taken + delta)
+        .execution_options(synchronize_session=False))
+
+def record_change(user_id, entity, entity_id=None, op='upsert'):
+    """Adds a /api/sync change row to the current transaction"""
+    db.session.add(ChangeLog(user_id=user_id, entity=entity, entity_id=entity_id, op=op))
+
+def refresh_scheduled_count(user_id):
+    """Call after medications change so today's denominator stays accurate"""
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    ensure_daily_rollup(user_id, today_str)
+    db.session.execute(
+        update(DailyAdherence)
+        .where(DailyAdherence.user_id == user_id, DailyAdherence.day == today_str)
+        .values(scheduled=count_scheduled_doses(user_id, datetime.now()))
+        .execution_options(synchronize_session=False))
+    # Every schedule edit funnels through here, so it also re-syncs the reminder heap, once the edit is committed
+    if reminders.running:
+        on_commit(reminders.reload_user, user_id)
+    on_commit(forecaster.invalidate, user_id)
+    mark_identity_stale(user_id)
+
 def send_emergency_email(user_name, details):
     """Sends a real email alert using SMTP"""
     try:
         if SENDER_EMAIL == 'your-project-email@gmail.com': 
-            print(">> EMAIL SIMULATION: Config not set. Skipping actual send.")
+            log.warning("Email simulation: SMTP config not set, skipping send", user=user_name)
             return False
 
         msg = MIMEText(f"URGENT ALERT: {user_name} has triggered an emergency.\n\nDetails: {details}\nTime: {datetime.now()}")
@@ -132,12 +536,114 @@ def send_emergency_email(user_name, details):
             server.login(SENDER_EMAIL, SENDER_PASSWORD)
             server.sendmail(SENDER_EMAIL, [CAREGIVER_EMAIL], msg.as_string())
         
-        print(">> EMAIL SENT SUCCESSFULLY")
+        log.info("Emergency email sent", user=user_name, to=CAREGIVER_EMAIL)
         return True
     except Exception as e:
-        print(f"!! Email Failed: {e}")
+        log.error("Emergency email failed", user=user_name, error=e)
         return False
 
+# ==================== INSTRUMENTATION ====================
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    metrics.record_db_query('sqlalchemy', time.perf_counter() - started)
+
+@event.listens_for(Engine, 'handle_error')
+def _failed_cursor_execute(context):
+    # after_cursor_execute never fires for a failed statement; drop its start so the stack stays paired
+    conn = context.connection
+    if conn is None: return
+    started = conn.info.get('query_started')
+    if started: metrics.record_db_query('sqlalchemy', time.perf_counter() - started.pop())
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+    request_id_var.set(g.request_id)
+    metrics.begin_request_stats()
+    metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def finish_request_metrics(response):
+    if 'request_started' not in g: return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    db_stats = metrics.end_request_stats()
+    metrics.HTTP_REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    metrics.HTTP_REQUEST_DB_QUERIES.observe(db_stats['queries'], route=route)
+    response.headers['X-Request-ID'] = g.request_id
+    log.info("request", method=request.method, route=route, status=response.status_code,
+             duration_ms=round(elapsed * 1000, 2), db_queries=db_stats['queries'],
+             db_ms=round(db_stats['seconds'] * 1000, 2))
+    return response
+
+@app.teardown_request
+def release_request_metrics(exc):
+    if 'request_started' in g:
+        metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+    request_id_var.set('-')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# ==================== SHARDS (ADMIN) ====================
+@app.route('/admin/shards')
+@login_required
+@admin_required
+def shard_overview():
+    """Open shards and per-site row counts, read from every shard in parallel"""
+    if shards is None: return jsonify({'enabled': False})
+    counts = shards.query_all("SELECT (SELECT COUNT(*) FROM patient) AS patients, "
+                              "(SELECT COUNT(*) FROM medication) AS medications, "
+                              "(SELECT COUNT(*) FROM activity_log) AS log_rows")
+    return jsonify({'enabled': True, **shards.stats(), 'counts': counts})
+
+# ==================== BACKUPS (ADMIN) ====================
+@app.route('/admin/backups', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def backup_overview():
+    """Snapshots on disk; POST takes one of every database now"""
+    if request.method == 'POST':
+        return jsonify({'success': True, 'snapshots': get_backups().run_now()})
+    return jsonify({'snapshots': [{'name': name, 'taken_at': taken_at.isoformat(), 'path': path}
+                                  for name, taken_at, path in list_snapshots()]})
+
+# ==================== PROFILING (ADMIN) ====================
+rolling_profiler = RollingProfiler(interval=Config.PROFILER_INTERVAL, window_seconds=Config.PROFILER_WINDOW)
+
+def collapsed_response(counts, label):
+    filename = f"profile-{label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    return Response(to_collapsed(counts), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/profile')
+@login_required
+@admin_required
+def capture_profile():
+    """Samples every thread for ?seconds=N and returns collapsed stacks"""
+    # Unparseable values fall back to the defaults; the bounds come first so nan can't slip through a comparison
+    seconds = max(0.1, min(Config.PROFILER_MAX_SECONDS, request.args.get('seconds', 10, type=float)))
+    interval = min(1000, max(1, request.args.get('interval_ms', 5, type=float))) / 1000
+    log.info("Profile capture started", seconds=seconds, user=current_user.username)
+    return collapsed_response(profile_for(seconds, interval), 'capture')
+
+@app.route('/admin/profile/rolling')
+@login_required
+@admin_required
+def rolling_profile():
+    """Returns the always-on profiler's last ?seconds=N window"""
+    if not rolling_profiler.running:
+        return jsonify({'success': False, 'message': 'Always-on profiler disabled (set PROFILER_ALWAYS_ON=1)'}), 404
+    seconds = request.args.get('seconds', type=int)
+    return collapsed_response(rolling_profiler.snapshot(seconds), 'rolling')
+
 # ==================== ROUTES ====================
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -151,7 +657,7 @@ def login():
         if not check_password_hash(user.password, password):
             flash('Incorrect password.', 'error')
             return redirect(url_for('login'))
-        login_user(user)
+        remember_identity(user)
         if not user.patients: return redirect(url_for('setup'))
         return redirect(url_for('index'))
     return render_template('login.html')
@@ -163,40 +669,116 @@ def register():
         password = request.form.get('password')
         if User.query.filter_by(username=username).first():
             flash('Username exists'); return redirect(url_for('register'))
-        new_user = User(username=username, password=generate_password_hash(password, method='pbkdf2:sha256'))
+        try:
+            site = check_site(request.form.get('site') or Config.DEFAULT_SITE)
+        except ValueError:
+            flash('Invalid site name'); return redirect(url_for('register'))
+        new_user = User(username=username, password=generate_password_hash(password, method='pbkdf2:sha256'), site=site)
         db.session.add(new_user)
         db.session.commit()
-        login_user(new_user)
+        remember_identity(new_user)
         return redirect(url_for('setup'))
     return render_template('register.html')
 
 @app.route('/logout')
 @login_required
-def logout(): logout_user(); return redirect(url_for('login'))
+def logout(): logout_user(); session.pop(SESSION_KEY, None); session.pop(VOICE_PENDING, None); return redirect(url_for('login'))
+
+def delete_patients(patient_ids):
+    """Query-level deletes skip ORM cascades, so remove medications explicitly"""
+    if not patient_ids: return
+    Medication.query.filter(Medication.patient_id.in_(patient_ids)).delete(synchronize_session=False)
+    Patient.query.filter(Patient.id.in_(patient_ids)).delete(synchronize_session=False)
+
+def insert_patients(user_id, patient_names):
+    """Bulk-inserts patients and returns their new ids in the same order"""
+    rows = [{'name': name, 'user_id': user_id} for name in patient_names]
+    db.session.bulk_insert_mappings(Patient, rows, return_defaults=True)
+    return [row['id'] for row in rows]
+
+def import_setup(user_id, patients, mode='replace'):
+    """
+    Applies a parsed roster in a single transaction.
+
+    Args:
+        patients (list): Output of parse_json / parse_csv
+        mode (str): 'replace' wipes the user's roster first, 'diff' only
+                    applies additions, changes and removals
+    """
+    existing_patients = Patient.query.filter_by(user_id=user_id).all()
+    patient_ids = {}
+    duplicate_ids = []  # diff mode matches by name, so same-named extras are dropped
+    for p in existing_patients:
+        if p.name in patient_ids: duplicate_ids.append(p.id)
+        else: patient_ids[p.name] = p.id
+
+    if mode == 'replace':
+        delete_patients([p.id for p in existing_patients])
+        new_ids = insert_patients(user_id, [p['name'] for p in patients])
+        med_rows = [dict(new_med_row(med), patient_id=pid) for pid, p in zip(new_ids, patients) for med in p['meds']]
+        db.session.bulk_insert_mappings(Medication, med_rows)
+        summary = {'patients_added': len(new_ids), 'meds_added': len(med_rows), 'meds_updated': 0,
+                   'meds_deleted': 0, 'patients_deleted': len(existing_patients)}
+    else:
+        existing = {name: {'id': pid, 'meds': []} for name, pid in patient_ids.items()}
+        names_by_id = {pid: name for name, pid in patient_ids.items()}
+        fields = ('id', 'patient_id', 'name', 'dosage', 'stock', 'max_stock', 'schedule_time', 'instructions', 'frequency', 'days')
+        for row in db.session.execute(select(*[getattr(Medication, f) for f in fields])
+                                      .where(Medication.patient_id.in_(list(names_by_id)))):
+            med = dict(zip(fields, row))
+            existing[names_by_id[med.pop('patient_id')]]['meds'].append(med)
+
+        plan = diff_plan(existing, patients)
+        plan['delete_patient_ids'] += duplicate_ids
+        delete_patients(plan['delete_patient_ids'])
+        if plan['delete_med_ids']:
+            Medication.query.filter(Medication.id.in_(plan['delete_med_ids'])).delete(synchronize_session=False)
+        patient_ids.update(zip(plan['add_patients'], insert_patients(user_id, plan['add_patients'])))
+        med_rows = [dict(med, patient_id=patient_ids[name]) for name, med in plan['add_meds']]
+        db.session.bulk_insert_mappings(Medication, med_rows)
+        db.session.bulk_update_mappings(Medication, plan['update_meds'])
+        summary = {'patients_added': len(plan['add_patients']), 'meds_added': len(med_rows),
+                   'meds_updated': len(plan['update_meds']), 'meds_deleted': len(plan['delete_med_ids']),
+                   'patients_deleted': len(plan['delete_patient_ids'])}
+
+    record_change(user_id, 'medication', op='reset')
+    refresh_scheduled_count(user_id)
+    db.session.commit()
+    return summary
 
 @app.route('/setup', methods=['GET', 'POST'])
 @login_required
 def setup():
     if request.method == 'POST':
-        data = request.json
-        Patient.query.filter_by(user_id=current_user.id).delete()
-        for p_data in data.get('patients', []):
-            new_patient = Patient(name=p_data['name'], user_id=current_user.id)
-            db.session.add(new_patient)
-            db.session.commit()
-            for m_data in p_data['meds']:
-                new_med = Medication(
-                    patient_id=new_patient.id, name=m_data['name'], dosage=m_data['dosage'],
-                    # UPDATED: Initialize max_stock with initial stock
-                    stock=int(m_data['stock']), max_stock=int(m_data['stock']),
-                    schedule_time=m_data['time'], instructions=m_data['instructions'], 
-                    frequency=m_data['frequency'], days=m_data['selected_days']
-                )
-                db.session.add(new_med)
-        db.session.commit()
+        try:
+            import_setup(current_user.id, parse_json(request.json), mode='replace')
+        except SetupImportError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
         return jsonify({'success': True, 'redirect': url_for('index')})
     return render_template('setup.html')
 
+@app.route('/api/setup/import', methods=['POST'])
+@login_required
+def import_roster():
+    """Bulk onboarding from JSON or CSV (?mode=replace|diff, default diff)"""
+    mode = request.args.get('mode', 'diff')
+    if mode not in ('replace', 'diff'):
+        return jsonify({'success': False, 'message': 'mode must be replace or diff'}), 400
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            patients = parse_csv(upload.read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            patients = parse_csv(request.get_data(as_text=True))
+        else:
+            patients = parse_json(request.get_json(silent=True))
+        summary = import_setup(current_user.id, patients, mode=mode)
+    except SetupImportError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'mode': mode, **summary})
+
 @app.route('/')
 def landing():
     if current_user.is_authenticated: return redirect(url_for('index'))
@@ -221,115 +803,276 @@ def history_page():
     return render_template('history.html', logs=logs)
 
 # ==================== ANALYTICS API ====================
+def adherence_summary(scheduled, taken):
+    taken = min(taken, scheduled)
+    return {
+        'total': scheduled,
+        'taken': taken,
+        'missed': scheduled - taken,
+        'score': int((taken / scheduled * 100) if scheduled > 0 else 0)
+    }
+
 @app.route('/api/stats')
 @login_required
 def get_stats():
-    """Returns adherence data for charts"""
+    """Returns adherence data for charts (?range=7|30|365 for daily trends)"""
     today_str = datetime.now().strftime("%Y-%m-%d")
-    total_meds = 0
-    taken_today = 0
-    
-    for patient in current_user.patients:
-        for med in patient.medications:
-            total_meds += 1
-            if med.last_taken == today_str:
-                taken_today += 1
-    
-    missed = total_meds - taken_today
-    score = int((taken_today / total_meds * 100) if total_meds > 0 else 0)
-    
-    return jsonify({
-        'total': total_meds,
-        'taken': taken_today,
-        'missed': missed,
-        'score': score
-    })
+    range_days = request.args.get('range', type=int)
+    if not range_days:
+        today = DailyAdherence.query.filter_by(user_id=current_user.id, day=today_str).first()
+        if today is None:  # Nothing written yet today; read-only, so count instead of creating the row
+            return jsonify(adherence_summary(count_scheduled_doses(current_user.id, datetime.now()), 0))
+        return jsonify(adherence_summary(today.scheduled, today.taken))
+
+    range_days = max(1, min(range_days, 365))
+    start = datetime.now().date() - timedelta(days=range_days - 1)
+    rows = {r.day: r for r in DailyAdherence.query.filter(
+        DailyAdherence.user_id == current_user.id, DailyAdherence.day >= start.isoformat())}
+
+    days = []
+    scheduled_total = taken_total = 0
+    for offset in range(range_days):
+        day_str = (start + timedelta(days=offset)).isoformat()
+        row = rows.get(day_str)
+        if row:
+            days.append({'date': day_str, **adherence_summary(row.scheduled, row.taken)})
+            scheduled_total += row.scheduled
+            taken_total += min(row.taken, row.scheduled)
+        elif day_str == today_str:
+            scheduled = count_scheduled_doses(current_user.id, datetime.now())
+            days.append({'date': day_str, **adherence_summary(scheduled, 0)})
+            scheduled_total += scheduled
+        else:
+            # No rollup means the robot wasn't tracking that day
+            days.append({'date': day_str, 'total': None, 'taken': None, 'missed': None, 'score': None})
+
+    return jsonify({'range': range_days, 'days': days, **adherence_summary(scheduled_total, taken_total)})
 
 # ==================== MAP API ====================
+def find_map(robot_id=None):
+    if robot_id is None: return UserMap.query.filter_by(user_id=current_user.id).first()
+    return RobotMap.query.filter_by(user_id=current_user.id, robot_id=robot_id).first()
+
 @app.route('/api/map/save', methods=['POST'])
 @login_required
 def save_map():
-    data = request.json
-    user_map = UserMap.query.filter_by(user_id=current_user.id).first()
-    if user_map: user_map.grid_data = json.dumps(data.get('grid'))
-    else: db.session.add(UserMap(user_id=current_user.id, grid_data=json.dumps(data.get('grid'))))
+    data = request.get_json(silent=True) or {}
+    try:
+        check_map(data.get('grid') if isinstance(data, dict) else None)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    robot_id = request.args.get('robot_id', type=int)
+    user_map = find_map(robot_id)
+    grid_json = json.dumps(data.get('grid'), separators=(',', ':'))  # Compact: /api/map/load sends it as stored
+    if user_map: user_map.grid_data = grid_json
+    elif robot_id is None: db.session.add(UserMap(user_id=current_user.id, grid_data=grid_json))
+    else: db.session.add(RobotMap(user_id=current_user.id, robot_id=robot_id, grid_data=grid_json))
     db.session.commit()
     return jsonify({'success': True, 'message': 'Map Layout Saved'})
 
 @app.route('/api/map/load')
 @login_required
 def load_map():
-    user_map = UserMap.query.filter_by(user_id=current_user.id).first()
-    if user_map: return jsonify({'success': True, 'grid': json.loads(user_map.grid_data)})
-    else: return jsonify({'success': False, 'message': 'No saved map found'})
+    user_map = find_map(request.args.get('robot_id', type=int))
+    if not user_map: return jsonify({'success': False, 'message': 'No saved map found'})
+    if preferred_format() == MSGPACK: return respond({'success': True, 'grid': json.loads(user_map.grid_data)})
+    # The grid is stored as JSON text: splice it in rather than parsing and re-encoding it
+    response = app.response_class(f'{{"grid":{user_map.grid_data},"success":true}}\n', mimetype='application/json')
+    response.vary.add('Accept')
+    return response
 
-# ==================== SCHEDULE & INVENTORY API (FIXED) ====================
-@app.route('/api/schedule')
+@app.route('/api/map/path', methods=['POST'])
 @login_required
-def get_schedule():
-    schedule = []
+def plan_path():
+    """
+    Route between two cells of the saved map ({start, end} as [x, y], or
+    [floor, x, y] on multi-floor maps) with the hierarchical planner, which is
+    built once per saved map.
+    """
+    user_map = find_map(request.args.get('robot_id', type=int))
+    if not user_map: return jsonify({'success': False, 'message': 'No saved map found'}), 404
+    data = request.json or {}
+    try:
+        path = plan_route(user_map.grid_data, data['start'], data['end'])
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'start and end must be map cells: {e}'}), 400
+    except (Backpressure, TimeoutError):
+        response = jsonify({'success': False, 'message': 'Planner busy, please retry'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.ADMISSION_RETRY_AFTER)
+        return response
+    if not path: return jsonify({'success': False, 'message': 'No path available', 'path': []})
+    return jsonify({'success': True, 'path': path, 'steps': len(path) - 1})
+
+def plan_route(map_json, start, end):
+    """
+    Path between two request cells, exported. With the worker pool the map
+    JSON goes into shared memory once and the search runs in the plan lane,
+    outside this process's GIL.
+    """
+    if Config.WORKER_POOL_ENABLED:
+        key = hashlib.sha1(map_json.encode()).hexdigest()
+        pool = get_pool()
+        try:
+            return pool.run('plan_path', pool.publish(key, map_json.encode()), key, start, end)
+        except FileNotFoundError:
+            # Other maps' publishes evicted the block before a worker mapped it; plan here instead of racing again
+            log.info("Published map evicted before planning, planning in-process", key=key)
+    planner = planner_for(map_json)
+    return planner.export(planner.find_path(planner.cell(start), planner.cell(end)))
+
+# ==================== SCHEDULE & INVENTORY API (FIXED) ====================
+SCHEDULE_FIELDS = ('id', 'day', 'time', 'task', 'patient', 'type', 'status', 'is_done')
+
+def schedule_table(patients):
+    """Today's doses as a Table, sorted by time"""
+    rows = []
     now_time = datetime.now().strftime("%H:%M")
     today_str = datetime.now().strftime("%Y-%m-%d")
     today_day = datetime.now().strftime("%a") 
     
-    for patient in current_user.patients:
+    for patient in patients:
         for med in patient.medications:
             is_today = (med.frequency == "Daily") or (med.days and today_day in med.days)
             if is_today:
                 is_done = (med.last_taken == today_str)
                 status = 'completed' if is_done else ('upcoming' if med.schedule_time > now_time else 'pending')
-                schedule.append({
-                    "id": med.id, "day": "Today", "time": med.schedule_time,
-                    "task": f"{med.name}", "patient": patient.name,
-                    "type": "medicine", "status": status, "is_done": is_done
-                })
-    schedule.sort(key=lambda x: x['time'])
-    return jsonify(schedule)
+                rows.append((med.id, "Today", med.schedule_time, f"{med.name}", patient.name,
+                             "medicine", status, is_done))
+    rows.sort(key=lambda row: row[2])
+    return Table(SCHEDULE_FIELDS, rows)
+
+def build_schedule(patients):
+    return schedule_table(patients).dicts()
+
+@app.route('/api/schedule')
+@login_required
+def get_schedule():
+    return respond(schedule_table(current_user.patients))
+
+INVENTORY_FIELDS = ('name', 'dosage', 'stock', 'total', 'unit', 'status', 'instructions',
+                    'daily_rate', 'days_until_empty', 'empty_on', 'reorder_on')
 
 @app.route('/api/inventory')
 @login_required
 def get_inventory():
     inventory = []
-    for patient in current_user.patients:
-        for med in patient.medications:
-            
-            # === NEW LOGIC: CHECK FOR TODAY AND TOMORROW ===
-            # We assume "Today + Tomorrow" means we need at least 2 doses available.
-            status = 'ok'
-            if med.stock < 2:
-                status = 'low' # Logic: Not enough for today + tomorrow
-            elif med.stock < 5:
-                status = 'low' # Standard low warning
-
-            # Ensure we don't divide by zero
-            total = med.max_stock if med.max_stock > 0 else 30
-            
-            inventory.append({
-                "name": f"{med.name} ({patient.name})", 
-                "dosage": med.dosage,
-                "stock": med.stock, 
-                "total": total, # FIXED: Uses real max_stock
-                "unit": "tablets",
-                "status": status, 
-                "instructions": med.instructions
-            })
-    return jsonify(inventory)
+    for row, forecast in forecaster.for_user(current_user.id):
+        # Ensure we don't divide by zero
+        total = row.max_stock if row.max_stock > 0 else 30
+        # status 'low' = runs out within STOCK_CRITICAL_DAYS, 'warning' = inside the reorder lead time
+        inventory.append((f"{row.name} ({row.patient})", row.dosage, row.stock, total, "tablets",
+                          forecast['status'], row.instructions, forecast['daily_rate'],
+                          forecast['days_until_empty'], forecast['empty_on'], forecast['reorder_on']))
+    return respond(Table(INVENTORY_FIELDS, inventory))
 
 # ==================== VOICE AI API ====================
+def pick_dose(meds, name):
+    """Among same-named rows (e.g. Amoxicillin x3), prefer the earliest dose not yet taken today"""
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    matches = sorted((m for m in meds if m.name == name), key=lambda m: (m.last_taken == today_str, m.schedule_time or ''))
+    return matches[0] if matches else None
+
+VOICE_PENDING = 'voice_pending'
+AFFIRMATIVE = {'yes', 'yeah', 'yep', 'confirm', 'correct', 'sure', 'ok', 'okay'}
+DECLINE = {'no', 'nope', 'cancel', 'stop', 'not', 'don'}
+
+def run_local_intent(intent, meds):
+    """
+    Turns a classified command into (reply, action). TAKEN and ADD never
+    write here: confident ones are parked in the session until the user
+    confirms, unsure ones get a clarifying question.
+    """
+    med = pick_dose(meds, intent.medication) if intent.medication else None
+    if intent.reason == 'negated':
+        name = med.name if med else 'that'
+        if intent.demoted == 'TAKEN': return f"Okay, {name} is not marked as taken.", 'NONE'
+        if intent.demoted == 'DISPENSE': return f"Okay, I won't dispense {name}.", 'NONE'
+        return "Okay, nothing was changed.", 'NONE'
+    if intent.reason == 'question' and intent.demoted == 'TAKEN' and med:
+        taken = med.last_taken == datetime.now().strftime("%Y-%m-%d")
+        return f"{med.name} is {'already' if taken else 'not yet'} marked as taken today.", 'NONE'
+    if intent.action == 'DISPENSE':
+        return (f"Dispensing {med.name} ({med.dosage})." if med else "Opening the medicine drawer."), 'DISPENSE'
+    if intent.action in ('TAKEN', 'ADD') and intent.confidence < Config.INTENT_CONFIDENCE_THRESHOLD:
+        return "Sorry, I'm not sure what to change. Could you say that again?", 'NONE'
+    if intent.action == 'TAKEN':
+        if not med: return "Which medicine did you take?", 'NONE'
+        return propose_write({'action': 'TAKEN', 'med_id': med.id, 'name': med.name},
+                             f"Mark {med.name} as taken? Say yes to confirm.")
+    if intent.action == 'ADD':
+        name = intent.medication or intent.new_name
+        if not name or not intent.time: return "Please tell me the medicine name and a time.", 'NONE'
+        return propose_write({'action': 'ADD', 'name': name, 'time': intent.time},
+                             f"Add {name} every day at {intent.time}? Say yes to confirm.")
+    if med:
+        return f"You have {med.stock} {med.name} left. It is scheduled for {med.schedule_time}.", 'NONE'
+    pending = [item for item in build_schedule(current_user.patients) if not item['is_done']]
+    if pending: return f"Your next medicine is {pending[0]['task']} at {pending[0]['time']}.", 'NONE'
+    return "All doses are done for today.", 'NONE'
+
+def propose_write(pending, question):
+    session[VOICE_PENDING] = dict(pending, expires=time.time() + Config.VOICE_CONFIRM_SECONDS)
+    return question, 'CONFIRM'
+
+def confirm_pending(user_text):
+    """(reply, action) when the utterance answers a parked TAKEN/ADD, else None"""
+    pending = session.get(VOICE_PENDING)
+    if not pending: return None
+    tokens = set(tokenize(user_text))
+    if pending['expires'] < time.time() or not tokens & (AFFIRMATIVE | DECLINE):
+        session.pop(VOICE_PENDING)  # Any other command replaces the question
+        return None
+    session.pop(VOICE_PENDING)
+    if tokens & DECLINE: return "Okay, nothing was changed.", 'NONE'
+    if pending['action'] == 'TAKEN':
+        owned = Medication.query.join(Patient).filter(Medication.id == pending['med_id'],
+                                                      Patient.user_id == current_user.id).first()
+        if not owned: return "That medicine is no longer on your list.", 'NONE'
+        outcome = apply_toggle(owned.id, 'take', source='voice')
+        if outcome is None: return "That medicine is no longer on your list.", 'NONE'
+        db.session.commit()
+        return (f"Marked {pending['name']} as taken." if outcome['success'] else outcome.get('message', "Could not update.")), 'TAKEN'
+    new_med = Medication(
+        patient_id=current_user.patients[0].id, name=pending['name'], dosage='1 pill', stock=30, max_stock=30,
+        schedule_time=pending['time'], instructions='Voice Add', frequency="Daily", days="All")
+    db.session.add(new_med)
+    db.session.flush()
+    record_change(current_user.id, 'medication', new_med.id)
+    refresh_scheduled_count(current_user.id)
+    db.session.commit()
+    return f"Added {pending['name']} at {pending['time']}.", 'ADD'
+
 @app.route('/api/voice/process', methods=['POST'])
 @login_required
 def process_voice():
     user_text = request.json.get('text', '')
-    if not AI_AVAILABLE: return jsonify({'success': True, 'message': "AI Missing", 'action': 'NONE'})
+    confirmed = confirm_pending(user_text)
+    if confirmed:
+        message, action = confirmed
+        return jsonify({'success': True, 'message': message, 'action': action, 'engine': 'local'})
+    meds = [med for patient in current_user.patients for med in patient.medications]
+    intent = engine_for([m.name for m in meds]).classify(user_text)
+
+    # Remote model only for commands the local engine is unsure about
+    if not AI_AVAILABLE or intent.confidence >= Config.INTENT_CONFIDENCE_THRESHOLD:
+        message, action = run_local_intent(intent, meds)
+        return jsonify({'success': True, 'message': message, 'action': action, 'engine': 'local', 'intent': intent.to_dict()})
     
     prompt = f"""You are MediBot. SYSTEM DATA: {get_user_context()}. USER COMMAND: "{user_text}". 
     Output JSON ONLY: {{"response": "text", "action": "NONE" or "DISPENSE"}}"""
     
     try:
-        res = model.generate_content(prompt)
-        parsed = json.loads(res.text.replace('```json','').replace('```','').strip())
-        return jsonify({'success': True, 'message': parsed['response'], 'action': parsed.get('action')})
-    except: return jsonify({'success': False, 'error': "AI Error"})
+        text = ai_executor.generate(prompt)
+        parsed = json.loads(text.replace('```json','').replace('```','').strip())
+        return jsonify({'success': True, 'message': parsed['response'], 'action': parsed.get('action'), 'engine': 'remote'})
+    except AIUnavailable as e:
+        log.warning("AI unavailable, answering locally", reason=str(e))
+    except (ValueError, KeyError, TypeError) as e:
+        log.warning("AI reply unparseable, answering locally", error=e)
+
+    message, action = run_local_intent(intent, meds)
+    return jsonify({'success': True, 'message': message, 'action': action, 'engine': 'fallback', 'intent': intent.to_dict()})
 
 # ==================== TASK OPERATIONS (FIXED) ====================
 @app.route('/api/task/add', methods=['POST'])
@@ -345,40 +1088,421 @@ def add_task():
         frequency="Daily", days="All"
     )
     db.session.add(new_med)
+    db.session.flush()
+    record_change(current_user.id, 'medication', new_med.id)
+    refresh_scheduled_count(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
 @app.route('/api/task/delete', methods=['POST'])
 @login_required
 def delete_task():
-    Medication.query.filter_by(id=request.json.get('id')).delete()
+    med_id = (request.get_json(silent=True) or {}).get('id')
+    removed = db.session.execute(
+        delete(Medication)
+        .where(Medication.id == med_id,
+               Medication.patient_id.in_(select(Patient.id).where(Patient.user_id == current_user.id)))
+        .execution_options(synchronize_session=False)).rowcount
+    if not removed: return jsonify({'success': False, 'message': 'Medication not found'}), 404
+    record_change(current_user.id, 'medication', med_id, op='delete')
+    refresh_scheduled_count(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
-@app.route('/api/task/toggle', methods=['POST'])
-@login_required
-def toggle_task():
-    med = Medication.query.get(request.json.get('id'))
-    if not med: return jsonify({'success': False})
+def claim_idempotency_key(key):
+    """
+    Reserves `key` for the current user inside the open transaction.
+    Returns the stored response if the key was already used, else None.
+    """
+    record = IdempotencyKey(user_id=current_user.id, key=key[:64])
+    db.session.add(record)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        stored = IdempotencyKey.query.filter_by(user_id=current_user.id, key=key[:64]).first()
+        return json.loads(stored.response) if stored and stored.response else {'success': False, 'message': 'Request in progress'}
+    g.idempotency_record = record
+    return None
+
+def expire_idempotency_keys(now=None):
+    """Nightly: drops keys older than IDEMPOTENCY_KEY_TTL_HOURS on every site; a retry that late applies again"""
+    cutoff = (now or datetime.now()) - timedelta(hours=Config.IDEMPOTENCY_KEY_TTL_HOURS)
+    removed = 0
+    with app.app_context():
+        for site in sites_for():
+            with use_site(site):
+                removed += db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)
+                                              .execution_options(synchronize_session=False)).rowcount
+                db.session.commit()
+    if removed: log.info("Idempotency keys expired", rows=removed)
+    return removed
+
+forecaster.nightly_hooks.append(expire_idempotency_keys)
+
+def apply_toggle(med_id, action=None, source='dashboard'):
+    """
+    Takes or undoes today's dose with single conditional UPDATEs, so racing
+    taps or voice commands can never double-decrement or double-log.
+    Returns None when `med_id` isn't one of the current user's medications.
+    """
     today_str = datetime.now().strftime("%Y-%m-%d")
-    
-    if med.last_taken == today_str: # UNDO
-        med.last_taken = None
+    # Every statement is scoped to the caller's patients: the dose ledgers below are written under their id
+    owned = Medication.patient_id.in_(select(Patient.id).where(Patient.user_id == current_user.id))
+    row = db.session.execute(select(Medication.last_taken).where(Medication.id == med_id, owned)).first()
+    if not row: return None
+    if action not in ('take', 'undo'):
+        action = 'undo' if row.last_taken == today_str else 'take'
+
+    if action == 'undo':
         # Only refund if we haven't exceeded max stock (sanity check)
-        if med.stock < med.max_stock:
-            med.stock += 1
+        changed = db.session.execute(
+            update(Medication)
+            .where(Medication.id == med_id, owned, Medication.last_taken == today_str)
+            .values(last_taken=None, stock=case((Medication.stock < Medication.max_stock, Medication.stock + 1), else_=Medication.stock))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not changed: return {'success': False, 'message': 'Not taken today'}
+    else:
+        changed = db.session.execute(
+            update(Medication)
+            .where(Medication.id == med_id, owned, Medication.stock > 0,
+                   or_(Medication.last_taken.is_(None), Medication.last_taken != today_str))
+            .values(stock=Medication.stock - 1, last_taken=today_str)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not changed:
+            current = db.session.execute(select(Medication.stock, Medication.last_taken).where(Medication.id == med_id)).first()
+            if current.last_taken == today_str: return {'success': False, 'message': 'Already taken today'}
+            return {'success': False, 'message': 'Out of Stock!'}
+
+    med = db.session.execute(select(Medication.name, Medication.stock, Medication.schedule_time).where(Medication.id == med_id)).first()
+    on_commit(forecaster.update_stock, current_user.id, med_id, med.stock, None if action == 'undo' else today_str)
+    db.session.add(DoseEvent(
+        user_id=current_user.id, medication_id=med_id, scheduled_slot=f"{today_str} {med.schedule_time}",
+        source=source, kind='undone' if action == 'undo' else 'taken'))
+    bump_adherence(current_user.id, today_str, -1 if action == 'undo' else 1)
+    record_change(current_user.id, 'medication', med_id)
+    mark_identity_stale(current_user.id)
+    if action == 'undo':
         db.session.add(ActivityLog(user_id=current_user.id, action=f"Undo: {med.name}", details=f"Stock restored to {med.stock}"))
-    else: # TAKE
-        if med.stock > 0:
-            med.last_taken = today_str
-            med.stock -= 1
-            db.session.add(ActivityLog(user_id=current_user.id, action=f"Dispensed {med.name}", details=f"Stock reduced to {med.stock}"))
-        else: 
-            return jsonify({'success': False, 'message': 'Out of Stock!'})
-    
+    else:
+        db.session.add(ActivityLog(user_id=current_user.id, action=f"Dispensed {med.name}", details=f"Stock reduced to {med.stock}"))
+    return {'success': True, 'action': action, 'stock': med.stock}
+
+@app.route('/api/task/toggle', methods=['POST'])
+@login_required
+def toggle_task():
+    data = request.json
+    key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if key:
+        replay = claim_idempotency_key(key)
+        if replay is not None: return jsonify(replay)
+
+    result = apply_toggle(data.get('id'), data.get('action'), data.get('source', 'dashboard'))
+    if result is None:
+        db.session.rollback()  # Releases the idempotency key too; nothing was applied
+        return jsonify({'success': False, 'message': 'Medication not found'}), 404
+    if key: g.idempotency_record.response = json.dumps(result)
     db.session.commit()
+    return jsonify(result)
+
+# ==================== FLEET API ====================
+def stream_response(handle):
+    return Response(handle.camera.generate_stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/api/fleet')
+@login_required
+def fleet_status():
+    return jsonify({'robots': get_fleet().snapshot()})
+
+@app.route('/api/fleet/register', methods=['POST'])
+@login_required
+@admin_required
+def register_robot():
+    data = request.json
+    handle = get_fleet().register(data['name'], data.get('camera_source'))
+    return jsonify({'success': True, 'robot': handle.snapshot()})
+
+@app.route('/api/fleet/<int:robot_id>/status')
+@login_required
+def robot_status(robot_id):
+    handle = get_fleet().get(robot_id)
+    if not handle: return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    return jsonify(handle.snapshot())
+
+@app.route('/api/fleet/<int:robot_id>/video')
+@login_required
+def robot_video(robot_id):
+    handle = get_fleet().get(robot_id)
+    if not handle: return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    return stream_response(handle)
+
+@app.route('/video_feed')
+@login_required
+def video_feed():
+    return stream_response(get_fleet().get(1))
+
+@app.route('/api/fleet/dispatch', methods=['POST'])
+@login_required
+def dispatch_doses():
+    """Assigns the user's pending doses to the nearest free robots"""
+    room = (request.json or {}).get('room', Config.DEFAULT_PATIENT_ROOM)
+    fleet = get_fleet()
+    # One dispatch at a time, so two requests can't both hand out the same doses
+    with dispatch_lock:
+        held = set()
+        for handle in fleet.all():
+            with handle.lock:
+                if handle.task: held.update(handle.task['med_ids'])
+        doses = [dict(item, room=room) for item in build_schedule(current_user.patients)
+                 if item['status'] == 'pending' and item['id'] not in held]
+        assignments, waiting = dispatcher.assign(doses, fleet.all())
+        for robot_id, trip in assignments.items():
+            handle = fleet.get(robot_id)
+            with handle.lock:
+                handle.task = {'room': trip['room'], 'med_ids': [d['id'] for d in trip['doses']], 'user_id': current_user.id}
+    for robot_id, trip in assignments.items():
+        handle = fleet.get(robot_id)
+        db.session.add(ActivityLog(user_id=current_user.id, action=f"Dispatched {handle.name}",
+                                   details=f"{len(trip['doses'])} doses to {trip['room']}"))
+    db.session.commit()
+    return jsonify({'success': True,
+                    'assignments': {str(rid): trip for rid, trip in assignments.items()},
+                    'waiting': waiting})
+
+@app.route('/api/fleet/<int:robot_id>/complete', methods=['POST'])
+@login_required
+def complete_trip(robot_id):
+    handle = get_fleet().get(robot_id)
+    if not handle: return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    with handle.lock:
+        if not handle.task: return jsonify({'success': False, 'message': 'No trip in progress'}), 409
+        if handle.task.get('user_id') != current_user.id:
+            return jsonify({'success': False, 'message': 'Not your trip'}), 403
+        handle.task = None
     return jsonify({'success': True})
 
+# ==================== TELEMETRY API ====================
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Sample field -> (check, what it must be); everything is checked before ingest touches the robot
+TELEMETRY_FIELDS = {
+    'ts': (is_number, 'a number (seconds since the epoch)'),  # Samples are sorted by it
+    'battery_level': (is_number, 'a number'),
+    'location': (lambda v: isinstance(v, str), 'a string'),
+    'is_moving': (lambda v: isinstance(v, bool), 'true or false'),
+}
+
+def check_telemetry_sample(sample):
+    for field, (check, expected) in TELEMETRY_FIELDS.items():
+        if sample.get(field) is not None and not check(sample[field]):
+            raise ValueError(f'{field} must be {expected}')
+    pose = sample.get('pose') or {}
+    if not isinstance(pose, dict): raise ValueError('pose must be an object')
+    for axis in ('x', 'y', 'theta'):
+        if pose.get(axis) is not None and not is_number(pose[axis]):
+            raise ValueError(f'pose.{axis} must be a number')
+
+def telemetry_batch(data):
+    """(robot_id, samples) from a telemetry body; ValueError names the first bad field"""
+    if not isinstance(data, dict): raise ValueError('Expected a JSON object')
+    robot_id = data.get('robot_id', 1)
+    if isinstance(robot_id, bool) or not isinstance(robot_id, (int, str)) or not str(robot_id).isdigit():
+        raise ValueError('robot_id must be an integer')
+    samples = data.get('samples') or [data]
+    if not isinstance(samples, list) or not all(isinstance(sample, dict) for sample in samples):
+        raise ValueError('samples must be a list of objects')
+    for sample in samples:
+        check_telemetry_sample(sample)
+    return int(robot_id), samples
+
+@app.route('/api/robot/telemetry', methods=['POST'])
+@robot_or_login_required
+def ingest_telemetry():
+    """Accepts one sample or {'robot_id': N, 'samples': [...]}"""
+    try:
+        robot_id, samples = telemetry_batch(request.get_json(silent=True) or {})
+        count = get_telemetry().ingest(robot_id, samples)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    return jsonify({'success': True, 'accepted': count})
+
+@app.route('/api/robot/status')
+@login_required
+def current_robot_status():
+    """Latest in-memory state; never waits for the coalesced DB write"""
+    handle = get_fleet().get(request.args.get('robot_id', 1, type=int))
+    if not handle: return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    return jsonify(handle.snapshot())
+
+@app.route('/api/robot/telemetry/history')
+@login_required
+def telemetry_history():
+    handle = get_fleet().get(request.args.get('robot_id', 1, type=int))
+    if not handle: return jsonify({'success': False, 'message': 'Unknown robot'}), 404
+    return jsonify(handle.telemetry.export(since=request.args.get('since', 0.0, type=float)))
+
+# ==================== VITALS API ====================
+@app.route('/api/vitals/current')
+@login_required
+def vitals_current():
+    return jsonify(get_vitals().get_latest_vitals())
+
+@app.route('/api/vitals/history')
+@login_required
+def vitals_history():
+    limit = max(1, min(request.args.get('limit', 50, type=int), 1000))  # SQLite reads LIMIT -1 as no limit
+    return respond(Table(*get_fleet().db.get_recent_vitals_rows(limit)))
+
+# ==================== SYNC API ====================
+SYNC_VERSION = 'v2'
+SYNC_PAGE = 200  # Max dose events / log entries per response; 'more' asks the client to call again
+SYNC_MED_FIELDS = ('id', 'patient_id', 'name', 'dosage', 'stock', 'max_stock', 'schedule_time',
+                   'instructions', 'frequency', 'days', 'last_taken')
+
+def encode_cursor(user_id, change_id, event_id, log_id, status_tag):
+    return f"{SYNC_VERSION}.{user_id}.{change_id}.{event_id}.{log_id}.{status_tag}"
+
+def decode_cursor(raw, user_id):
+    """
+    (change_id, event_id, log_id, status_tag), or None (full sync) when
+    missing, from another version or issued to another user
+    """
+    parts = (raw or '').split('.')
+    if len(parts) != 6 or parts[0] != SYNC_VERSION: return None
+    try:
+        if int(parts[1]) != user_id: return None
+        return int(parts[2]), int(parts[3]), int(parts[4]), parts[5]
+    except ValueError: return None
+
+def prune_change_log(now=None):
+    """
+    Nightly: drops change rows older than SYNC_CHANGE_RETENTION_DAYS on every
+    site. The newest row always stays, so ids never restart; cursors that
+    point below what is left get a full sync instead.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=Config.SYNC_CHANGE_RETENTION_DAYS)
+    removed = 0
+    with app.app_context():
+        for site in sites_for():
+            with use_site(site):
+                newest = db.session.execute(select(func.max(ChangeLog.id))).scalar()
+                if newest is None: continue
+                removed += db.session.execute(delete(ChangeLog).where(ChangeLog.changed_at < cutoff, ChangeLog.id < newest)
+                                              .execution_options(synchronize_session=False)).rowcount
+                db.session.commit()
+    if removed: log.info("Change log pruned", rows=removed)
+    return removed
+
+forecaster.nightly_hooks.append(prune_change_log)
+
+def sync_medications(user_id, ids=None):
+    query = (select(*[getattr(Medication, f) for f in SYNC_MED_FIELDS], Patient.name.label('patient'))
+             .join(Patient).where(Patient.user_id == user_id).order_by(Medication.id))
+    if ids is not None: query = query.where(Medication.id.in_(ids))
+    return [dict(row._mapping) for row in db.session.execute(query)]
+
+def sync_appended(model, user_id, after_id, fields):
+    """Rows with id > after_id (the newest SYNC_PAGE on a full sync), oldest first; returns (rows, more)"""
+    query = select(*[getattr(model, f) for f in fields]).where(model.user_id == user_id)
+    if after_id is None:
+        rows = db.session.execute(query.order_by(model.id.desc()).limit(SYNC_PAGE)).all()[::-1]
+        more = False
+    else:
+        rows = db.session.execute(query.where(model.id > after_id).order_by(model.id).limit(SYNC_PAGE + 1)).all()
+        more = len(rows) > SYNC_PAGE
+        rows = rows[:SYNC_PAGE]
+    return [{f: (v.isoformat() if isinstance(v, datetime) else v) for f, v in zip(fields, row)} for row in rows], more
+
+def sync_status():
+    """Robot #1's state minus the heartbeat timestamp, so an idle robot produces no delta"""
+    handle = get_fleet().get(1)
+    status = {k: v for k, v in handle.snapshot().items() if k != 'last_update'} if handle else {}
+    return status, hashlib.sha1(json.dumps(status, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+@app.route('/api/sync')
+@login_required
+def sync():
+    """
+    Everything the dashboard shows that changed since ?since=<cursor>:
+    medication rows (deleted ids as tombstones), new dose events and log
+    entries, and robot status when it changed. Without a usable cursor the
+    response is a full snapshot with full=true. Always returns the next cursor.
+    """
+    user_id = current_user.id
+    cursor = decode_cursor(request.args.get('since'), user_id)
+    oldest, latest = db.session.execute(select(func.min(ChangeLog.id), func.max(ChangeLog.id))).one()
+    oldest, latest = oldest or 0, latest or 0
+    # Rows past the cursor were pruned (or the log was reset): the delta would be incomplete
+    if cursor and (cursor[0] > latest or cursor[0] < oldest - 1): cursor = None
+    change_id, event_id, log_id, tag = cursor if cursor else (0, None, None, None)
+
+    changes = []
+    if cursor is not None:
+        changes = db.session.execute(select(ChangeLog.id, ChangeLog.entity_id, ChangeLog.op)
+                                     .where(ChangeLog.user_id == user_id, ChangeLog.id > change_id, ChangeLog.id <= latest)
+                                     .order_by(ChangeLog.id)).all()
+    change_id = latest  # Other users' rows are skipped too, so the cursor stays above the pruned range
+
+    full = cursor is None or any(c.op == 'reset' for c in changes)
+    deleted = set()
+    if full:
+        medications = sync_medications(user_id)
+    else:
+        upserted = set()
+        for change in changes:
+            (deleted if change.op == 'delete' else upserted).add(change.entity_id)
+            (upserted if change.op == 'delete' else deleted).discard(change.entity_id)
+        medications = sync_medications(user_id, upserted) if upserted else []
+        deleted |= upserted - {m['id'] for m in medications}
+
+    dose_events, more_events = sync_appended(DoseEvent, user_id, event_id, ('id', 'medication_id', 'scheduled_slot', 'taken_at', 'source', 'kind'))
+    logs, more_logs = sync_appended(ActivityLog, user_id, log_id, ('id', 'action', 'timestamp', 'details'))
+    status, new_tag = sync_status()
+
+    return jsonify({
+        'user': user_id,
+        'cursor': encode_cursor(user_id, change_id, dose_events[-1]['id'] if dose_events else (event_id or 0),
+                                logs[-1]['id'] if logs else (log_id or 0), new_tag),
+        'full': full,
+        'medications': medications,
+        'deleted': {'medications': sorted(deleted)},
+        'dose_events': dose_events,
+        'logs': logs,
+        'status': status if new_tag != tag else None,
+        'more': more_events or more_logs,
+    })
+
+# ==================== ALERTS API ====================
+@app.route('/api/alerts')
+@login_required
+def get_alerts():
+    """Reminders/escalations for the current user newer than ?since=<alert id>"""
+    since = request.args.get('since', 0, type=int)
+    return jsonify(alert_bus.since(since, user_id=current_user.id))
+
+# ==================== CLIPS API ====================
+# Clips are patient video from a shared robot camera, triggered by sensor alerts that
+# belong to no single account or site, so only admins may list or play them
+@app.route('/api/clips')
+@login_required
+@admin_required
+def list_clips():
+    return jsonify({'clips': get_recorder().clips()})
+
+@app.route('/api/clips/<clip_id>')
+@login_required
+@admin_required
+def get_clip(clip_id):
+    """Stored clip as MJPEG; conditional=True adds Range/ETag support for seeking and resumes"""
+    path = get_recorder().path_for(clip_id)
+    if path is None: return jsonify({'success': False, 'message': 'Unknown clip'}), 404
+    return send_file(path, mimetype='video/x-motion-jpeg', conditional=True, download_name=clip_id + '.mjpeg')
+
 # ==================== EMERGENCY & REQUESTS ====================
 @app.route('/api/request', methods=['POST'])
 @login_required
@@ -392,8 +1516,10 @@ def handle_request():
     if req_type == 'help':
         action_log = "EMERGENCY ALERT"
         details = "Patient pressed Panic Button. Notifying Caregiver..."
+        clip_id = get_recorder().trigger('sos', user=current_user.username)
+        alert_bus.publish('sos', user_id=current_user.id, clip_id=clip_id)
         
-        email_sent = send_emergency_email(current_user.username, "Panic Button Pressed on Dashboard")
+        email_sent = send_emergency_email(current_user.username, f"Panic Button Pressed on Dashboard (video clip {clip_id})")
         if email_sent: details += " [Email Sent]"
         else: details += " [Email Failed]"
 
@@ -404,28 +1530,27 @@ def handle_request():
     return jsonify({'success': True, 'message': f'{req_type} request processed'})
 
 # ==================== SEEDING (UPDATED) ====================
-@app.route('/seed_full_day')
-@login_required
-def seed_full_day():
-    patient = Patient.query.filter_by(user_id=current_user.id).first()
+SEED_SCHEDULE = [
+    {"name": "Omeprazole", "dosage": "20mg", "time": "08:00", "instructions": "Stomach Protector", "stock": 28, "max": 30},
+    {"name": "Metformin", "dosage": "500mg", "time": "08:00", "instructions": "Diabetes", "stock": 60, "max": 60},
+    {"name": "Amoxicillin", "dosage": "500mg", "time": "08:00", "instructions": "Antibiotic", "stock": 21, "max": 21},
+    {"name": "Aspirin", "dosage": "75mg", "time": "08:00", "instructions": "Heart Health", "stock": 30, "max": 30},
+    {"name": "Amoxicillin", "dosage": "500mg", "time": "13:00", "instructions": "Antibiotic Dose 2", "stock": 21, "max": 21},
+    {"name": "Vitamin D3", "dosage": "1000 IU", "time": "13:00", "instructions": "Bone Supplement", "stock": 90, "max": 90},
+    {"name": "Metformin", "dosage": "500mg", "time": "20:00", "instructions": "Diabetes Evening", "stock": 60, "max": 60},
+    {"name": "Amoxicillin", "dosage": "500mg", "time": "20:00", "instructions": "Antibiotic Dose 3", "stock": 21, "max": 21},
+    {"name": "Atorvastatin", "dosage": "20mg", "time": "20:00", "instructions": "Cholesterol", "stock": 30, "max": 30}
+]
+
+def seed_patient_schedule(user_id):
+    """Seeds the demo day for a user. Returns the number of medications added."""
+    patient = Patient.query.filter_by(user_id=user_id).first()
     if not patient:
-        patient = Patient(name="Grandpa Joe", user_id=current_user.id)
+        patient = Patient(name="Grandpa Joe", user_id=user_id)
         db.session.add(patient); db.session.commit()
 
-    schedule_data = [
-        {"name": "Omeprazole", "dosage": "20mg", "time": "08:00", "instructions": "Stomach Protector", "stock": 28, "max": 30},
-        {"name": "Metformin", "dosage": "500mg", "time": "08:00", "instructions": "Diabetes", "stock": 60, "max": 60},
-        {"name": "Amoxicillin", "dosage": "500mg", "time": "08:00", "instructions": "Antibiotic", "stock": 21, "max": 21},
-        {"name": "Aspirin", "dosage": "75mg", "time": "08:00", "instructions": "Heart Health", "stock": 30, "max": 30},
-        {"name": "Amoxicillin", "dosage": "500mg", "time": "13:00", "instructions": "Antibiotic Dose 2", "stock": 21, "max": 21},
-        {"name": "Vitamin D3", "dosage": "1000 IU", "time": "13:00", "instructions": "Bone Supplement", "stock": 90, "max": 90},
-        {"name": "Metformin", "dosage": "500mg", "time": "20:00", "instructions": "Diabetes Evening", "stock": 60, "max": 60},
-        {"name": "Amoxicillin", "dosage": "500mg", "time": "20:00", "instructions": "Antibiotic Dose 3", "stock": 21, "max": 21},
-        {"name": "Atorvastatin", "dosage": "20mg", "time": "20:00", "instructions": "Cholesterol", "stock": 30, "max": 30}
-    ]
-
     added = 0
-    for item in schedule_data:
+    for item in SEED_SCHEDULE:
         # Check if already exists to prevent duplicate seeding
         if not Medication.query.filter_by(name=item['name'], schedule_time=item['time'], patient_id=patient.id).first():
             db.session.add(Medication(
@@ -435,15 +1560,49 @@ def seed_full_day():
                 frequency="Daily", days="All", last_taken=None
             ))
             added += 1
+    if added: record_change(user_id, 'medication', op='reset')
+    refresh_scheduled_count(user_id)
     db.session.commit()
+    return added
+
+@app.route('/seed_full_day')
+@login_required
+def seed_full_day():
+    added = seed_patient_schedule(current_user.id)
 
     return f"""<div style="font-family:sans-serif;text-align:center;padding:50px;background:#111;color:white;">
     <h1 style="color:#48bb78;">✓ System Seeded</h1><p>Added {added} complex medications.</p>
     <a href='/dashboard' style="background:#0a84ff;color:white;padding:15px;text-decoration:none;border-radius:20px;">Back to Dashboard</a></div>"""
 
 # ==================== RUN APP ====================
-if __name__ == '__main__':
+def start_background_services():
+    """Starts optional long-running helpers (only when running the server)"""
+    if Config.PROFILER_ALWAYS_ON:
+        rolling_profiler.start()
+    get_telemetry().start()
+    get_vitals().start_reading()
+    patient_robot = get_fleet().get(1)
+    if patient_robot:
+        patient_robot.camera.recorder = get_recorder()
+        patient_robot.camera.start_background_capture()
+    with app.app_context():
+        reminders.start()
+    forecaster.start()
+    if Config.BACKUP_ENABLED:
+        get_backups().start()
+
+def init_storage():
+    """Apply schema migrations and create the ORM tables on the shared engine"""
     with app.app_context():
-        db.create_all()
+        migrate(db.engine, db.metadata)
+
+def main():
+    init_storage()
+    assets.build_if_stale()
+    start_background_services()
     # Host 0.0.0.0 makes it accessible to other devices (Laptop/Mobile)
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
+
+if __name__ == '__main__':
+    # Works, but spawned workers re-import __main__, so each would build this whole app; start with run.py instead
+    main()
\ No newline at end of file
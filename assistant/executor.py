@@ -0,0 +1,146 @@
+"""
+Bounded AI Request Executor
+Runs remote model calls off the Flask request thread with a per-call
+deadline, a hard concurrency cap, coalescing of identical in-flight prompts
+and a circuit breaker, so a slow upstream degrades to the local fallback
+instead of tying up the workers that serve polls and the MJPEG stream.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from monitoring.log import get_logger
+from monitoring.metrics import QUEUE_DEPTH, REGISTRY
+
+log = get_logger(__name__)
+
+AI_CALLS = REGISTRY.counter('ai_calls_total', 'Remote AI calls by outcome', ['outcome'])
+AI_CALL_SECONDS = REGISTRY.histogram('ai_call_duration_seconds', 'Remote AI call latency')
+
+
+class AIUnavailable(Exception):
+    """The remote model can't answer in time; callers should use the fallback"""
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open after a cool-down"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        """True if a call may go out; in half-open only one probe at a time"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    log.warning("AI circuit opened", failures=self.failures)
+                self.opened_at = time.monotonic()
+
+
+class AIExecutor:
+    def __init__(self, call, max_concurrency=2, timeout=8.0, breaker=None):
+        """
+        Args:
+            call (callable): prompt -> response text (blocking)
+            max_concurrency (int): Upstream calls allowed at once; extra
+                callers fail fast instead of queueing
+            timeout (float): Default per-call deadline in seconds
+        """
+        self.call = call
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-call')
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.inflight = {}  # prompt -> Future, for coalescing
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None):
+        """Returns the model's text or raises AIUnavailable"""
+        if not self.breaker.allow():
+            AI_CALLS.inc(outcome='circuit_open')
+            raise AIUnavailable('circuit open')
+
+        with self.lock:
+            future = self.inflight.get(prompt)
+            if future is None:
+                if not self.slots.acquire(blocking=False):
+                    AI_CALLS.inc(outcome='rejected')
+                    raise AIUnavailable('too many concurrent AI calls')
+                future = self.pool.submit(self._run, prompt)
+                future.timed_out = False
+                self.inflight[prompt] = future
+                future.add_done_callback(lambda f, p=prompt: self._forget(p, f))
+            else:
+                AI_CALLS.inc(outcome='coalesced')
+            QUEUE_DEPTH.set(len(self.inflight), queue='ai')
+
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeout:
+            with self.lock:
+                first = not future.timed_out
+                future.timed_out = True
+            if first:
+                # The call keeps its slot until upstream answers; count it once
+                self.breaker.record_failure()
+                AI_CALLS.inc(outcome='timeout')
+            raise AIUnavailable('AI call timed out')
+        except AIUnavailable:
+            raise
+        except Exception as e:
+            raise AIUnavailable(f'AI call failed: {e}')
+
+    def _run(self, prompt):
+        started = time.perf_counter()
+        try:
+            text = self.call(prompt)
+        except Exception as e:
+            self.breaker.record_failure()
+            AI_CALLS.inc(outcome='error')
+            log.error("AI call failed", error=e)
+            raise
+        finally:
+            self.slots.release()
+            AI_CALL_SECONDS.observe(time.perf_counter() - started)
+        self.breaker.record_success()
+        AI_CALLS.inc(outcome='ok')
+        return text
+
+    def _forget(self, prompt, future):
+        with self.lock:
+            if self.inflight.get(prompt) is future:
+                del self.inflight[prompt]
+            QUEUE_DEPTH.set(len(self.inflight), queue='ai')
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
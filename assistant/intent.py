@@ -0,0 +1,184 @@
+"""
+Local Intent Engine
+Offline classifier for voice/text commands: picks an action
+(DISPENSE / TAKEN / ADD / NONE) and extracts the medication and time slots.
+Medication names come from the user's own Medication rows and are matched
+through a token index plus a trigram-filtered fuzzy match, so a command is
+resolved in-process in well under a few milliseconds.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+from config import Config
+
+# Keyword -> weight per action. Phrases are matched before single words.
+ACTION_PHRASES = {
+    'DISPENSE': {'dispense': 2.0, 'give me': 2.0, 'i need': 1.5, 'bring': 1.5, 'deliver': 1.5,
+                 'hand me': 1.5, 'open the drawer': 2.0, 'open drawer': 2.0, 'can i have': 1.5, 'want': 1.0},
+    'TAKEN': {'took': 2.0, 'taken': 2.0, 'i had': 1.5, 'already had': 2.0, 'swallowed': 2.0,
+              'mark': 1.0, 'done with': 1.5, 'finished': 1.5},
+    'ADD': {'add': 2.0, 'schedule': 1.5, 'remind me': 2.0, 'new medicine': 2.0, 'new medication': 2.0,
+            'set a reminder': 2.0, 'start taking': 1.5, 'prescribed': 1.5},
+    'NONE': {'what': 1.0, 'when': 1.0, 'how many': 1.5, 'left': 1.0, 'next': 1.0, 'which': 1.0,
+             'list': 1.0, 'hello': 1.0, 'thank': 1.0, 'weather': 1.0, 'stock': 1.0},
+}
+
+NAMED_TIMES = {'morning': 0, 'breakfast': 0, 'afternoon': 1, 'lunch': 1, 'noon': 1,
+               'evening': 2, 'dinner': 2, 'night': 2, 'bedtime': 2}
+
+# Contractions arrive tokenized ("haven't" -> "haven t"), hence the "n t" form
+NEGATION_PATTERN = re.compile(r"\b(?:not|never|no|cannot|dont|didnt|havent|hasnt|doesnt|wont|cant|[a-z]+n t)\b")
+# Questions about the user's own state or schedule; polite requests ("can I have...") are not among them
+QUESTION_PATTERN = re.compile(r'^(?:have|has|did|do|does|is|are|was|were|am|should|shall|when|what|which|how|why|where|who)\b')
+
+TIME_PATTERN = re.compile(r'\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)?(?=\W|$)')
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+NEW_NAME_PATTERN = re.compile(
+    r'\b(?:add|schedule|start taking|remind me to take|prescribed)\s+(?:a\s+|an\s+|my\s+|new\s+)*'
+    r'([a-z][a-z0-9\- ]*?)(?=\s+(?:at|in|every|for|tomorrow|tonight|daily|each)\b|[.,!?]|$)')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IntentResult:
+    def __init__(self, action, confidence, medication=None, time=None, med_score=0.0, new_name=None,
+                 reason=None, demoted=None):
+        self.action = action
+        self.confidence = confidence
+        self.medication = medication
+        self.time = time
+        self.med_score = med_score
+        self.new_name = new_name  # ADD of a drug that is not on the roster yet
+        self.reason = reason  # 'negated' or 'question' when an action was turned into NONE
+        self.demoted = demoted  # The action the keywords pointed at before that
+
+    def to_dict(self):
+        return {'action': self.action, 'confidence': round(self.confidence, 3),
+                'medication': self.medication or self.new_name, 'time': self.time, 'reason': self.reason}
+
+
+class IntentEngine:
+    def __init__(self, medication_names):
+        self.medications = sorted({name for name in medication_names if name})
+        self.token_index = {}  # exact token -> med names
+        self.trigram_index = {}  # trigram -> med tokens
+        for name in self.medications:
+            for token in tokenize(name):
+                if len(token) < 3 or token.isdigit():
+                    continue
+                self.token_index.setdefault(token, set()).add(name)
+                for gram in trigrams(token):
+                    self.trigram_index.setdefault(gram, set()).add(token)
+
+    # ---------- slots ----------
+    def match_medication(self, tokens, min_ratio=0.75):
+        """Best medication for the utterance as (name, score)"""
+        best, best_score = None, 0.0
+        for token in tokens:
+            if len(token) < 3:
+                continue
+            exact = self.token_index.get(token)
+            if exact:
+                return sorted(exact)[0], 1.0
+            counts = {}
+            for gram in trigrams(token):
+                for candidate in self.trigram_index.get(gram, ()):
+                    counts[candidate] = counts.get(candidate, 0) + 1
+            # Only the few tokens sharing the most trigrams go through SequenceMatcher
+            for candidate in sorted(counts, key=counts.get, reverse=True)[:3]:
+                ratio = SequenceMatcher(None, token, candidate).ratio()
+                if ratio > best_score:
+                    best, best_score = sorted(self.token_index[candidate])[0], ratio
+        return (best, best_score) if best_score >= min_ratio else (None, 0.0)
+
+    def extract_time(self, text, tokens):
+        for match in TIME_PATTERN.finditer(text.lower()):
+            hour, minute, meridiem = int(match.group(1)), match.group(2), match.group(3)
+            # Bare numbers ("2 tablets") are only times when qualified
+            if minute is None and meridiem is None and not match.group(0).startswith('at'):
+                continue
+            if meridiem and meridiem.startswith('p') and hour < 12: hour += 12
+            if meridiem and meridiem.startswith('a') and hour == 12: hour = 0
+            if hour < 24 and int(minute or 0) < 60:
+                return f'{hour:02d}:{int(minute or 0):02d}'
+        for token in tokens:
+            if token in NAMED_TIMES:
+                return Config.MEDICINE_TIMES[NAMED_TIMES[token]]
+        return None
+
+    # ---------- classification ----------
+    def classify(self, text):
+        lowered = ' '.join(tokenize(text))
+        tokens = lowered.split()
+        scores = {action: 0.0 for action in ACTION_PHRASES}
+        for action, phrases in ACTION_PHRASES.items():
+            for phrase, weight in phrases.items():
+                if re.search(r'\b' + phrase + r'\b', lowered):
+                    scores[action] += weight
+
+        medication, med_score = self.match_medication(tokens)
+        time_slot = self.extract_time(text, tokens)
+        # Questions about a drug are lookups even if they mention "take"
+        if text.strip().endswith('?'):
+            scores['NONE'] += 1.0
+        if time_slot and scores['ADD'] > 0:
+            scores['ADD'] += 0.5
+
+        action = max(scores, key=scores.get)
+        # "I haven't taken aspirin", "do not give me aspirin", "have I taken aspirin today":
+        # the keywords name an action but the user is not asking for it
+        reason = None
+        if action != 'NONE' and scores[action] > 0:
+            if NEGATION_PATTERN.search(lowered):
+                reason = 'negated'
+            elif QUESTION_PATTERN.match(lowered) or (action != 'DISPENSE' and text.strip().endswith('?')):
+                reason = 'question'
+        if reason:
+            return IntentResult('NONE', 1.0, medication, time_slot, med_score, reason=reason, demoted=action)
+        new_name = None
+        if action == 'ADD' and medication is None:
+            found = NEW_NAME_PATTERN.search(text.lower())
+            if found:
+                new_name = found.group(1).strip().title()
+                med_score = 0.8
+        total = sum(scores.values())
+        if total == 0:
+            return IntentResult('NONE', 0.2, medication, time_slot, med_score, new_name)
+
+        confidence = scores[action] / total
+        # Actions that need a drug are only trustworthy when one was found
+        if action in ('DISPENSE', 'TAKEN', 'ADD'):
+            confidence *= 0.5 + 0.5 * med_score
+        if action == 'ADD' and not time_slot:
+            confidence *= 0.7
+        return IntentResult(action, min(confidence, 1.0), medication, time_slot, med_score, new_name)
+
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def engine_for(medication_names, max_cached=64):
+    """Engines are cached by the set of names, so indexes are built once per roster"""
+    key = tuple(sorted(set(medication_names)))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            _engines.move_to_end(key)
+            return engine
+    engine = IntentEngine(key)
+    with _engines_lock:
+        _engines[key] = engine
+        while len(_engines) > max_cached:
+            _engines.popitem(last=False)
+    return engine
@@ -0,0 +1,101 @@
+"""
+Admission control load test: SOS (panic button) latency while many clients
+hammer the dashboard's poll endpoints, with priority admission off and on.
+Polls beyond their share queue briefly and are shed with 503 (the pollers
+back off for far less than Retry-After, to keep the pressure on); the SOS
+route is never queued, so its p99 should stay close to the idle baseline.
+"""
+
+import threading
+import time
+
+from benchmarks.common import load_app, summarize
+from extensions.admission import AdmissionController
+
+POLL_ENDPOINTS = ['/api/schedule', '/api/stats', '/api/inventory', '/api/vitals/current']
+
+
+def logged_in_client(robo_app, username):
+    client = robo_app.app.test_client()
+    client.post('/login', data={'username': username, 'password': 'bench'})
+    return client
+
+
+def sos_latencies(client, count, interval):
+    samples = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        res = client.post('/api/request', json={'type': 'help'})
+        samples.append(time.perf_counter() - t0)
+        assert res.status_code == 200, res.status_code
+        time.sleep(interval)
+    return samples
+
+
+def saturate(clients, sos_client, sos_count, sos_interval, backoff=0.1):
+    stop = threading.Event()
+    tallies = []
+
+    def poller(i, client):
+        tally = {'ok': 0, 'shed': 0}
+        tallies.append(tally)
+        n = i
+        while not stop.is_set():
+            res = client.get(POLL_ENDPOINTS[n % len(POLL_ENDPOINTS)])
+            n += 1
+            if res.status_code == 503:
+                assert res.headers['Retry-After']
+                tally['shed'] += 1
+                time.sleep(backoff)
+            else:
+                tally['ok'] += 1
+
+    threads = [threading.Thread(target=poller, args=(i, client), daemon=True) for i, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)  # Let the pollers ramp up
+    started = time.perf_counter()
+    samples = sos_latencies(sos_client, sos_count, sos_interval)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'sos': summarize(samples),
+        'polls_per_s': round(sum(t['ok'] for t in tallies) / elapsed, 1),
+        'polls_shed_per_s': round(sum(t['shed'] for t in tallies) / elapsed, 1),
+    }
+
+
+def run(poll_threads=32, sos_count=60, sos_interval=0.02, capacity=4):
+    robo_app = load_app()
+    username = 'admission-user'
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'bench'})
+    client.get('/seed_full_day')
+
+    admission = robo_app.admission
+    original = (admission.enabled, admission.controller)
+    try:
+        admission.enabled = False
+        clients = [logged_in_client(robo_app, username) for _ in range(poll_threads)]
+        idle = summarize(sos_latencies(client, sos_count, sos_interval))
+        unprotected = saturate(clients, client, sos_count, sos_interval)
+
+        # A small budget, as on a Pi-class robot where a handful of busy threads saturate the CPU
+        admission.enabled = True
+        admission.controller = AdmissionController(
+            capacity=capacity, reserved={'emergency': 1, 'dispense': 1, 'write': 1},
+            max_wait={'dispense': 5.0, 'write': 2.0, 'poll': 0.25, 'stream': 0},
+            max_queue={'dispense': 64, 'write': 32, 'poll': capacity * 2, 'stream': 0}, max_streams=1)
+        protected = saturate(clients, client, sos_count, sos_interval)
+    finally:
+        admission.enabled, admission.controller = original
+
+    return {
+        'poll_threads': poll_threads,
+        'idle_sos': idle,
+        'saturated_without_admission': unprotected,
+        'saturated_with_admission': protected,
+        'sos_p99_vs_idle': round(protected['sos']['p99_ms'] / max(idle['p99_ms'], 1e-6), 2),
+    }
@@ -0,0 +1,76 @@
+"""
+AI executor benchmark against the fake model server: caller latency with a
+slow upstream tail (direct call vs bounded executor), coalescing of identical
+prompts, and how fast the circuit breaker cuts over to the fallback once the
+upstream stalls.
+"""
+
+import threading
+import time
+
+from assistant.executor import AIExecutor, AIUnavailable, CircuitBreaker
+from benchmarks.common import summarize
+from benchmarks.fake_model_server import FakeModelClient, FakeModelServer
+
+
+def fire(call, callers, per_caller, prompt_for):
+    """Run `callers` threads, each making `per_caller` calls; returns (samples, errors, elapsed)"""
+    samples, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(idx):
+        for n in range(per_caller):
+            t0 = time.perf_counter()
+            try:
+                call(prompt_for(idx, n))
+            except AIUnavailable:
+                with lock:
+                    errors[0] += 1
+            with lock:
+                samples.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, errors[0], time.perf_counter() - started
+
+
+def run(callers=8, per_caller=10, latency=0.02, slow_latency=1.0, slow_ratio=0.1, timeout=0.25):
+    server = FakeModelServer(latency, slow_latency, slow_ratio).start()
+    client = FakeModelClient(server.url)
+    unique = lambda i, n: f'caller {i} command {n}'
+    try:
+        direct, _, direct_elapsed = fire(lambda p: client.generate_content(p).text, callers, per_caller, unique)
+
+        executor = AIExecutor(lambda p: client.generate_content(p).text, max_concurrency=4, timeout=timeout,
+                              breaker=CircuitBreaker(failure_threshold=10 ** 6))
+        bounded, fallbacks, bounded_elapsed = fire(executor.generate, callers, per_caller, unique)
+        executor.shutdown()
+
+        # Everyone asks the same thing at once: one upstream call per burst
+        server.slow_ratio = 0.0
+        calls_before = server.calls
+        executor = AIExecutor(lambda p: client.generate_content(p).text, max_concurrency=4, timeout=timeout)
+        fire(executor.generate, callers, 1, lambda i, n: 'what is my next medicine')
+        coalesced_upstream = server.calls - calls_before
+        executor.shutdown()
+
+        # Upstream stalls: after the breaker opens, callers get the fallback immediately
+        server.latency = slow_latency
+        executor = AIExecutor(lambda p: client.generate_content(p).text, max_concurrency=4, timeout=timeout,
+                              breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+        stalled, stalled_errors, stalled_elapsed = fire(executor.generate, 1, per_caller, unique)
+        executor.shutdown()
+    finally:
+        server.stop()
+
+    return {
+        'upstream': {'latency_ms': latency * 1000, 'slow_latency_ms': slow_latency * 1000, 'slow_ratio': slow_ratio},
+        'direct': summarize(direct, direct_elapsed),
+        'executor': dict(summarize(bounded, bounded_elapsed), fallbacks=fallbacks, timeout_ms=timeout * 1000),
+        'coalescing': {'callers': callers, 'upstream_calls': coalesced_upstream},
+        'breaker_open': dict(summarize(stalled, stalled_elapsed), fallbacks=stalled_errors),
+    }
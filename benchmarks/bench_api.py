@@ -0,0 +1,74 @@
+"""
+Web API benchmark: concurrent simulated dashboards polling the same endpoints
+the browser does, plus task toggles, against a freshly seeded database.
+"""
+
+import random
+import threading
+import time
+
+from benchmarks.common import load_app, summarize
+
+POLL_ENDPOINTS = ['/api/schedule', '/api/inventory', '/api/stats']
+
+
+def create_dashboard(robo_app, index):
+    """Register a user, seed it through /seed_full_day and return a logged-in client"""
+    client = robo_app.app.test_client()
+    username = f'bench-user-{index}'
+    client.post('/register', data={'username': username, 'password': 'bench'})
+    client.get('/seed_full_day')
+    med_ids = [item['id'] for item in client.get('/api/schedule').get_json()]
+    return client, med_ids
+
+
+def run(dashboards=8, rounds=25, toggle_ratio=0.1, seed=1234):
+    """
+    Args:
+        dashboards (int): Concurrent simulated dashboard tabs
+        rounds (int): Poll rounds per dashboard (one round hits every endpoint)
+        toggle_ratio (float): Chance per round of also toggling a dose
+    """
+    robo_app = load_app()
+    clients = [create_dashboard(robo_app, i) for i in range(dashboards)]
+
+    samples = {endpoint: [] for endpoint in POLL_ENDPOINTS + ['/api/task/toggle']}
+    errors = []
+    lock = threading.Lock()
+
+    def dashboard_loop(client, med_ids, rng):
+        local = {endpoint: [] for endpoint in samples}
+        for _ in range(rounds):
+            for endpoint in POLL_ENDPOINTS:
+                t0 = time.perf_counter()
+                res = client.get(endpoint)
+                local[endpoint].append(time.perf_counter() - t0)
+                if res.status_code != 200:
+                    errors.append((endpoint, res.status_code))
+            if med_ids and rng.random() < toggle_ratio:
+                t0 = time.perf_counter()
+                res = client.post('/api/task/toggle', json={'id': rng.choice(med_ids)})
+                local['/api/task/toggle'].append(time.perf_counter() - t0)
+                if res.status_code != 200:
+                    errors.append(('/api/task/toggle', res.status_code))
+        with lock:
+            for endpoint, values in local.items():
+                samples[endpoint].extend(values)
+
+    threads = [
+        threading.Thread(target=dashboard_loop, args=(client, med_ids, random.Random(seed + i)))
+        for i, (client, med_ids) in enumerate(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+
+    all_samples = [s for values in samples.values() for s in values]
+    return {
+        'dashboards': dashboards,
+        'rounds': rounds,
+        'errors': len(errors),
+        'overall': summarize(all_samples, elapsed),
+        'endpoints': {endpoint: summarize(values, elapsed) for endpoint, values in samples.items()},
+    }
@@ -0,0 +1,69 @@
+"""
+Static asset benchmark: bytes and requests for a cold and a repeat load of
+each page, raw /static files versus the fingerprinted, precompressed build.
+"""
+
+import re
+
+from benchmarks.common import load_app
+
+PAGES = ['/', '/dashboard', '/map', '/history', '/logs']  # '/' is fetched logged out (landing page)
+LOCAL_ASSET = re.compile(r'(?:src|href)="(/(?:static|assets)/[^"]+\.(?:js|css))"')
+
+
+def page_assets(client, page):
+    return LOCAL_ASSET.findall(client.get(page).get_data(as_text=True))
+
+
+def load(client, urls, cache):
+    """
+    One page load through a browser-like cache: immutable entries are reused
+    without a request, others are revalidated with If-None-Match.
+    Returns (requests, bytes_transferred).
+    """
+    requests = transferred = 0
+    for url in urls:
+        entry = cache.get(url)
+        if entry and 'immutable' in entry['cache_control']:
+            continue
+        headers = {'Accept-Encoding': 'gzip, br'}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        res = client.get(url, headers=headers)
+        requests += 1
+        transferred += len(res.get_data())
+        if res.status_code == 200:
+            cache[url] = {'etag': res.headers.get('ETag'), 'cache_control': res.headers.get('Cache-Control', '')}
+    return requests, transferred
+
+
+def measure(client, anonymous):
+    report = {}
+    for page in PAGES:
+        urls = page_assets(anonymous if page == '/' else client, page)
+        cache = {}
+        cold = load(client, urls, cache)
+        warm = load(client, urls, cache)
+        report[page] = {'assets': len(urls), 'cold_requests': cold[0], 'cold_bytes': cold[1],
+                        'repeat_requests': warm[0], 'repeat_bytes': warm[1]}
+    return report
+
+
+def run():
+    robo_app = load_app()
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'assets-user', 'password': 'bench'})
+    anonymous = robo_app.app.test_client()
+
+    robo_app.assets.manifest = None
+    raw = measure(client, anonymous)
+    robo_app.assets.build()
+    built = measure(client, anonymous)
+
+    totals = lambda report, key: sum(page[key] for page in report.values())
+    return {
+        'raw': raw,
+        'pipeline': built,
+        'cold_bytes': {'raw': totals(raw, 'cold_bytes'), 'pipeline': totals(built, 'cold_bytes')},
+        'repeat_requests': {'raw': totals(raw, 'repeat_requests'), 'pipeline': totals(built, 'repeat_requests')},
+    }
@@ -0,0 +1,79 @@
+"""
+Online backup benchmark: latency of small write transactions (like a dose
+toggle) while a snapshot runs, for the paged online backup, a single-step
+online backup and the old approach of copying the file under a write lock.
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import WORKSPACE, summarize
+from database.backup import online_copy, snapshot
+from database.engine import create_storage_engine, sqlite_url
+
+
+def fill(engine, megabytes):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, ts REAL, payload TEXT)'))
+        payload = 'x' * 900
+        rows = [{'ts': time.time(), 'payload': payload} for _ in range(1000)]
+        for _ in range(megabytes):
+            conn.execute(text('INSERT INTO events (ts, payload) VALUES (:ts, :payload)'), rows)
+
+
+def locked_copy(source_path, target_path):
+    """The naive way: hold the database's write lock for the whole file copy"""
+    conn = sqlite3.connect(source_path, timeout=30)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        shutil.copyfile(source_path, target_path)
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def writes_during(engine, backup, interval):
+    """Runs `backup` while a writer commits one small row every `interval` seconds"""
+    stop = threading.Event()
+    samples = []
+
+    def writer():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(text('INSERT INTO events (ts, payload) VALUES (:ts, :p)'), {'ts': time.time(), 'p': 'w'})
+            samples.append(time.perf_counter() - t0)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    result = backup() or {}
+    backup_seconds = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    return dict(summarize(samples), backup_s=round(backup_seconds, 3),
+                **{k: result[k] for k in ('steps', 'restarts', 'single_step', 'pinned', 'bytes') if k in result})
+
+
+def run(megabytes=40, interval=0.005):
+    path = os.path.join(WORKSPACE, 'backup-bench.db')
+    engine = create_storage_engine(sqlite_url(path))
+    fill(engine, megabytes)
+    backup_dir = os.path.join(WORKSPACE, 'backup-bench')
+    copy_path = os.path.join(WORKSPACE, 'backup-bench-copy.db')
+
+    results = {'database_mb': round(os.path.getsize(path) / 1e6, 1)}
+    results['baseline'] = writes_during(engine, lambda: time.sleep(1.0), interval)
+    results['online_paged'] = writes_during(engine, lambda: snapshot(path, 'bench', backup_dir), interval)
+    results['online_single_step'] = writes_during(engine, lambda: online_copy(path, copy_path, pages=-1), interval)
+    results['locked_file_copy'] = writes_during(engine, lambda: locked_copy(path, copy_path), interval)
+    results['snapshot_ratio'] = round(results['online_paged']['bytes'] / os.path.getsize(path), 3)
+    engine.dispose()
+    return results
@@ -0,0 +1,54 @@
+"""
+Bulk onboarding benchmark: a care home roster imported through
+/api/setup/import in replace mode, then re-applied in diff mode with a
+handful of changes.
+"""
+
+import csv
+import io
+import random
+import time
+
+from benchmarks.common import load_app
+from database.bulk_import import CSV_COLUMNS
+
+DRUGS = ['Metformin', 'Aspirin', 'Omeprazole', 'Atorvastatin', 'Vitamin D3', 'Amoxicillin', 'Lisinopril']
+TIMES = ['08:00', '13:00', '20:00']
+
+
+def build_roster_csv(residents, meds_per_resident, rng):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for r in range(residents):
+        for drug, time_slot in rng.sample([(d, t) for d in DRUGS for t in TIMES], meds_per_resident):
+            writer.writerow([f'Resident {r:04d}', drug, '1 tab', rng.randint(10, 90), time_slot, '', 'Daily', 'All'])
+    return buffer.getvalue()
+
+
+def run(residents=300, meds_per_resident=4, changes=10, seed=5):
+    robo_app = load_app()
+    rng = random.Random(seed)
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'bulk-user', 'password': 'bench'})
+
+    roster = build_roster_csv(residents, meds_per_resident, rng)
+    t0 = time.perf_counter()
+    replace = client.post('/api/setup/import?mode=replace', data=roster, content_type='text/csv').get_json()
+    replace_s = time.perf_counter() - t0
+
+    lines = roster.splitlines()
+    for i in rng.sample(range(1, len(lines)), changes):
+        cells = lines[i].split(',')
+        cells[3] = str(int(cells[3]) + 1)
+        lines[i] = ','.join(cells)
+    t0 = time.perf_counter()
+    diff = client.post('/api/setup/import?mode=diff', data='\n'.join(lines) + '\n', content_type='text/csv').get_json()
+    diff_s = time.perf_counter() - t0
+
+    return {
+        'residents': residents,
+        'medications': residents * meds_per_resident,
+        'replace': {'seconds': round(replace_s, 4), **replace},
+        'diff': {'seconds': round(diff_s, 4), **diff},
+    }
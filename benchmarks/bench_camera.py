@@ -0,0 +1,19 @@
+"""
+Camera pipeline benchmark: times CameraStream.capture_frame (colour convert,
+optional privacy blur, resize and JPEG encode) fed by a synthetic source.
+"""
+
+from benchmarks.common import summarize, time_calls
+from hardware.sources import SyntheticFrameSource
+
+
+def run(frames=150):
+    from hardware.camera_stream import CameraStream
+
+    stream = CameraStream(source=SyntheticFrameSource())
+    results = {}
+    for privacy in (False, True):
+        stream.privacy_mode = privacy
+        samples, elapsed = time_calls(stream.capture_frame, frames)
+        results['privacy' if privacy else 'plain'] = summarize(samples, elapsed)
+    return results
@@ -0,0 +1,140 @@
+"""
+Storage contention benchmark: a hardware vitals loop and dashboard writers
+hitting one SQLite file at the same time, through
+    legacy  - raw sqlite3 connections (rollback journal) next to a separate
+              SQLAlchemy engine, as DatabaseManager and the web app used to
+    unified - the shared WAL engine with the process write lock
+Reports "database is locked" failures and per-operation stall percentiles.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.common import WORKSPACE, summarize
+from database.engine import create_storage_engine, sqlite_url
+from database.migrations import migrate
+
+DASHBOARD_SQL = [
+    "SELECT heart_rate, spo2 FROM vitals_log ORDER BY timestamp DESC LIMIT 200",
+    "UPDATE robot_status SET battery_level = :battery, last_update = :now WHERE id = 1",
+    "UPDATE inventory SET quantity = quantity + 0, last_updated = :now WHERE item = 'Water'",
+]
+VITALS_SQL = ("INSERT INTO vitals_log (timestamp, heart_rate, spo2, temperature, alert_triggered) "
+              "VALUES (:now, :hr, :spo2, :temp, 0)")
+
+
+def fresh_db(name):
+    path = os.path.join(WORKSPACE, name)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_storage_engine(sqlite_url(path))
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO robot_status (id) VALUES (1)"))
+        conn.execute(text("INSERT INTO inventory (item, quantity) VALUES ('Water', 8)"))
+    engine.dispose()
+    return path
+
+
+def legacy_paths(path, busy_timeout):
+    """(vitals_write, dashboard_txn) over the old split access paths"""
+    # Undo the WAL switch fresh_db's engine made; the old code never enabled it
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+    web_engine = create_engine(sqlite_url(path), connect_args={'timeout': busy_timeout})
+
+    def vitals_write(params):
+        conn = sqlite3.connect(path, timeout=busy_timeout)
+        try:
+            conn.execute(VITALS_SQL, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def dashboard_txn(params):
+        with web_engine.begin() as conn:
+            for sql in DASHBOARD_SQL:
+                conn.execute(text(sql), params)
+
+    return vitals_write, dashboard_txn, web_engine
+
+
+def unified_paths(path, busy_timeout):
+    engine = create_storage_engine(sqlite_url(path), busy_timeout=busy_timeout)
+
+    def vitals_write(params):
+        with engine.begin() as conn:
+            conn.execute(text(VITALS_SQL), params)
+
+    def dashboard_txn(params):
+        with engine.begin() as conn:
+            for sql in DASHBOARD_SQL:
+                conn.execute(text(sql), params)
+
+    return vitals_write, dashboard_txn, engine
+
+
+def drive(vitals_write, dashboard_txn, vitals_threads, dashboard_threads, seconds, seed):
+    samples = {'vitals': [], 'dashboard': []}
+    errors = {'vitals': 0, 'dashboard': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    barrier = threading.Barrier(vitals_threads + dashboard_threads)
+
+    def worker(kind, fn, rng):
+        barrier.wait()
+        while not stop.is_set():
+            params = {'now': datetime.now().isoformat(), 'hr': rng.randint(55, 130), 'spo2': rng.randint(88, 100),
+                      'temp': round(rng.uniform(36.0, 38.5), 1), 'battery': rng.randint(20, 100)}
+            t0 = time.perf_counter()
+            try:
+                fn(params)
+                ok = True
+            except OperationalError as e:
+                ok = 'locked' not in str(e)
+            except sqlite3.OperationalError as e:
+                ok = 'locked' not in str(e)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                if ok:
+                    samples[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+
+    workers = [threading.Thread(target=worker, args=('vitals', vitals_write, random.Random(seed + i)))
+               for i in range(vitals_threads)]
+    workers += [threading.Thread(target=worker, args=('dashboard', dashboard_txn, random.Random(seed + 100 + i)))
+                for i in range(dashboard_threads)]
+    for t in workers: t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers: t.join()
+
+    return {
+        'locked_errors': errors['vitals'] + errors['dashboard'],
+        'vitals': dict(summarize(samples['vitals'], seconds), locked_errors=errors['vitals']),
+        'dashboard': dict(summarize(samples['dashboard'], seconds), locked_errors=errors['dashboard']),
+    }
+
+
+def run(vitals_threads=4, dashboard_threads=4, seconds=5.0, busy_timeout=0.2, seed=3):
+    """
+    Args:
+        busy_timeout (float): SQLite busy timeout for both paths; kept short so
+            contention shows up as errors instead of multi-second stalls
+    """
+    report = {}
+    for name, paths in (('legacy', legacy_paths), ('unified', unified_paths)):
+        vitals_write, dashboard_txn, engine = paths(fresh_db(f'contention-{name}.db'), busy_timeout)
+        report[name] = drive(vitals_write, dashboard_txn, vitals_threads, dashboard_threads, seconds, seed)
+        engine.dispose()
+    return report
@@ -0,0 +1,21 @@
+"""
+DatabaseManager benchmark: sustained log_vitals ingest throughput.
+"""
+
+import os
+import random
+
+from benchmarks.common import WORKSPACE, summarize, time_calls
+
+
+def run(samples=500, seed=7):
+    from database.db_manager import DatabaseManager
+
+    manager = DatabaseManager(db_path=os.path.join(WORKSPACE, 'vitals.db'))
+    rng = random.Random(seed)
+
+    def ingest():
+        manager.log_vitals(rng.randint(55, 130), rng.randint(88, 100), round(rng.uniform(36.0, 38.5), 1))
+
+    latencies, elapsed = time_calls(ingest, samples)
+    return {'log_vitals': summarize(latencies, elapsed)}
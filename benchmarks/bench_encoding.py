@@ -0,0 +1,108 @@
+"""
+Response encoding benchmark: body size and serialization CPU time per API
+endpoint for the previous jsonify path against columnar JSON and
+MessagePack, each with and without gzip/zstd. Sizes come from real requests;
+CPU time is the serializer alone, run on the endpoint's own rows inside a
+request context.
+"""
+
+import json
+import random
+
+from flask import jsonify
+
+from benchmarks.common import load_app, summarize, time_calls
+from extensions import encoding
+
+TABLES = {
+    '/api/schedule': 'SCHEDULE_FIELDS',
+    '/api/inventory': 'INVENTORY_FIELDS',
+    '/api/vitals/history?limit={vitals}': None,  # Columns of vitals_log, in table order
+}
+MAP_ENDPOINT = '/api/map/load'
+
+
+def formats():
+    offered = {'json': encoding.JSON, 'columns': encoding.COLUMNS}
+    if encoding.msgpack is not None:
+        offered['msgpack'] = encoding.MSGPACK
+    return offered
+
+
+def codings():
+    return ['gzip'] + (['zstd'] if encoding.zstandard is not None else [])
+
+
+def seed(robo_app, client, vitals, map_size):
+    client.post('/register', data={'username': 'encoding-user', 'password': 'bench'})
+    client.get('/seed_full_day')
+    rng = random.Random(7)
+    db = robo_app.get_fleet().db
+    for _ in range(vitals):
+        db.log_vitals(rng.randint(55, 110), rng.randint(90, 100), round(rng.uniform(36.0, 38.5), 1))
+    grid = [[1 if rng.random() < 0.2 else 0 for _ in range(map_size)] for _ in range(map_size)]
+    client.post('/api/map/save', json={'grid': grid})
+
+
+def sizes(client, endpoint):
+    """Body bytes per format: identity, then compressed with each available coding"""
+    report = {}
+    for name, accept in formats().items():
+        res = client.get(endpoint, headers={'Accept': accept})
+        assert res.status_code == 200, (endpoint, res.status_code)
+        row = {'bytes': len(res.data)}
+        for coding in codings():
+            row[coding] = len(client.get(endpoint, headers={'Accept': accept, 'Accept-Encoding': coding}).data)
+        report[name] = row
+    return report
+
+
+def cpu(app, fn, accept, iterations):
+    with app.test_request_context(headers={'Accept': accept}):
+        samples, elapsed = time_calls(fn, iterations)
+    return summarize(samples, elapsed)
+
+
+def table_cpu(app, table, iterations):
+    """Legacy: a dict per row then jsonify, as the views did. New: respond() per format, then compression"""
+    report = {'jsonify': cpu(app, lambda: jsonify(table.dicts()), encoding.JSON, iterations)}
+    for name, accept in formats().items():
+        report[name] = cpu(app, lambda: encoding.respond(table), accept, iterations)
+    with app.test_request_context(headers={'Accept': encoding.COLUMNS}):
+        body = encoding.respond(table).get_data()
+    for coding in codings():
+        report[f'columns_{coding}'] = summarize(*time_calls(lambda: encoding.compress(body, coding), iterations))
+    return report
+
+
+def run(vitals=1000, map_size=100, iterations=200):
+    robo_app = load_app()
+    app = robo_app.app
+    client = app.test_client()
+    seed(robo_app, client, vitals, map_size)
+
+    results = {}
+    for template, fields_name in TABLES.items():
+        endpoint = template.format(vitals=vitals)
+        rows = client.get(endpoint).get_json()
+        fields = getattr(robo_app, fields_name) if fields_name else robo_app.get_fleet().db.get_recent_vitals_rows(1)[0]
+        table = encoding.Table(fields, [tuple(row[f] for f in fields) for row in rows])
+        results[endpoint] = {'rows': len(rows), 'bytes': sizes(client, endpoint),
+                             'cpu': table_cpu(app, table, iterations)}
+
+    with app.test_request_context():
+        from flask_login import login_user
+        login_user(robo_app.User.query.filter_by(username='encoding-user').first())
+        grid_json = robo_app.find_map().grid_data
+    results[MAP_ENDPOINT] = {
+        'cells': map_size * map_size,
+        'bytes': sizes(client, MAP_ENDPOINT),
+        'cpu': {
+            'jsonify': cpu(app, lambda: jsonify({'success': True, 'grid': json.loads(grid_json)}),
+                           encoding.JSON, iterations),
+            # What load_map now does for JSON clients: the stored text, unparsed
+            'spliced': cpu(app, lambda: app.response_class(f'{{"grid":{grid_json},"success":true}}\n',
+                                                           mimetype='application/json'), encoding.JSON, iterations),
+        },
+    }
+    return results
@@ -0,0 +1,21 @@
+"""
+Fleet fan-out benchmark: /api/fleet latency as the number of registered
+robots grows, to check status serving stays linear.
+"""
+
+from benchmarks.common import load_app, summarize, time_calls
+
+
+def run(fleet_sizes=(1, 12, 48), polls=50):
+    robo_app = load_app()
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'fleet-user', 'password': 'bench'})
+    fleet = robo_app.get_fleet()
+
+    results = {}
+    for size in fleet_sizes:
+        while len(fleet.all()) < size:
+            fleet.register(f'bench-robot-{len(fleet.all()) + 1}')
+        samples, elapsed = time_calls(lambda: client.get('/api/fleet'), polls)
+        results[f'{size}_robots'] = summarize(samples, elapsed)
+    return results
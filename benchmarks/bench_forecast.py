@@ -0,0 +1,56 @@
+"""
+Inventory forecast benchmark: nightly rebuild across many users, the
+incremental per-dispense update, and a cached inventory read.
+"""
+
+import random
+import time
+
+from analytics.forecast import InventoryForecaster, StockRow
+from benchmarks.common import summarize, time_calls
+
+DRUGS = ['Omeprazole', 'Metformin', 'Amoxicillin', 'Aspirin', 'Vitamin D3', 'Atorvastatin', 'Lisinopril']
+
+
+def make_rows(users, meds_per_user):
+    rows, med_id = [], 0
+    for user_id in range(1, users + 1):
+        for _ in range(meds_per_user):
+            med_id += 1
+            daily = random.random() < 0.8
+            rows.append(StockRow(med_id, user_id, user_id, f'Patient {user_id}', random.choice(DRUGS), '500mg',
+                                 random.randint(0, 90), 90, 'Daily' if daily else 'Custom',
+                                 None if daily else 'Mon,Wed,Fri', None, ''))
+    return rows
+
+
+def run(users=500, meds_per_user=9, updates=2000):
+    random.seed(11)
+    rows = make_rows(users, meds_per_user)
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row.user_id, []).append(row)
+    forecaster = InventoryForecaster(lambda user_id=None: rows if user_id is None else by_user[user_id])
+
+    t0 = time.perf_counter()
+    forecaster.rebuild_all()
+    rebuild_s = time.perf_counter() - t0
+
+    picks = [random.choice(rows) for _ in range(updates)]
+    samples = []
+    started = time.perf_counter()
+    for row in picks:
+        t0 = time.perf_counter()
+        forecaster.update_stock(row.user_id, row.med_id, max(row.stock - 1, 0), None)
+        samples.append(time.perf_counter() - t0)
+    update_elapsed = time.perf_counter() - started
+
+    read_samples, read_elapsed = time_calls(lambda: forecaster.for_user(random.randint(1, users)), updates)
+    return {
+        'users': users,
+        'medications': len(rows),
+        'nightly_rebuild_ms': round(rebuild_s * 1000, 3),
+        'flagged': len(forecaster.low_stock()),
+        'dispense_update': summarize(samples, update_elapsed),
+        'inventory_read': summarize(read_samples, read_elapsed),
+    }
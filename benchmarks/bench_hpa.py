@@ -0,0 +1,94 @@
+"""
+Hierarchical planner benchmark on a generated care facility: floors of
+rooms with doorways, linked by elevators. Compares HPA* query latency for
+routes inside one room, across one floor and across the building, against
+flat A* on the same floor, and reports how much longer HPA* routes are.
+"""
+
+import random
+import time
+
+from benchmarks.common import summarize
+from navigation.astar import find_path
+from navigation.hpa import HierarchicalMap
+
+
+def generate_floor(cols, rows, room, rng):
+    """Rooms of `room` cells separated by walls, each wall with one doorway at a random spot"""
+    grid = [[0] * rows for _ in range(cols)]
+    for x in range(room, cols, room):
+        for y in range(rows):
+            grid[x][y] = 1
+        for y0 in range(0, rows, room):
+            grid[x][min(y0 + rng.randrange(1, room), rows - 1)] = 0
+    for y in range(room, rows, room):
+        for x in range(cols):
+            if grid[x][y] == 0 and x % room:
+                grid[x][y] = 1
+        for x0 in range(0, cols, room):
+            grid[min(x0 + rng.randrange(1, room), cols - 1)][y] = 0
+    return grid
+
+
+def generate_building(floors, cols, rows, room, rng):
+    grids = [generate_floor(cols, rows, room, rng) for _ in range(floors)]
+    shafts = []
+    for x, y in ((1, 1), (cols - 2, rows - 2)):
+        for grid in grids:
+            grid[x][y] = 0
+        shafts.append([(f, x, y) for f in range(floors)])
+    return {'floors': grids, 'elevators': shafts}
+
+
+def random_cell(building, rng, floor=None, near=None, radius=None):
+    grids = building['floors']
+    while True:
+        f = rng.randrange(len(grids)) if floor is None else floor
+        if near:
+            x = near[1] + rng.randint(-radius, radius)
+            y = near[2] + rng.randint(-radius, radius)
+        else:
+            x, y = rng.randrange(len(grids[f])), rng.randrange(len(grids[f][0]))
+        if 0 <= x < len(grids[f]) and 0 <= y < len(grids[f][0]) and grids[f][x][y] == 0:
+            return f, x, y
+
+
+def time_queries(plan, pairs):
+    samples, lengths = [], []
+    started = time.perf_counter()
+    for start, end in pairs:
+        t0 = time.perf_counter()
+        path = plan(start, end)
+        samples.append(time.perf_counter() - t0)
+        lengths.append(len(path))
+    return summarize(samples, time.perf_counter() - started), lengths
+
+
+def run(floors=3, cols=240, rows=160, room=12, queries=30, seed=7):
+    rng = random.Random(seed)
+    building = generate_building(floors, cols, rows, room, rng)
+
+    t0 = time.perf_counter()
+    planner = HierarchicalMap.from_map(building)
+    build_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    intra_room = []
+    for _ in range(queries):
+        start = random_cell(building, rng)
+        intra_room.append((start, random_cell(building, rng, start[0], start, room // 3)))
+    same_floor = [(random_cell(building, rng, 0), random_cell(building, rng, 0)) for _ in range(queries)]
+    cross_building = [(random_cell(building, rng, 0), random_cell(building, rng, floors - 1)) for _ in range(queries)]
+
+    grid = building['floors'][0]
+    flat_plan = lambda start, end: find_path(grid, start[1:], end[1:])
+    results = {'build_ms': build_ms, **planner.stats()}
+    for name, pairs in (('intra_room', intra_room), ('same_floor', same_floor), ('cross_building', cross_building)):
+        results[name], _ = time_queries(planner.find_path, pairs)
+
+    flat, flat_lengths = time_queries(flat_plan, same_floor)
+    _, hpa_lengths = time_queries(planner.find_path, same_floor)
+    results['same_floor_flat_astar'] = flat
+    ratios = [h / f for h, f in zip(hpa_lengths, flat_lengths) if f]
+    results['same_floor_path_overhead'] = round(sum(ratios) / len(ratios) - 1, 4) if ratios else None
+    results['cross_vs_intra_p50'] = round(results['cross_building']['p50_ms'] / max(results['intra_room']['p50_ms'], 1e-6), 2)
+    return results
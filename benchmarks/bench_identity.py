@@ -0,0 +1,58 @@
+"""
+Identity cache benchmark: SQL statements and latency per dashboard poll with
+the session identity cache versus the previous loader (an ORM User fetched on
+every request, patients and medications lazy-loaded from it).
+"""
+
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import load_app, summarize
+from database.engine import get_engine
+
+POLL_ENDPOINTS = ['/api/schedule', '/api/vitals/current', '/api/alerts', '/api/fleet', '/api/stats']
+
+
+def poll(client, rounds, counter):
+    per_endpoint = {}
+    for endpoint in POLL_ENDPOINTS:
+        samples, statements = [], 0
+        for _ in range(rounds):
+            before = counter[0]
+            t0 = time.perf_counter()
+            res = client.get(endpoint)
+            samples.append(time.perf_counter() - t0)
+            assert res.status_code == 200, (endpoint, res.status_code)
+            statements += counter[0] - before
+        per_endpoint[endpoint] = dict(summarize(samples), statements_per_request=round(statements / rounds, 2))
+    return per_endpoint
+
+
+def run(rounds=50):
+    robo_app = load_app()
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'identity-user', 'password': 'bench'})
+    client.get('/seed_full_day')
+
+    counter = [0]
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+    event.listen(get_engine(), 'before_cursor_execute', count)
+
+    try:
+        cached = poll(client, rounds, counter)
+        robo_app.login_manager.user_loader(lambda user_id: robo_app.db.session.get(robo_app.User, int(user_id)))
+        uncached = poll(client, rounds, counter)
+    finally:
+        robo_app.login_manager.user_loader(robo_app.load_user)
+        event.remove(get_engine(), 'before_cursor_execute', count)
+
+    return {
+        'cached': cached,
+        'uncached': uncached,
+        'statements_saved_per_poll': round(
+            sum(e['statements_per_request'] for e in uncached.values()) / len(POLL_ENDPOINTS)
+            - sum(e['statements_per_request'] for e in cached.values()) / len(POLL_ENDPOINTS), 2),
+    }
+
@@ -0,0 +1,50 @@
+"""
+Local intent engine benchmark: accuracy of action/medication/time slots on
+a labelled utterance corpus, and per-command classification latency.
+"""
+
+import json
+import os
+import time
+
+from assistant.intent import IntentEngine
+from benchmarks.common import summarize
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'intent_corpus.json')
+
+
+def run(repeats=50):
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    t0 = time.perf_counter()
+    engine = IntentEngine(corpus['medications'])
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    hits = {'action': 0, 'medication': 0, 'time': 0}
+    misses = []
+    for item in corpus['utterances']:
+        got = engine.classify(item['text']).to_dict()
+        ok = {slot: got[slot] == item[slot] for slot in hits}
+        for slot, correct in ok.items():
+            hits[slot] += correct
+        if not all(ok.values()):
+            misses.append({'text': item['text'], 'expected': {s: item[s] for s in hits}, 'got': got})
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for item in corpus['utterances']:
+            t0 = time.perf_counter()
+            engine.classify(item['text'])
+            samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    total = len(corpus['utterances'])
+    return {
+        'utterances': total,
+        'index_build_ms': round(build_ms, 3),
+        'accuracy': {slot: round(count / total, 3) for slot, count in hits.items()},
+        'misses': misses,
+        'latency': summarize(samples, elapsed),
+    }
@@ -0,0 +1,35 @@
+"""
+Path planning benchmark on generated grids of increasing size.
+"""
+
+import random
+import time
+
+from benchmarks.common import summarize
+from navigation.astar import find_path
+
+
+def generate_grid(cols, rows, wall_density, rng):
+    """Random walls with the corners kept free for start/end"""
+    grid = [[1 if rng.random() < wall_density else 0 for _ in range(rows)] for _ in range(cols)]
+    grid[0][0] = grid[cols - 1][rows - 1] = 0
+    return grid
+
+
+def run(sizes=((32, 20), (64, 40), (128, 80)), queries=20, wall_density=0.2, seed=99):
+    rng = random.Random(seed)
+    results = {}
+    for cols, rows in sizes:
+        grid = generate_grid(cols, rows, wall_density, rng)
+        samples, found = [], 0
+        started = time.perf_counter()
+        for _ in range(queries):
+            start = (rng.randrange(cols), rng.randrange(rows))
+            end = (rng.randrange(cols), rng.randrange(rows))
+            t0 = time.perf_counter()
+            if find_path(grid, start, end): found += 1
+            samples.append(time.perf_counter() - t0)
+        report = summarize(samples, time.perf_counter() - started)
+        report['found'] = found
+        results[f'{cols}x{rows}'] = report
+    return results
@@ -0,0 +1,48 @@
+"""
+Clip recorder benchmark: cost of add_frame on the capture path while idle,
+while a clip is being collected and while the writer thread is flushing one
+to disk, plus the ring buffer's memory bound.
+"""
+
+import os
+import time
+
+import cv2
+
+from benchmarks.common import WORKSPACE, summarize
+from hardware.recorder import ClipRecorder
+from hardware.sources import SyntheticFrameSource
+
+
+def run(fps=30, seconds=6, pre_roll=2, post_roll=2, buffer_mb=4):
+    source = SyntheticFrameSource(pool_size=4)
+    jpegs = [cv2.imencode('.jpg', source.read()[1])[1].tobytes() for _ in range(4)]
+    clock = [0.0]
+    recorder = ClipRecorder(clip_dir=os.path.join(WORKSPACE, 'clips'), pre_roll=pre_roll, post_roll=post_roll,
+                            max_buffer_bytes=buffer_mb * 2 ** 20, clock=lambda: clock[0])
+
+    phases = {'idle': [], 'recording': [], 'writing': []}
+    peak_buffer = 0
+    clip_id = None
+    for i in range(fps * seconds):
+        clock[0] = i / fps
+        if i == fps * pre_roll:
+            clip_id = recorder.trigger('sos')
+        phase = 'idle' if clip_id is None else ('recording' if recorder.active is not None else 'writing')
+        t0 = time.perf_counter()
+        recorder.add_frame(jpegs[i % len(jpegs)])
+        phases[phase].append(time.perf_counter() - t0)
+        peak_buffer = max(peak_buffer, recorder.buffer_bytes)
+
+    t0 = time.perf_counter()
+    recorder.stop()
+    drain_s = time.perf_counter() - t0
+    info = next(c for c in recorder.clips() if c['id'] == clip_id)
+    return {
+        'frame_kb': round(sum(map(len, jpegs)) / len(jpegs) / 1024, 1),
+        'add_frame': {name: summarize(samples) for name, samples in phases.items() if samples},
+        'peak_buffer_mb': round(peak_buffer / 2 ** 20, 2),
+        'buffer_cap_mb': buffer_mb,
+        'clip': {'frames': info['frames'], 'seconds': round(info['end'] - info['start'], 2), 'mb': round(info['bytes'] / 2 ** 20, 2)},
+        'writer_drain_ms': round(drain_s * 1000, 3),
+    }
@@ -0,0 +1,69 @@
+"""
+Reminder scheduler benchmark: a simulated day for thousands of doses on a
+fake clock. Compares the heap's cost per event with a periodic full scan of
+every medication (what a polling loop would do each minute).
+"""
+
+import random
+import time
+from datetime import datetime
+
+from benchmarks.common import summarize
+from monitoring.alerts import AlertBus
+from scheduling.reminders import Dose, ReminderScheduler, is_due_on
+
+
+def make_doses(count, users):
+    doses = []
+    for med_id in range(1, count + 1):
+        daily = random.random() < 0.8
+        doses.append(Dose(med_id, med_id % users, f'Patient {med_id % users}', f'Med {med_id}',
+                          f'{random.randint(0, 23):02d}:{random.choice((0, 15, 30, 45)):02d}',
+                          'Daily' if daily else 'Custom', None if daily else 'Mon,Wed,Fri'))
+    return doses
+
+
+def run(medications=5000, users=200, taken_ratio=0.7, step_s=60):
+    random.seed(7)
+    doses = make_doses(medications, users)
+    taken = {d.med_id for d in doses if random.random() < taken_ratio}
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    clock = [start]
+    bus = AlertBus(history=100)
+    scheduler = ReminderScheduler(lambda user_id=None: doses, lambda med_id, day: med_id in taken, bus,
+                                  clock=lambda: clock[0])
+
+    t0 = time.perf_counter()
+    scheduler.load()
+    load_s = time.perf_counter() - t0
+
+    counts = {}
+    bus.subscribe(lambda alert: counts.__setitem__(alert['kind'], counts.get(alert['kind'], 0) + 1))
+    samples = []
+    started = time.perf_counter()
+    for tick in range(int(24 * 3600 / step_s)):
+        clock[0] = start + tick * step_s
+        t0 = time.perf_counter()
+        scheduler.run_due()
+        samples.append(time.perf_counter() - t0)
+    heap_elapsed = time.perf_counter() - started
+
+    # Baseline: scan every medication once per tick for anything due this minute
+    scan_samples = []
+    day = datetime.fromtimestamp(start)
+    for tick in range(60):
+        now = datetime.fromtimestamp(start + tick * step_s).strftime('%H:%M')
+        t0 = time.perf_counter()
+        [d for d in doses if d.time == now and is_due_on(d, day) and d.med_id not in taken]
+        scan_samples.append(time.perf_counter() - t0)
+
+    events = sum(counts.values())
+    return {
+        'medications': medications,
+        'load_ms': round(load_s * 1000, 3),
+        'alerts': counts,
+        'heap': scheduler.stats()['heap'],
+        'per_tick': summarize(samples, heap_elapsed),
+        'per_event_us': round(heap_elapsed / max(events, 1) * 1e6, 2),
+        'full_scan_per_tick': summarize(scan_samples),
+    }
@@ -0,0 +1,80 @@
+"""
+Replay harness benchmark: the camera pipeline fed from a JPEG directory and
+the vitals pipeline (parse -> log_vitals -> alert check) fed from a recorded
+serial log, both unpaced, plus a check that 1x pacing holds the recorded rate.
+"""
+
+import hashlib
+import os
+import time
+
+import cv2
+
+from benchmarks.common import WORKSPACE, summarize, time_calls
+from config import Config
+from hardware.sources import FileReplaySource, SerialLogReplaySource, SyntheticFrameSource
+
+VITALS_LOG = os.path.join(os.path.dirname(__file__), 'data', 'vitals_session.log')
+
+
+def write_frames(count):
+    """Recording stand-in: encode synthetic frames to a JPEG directory"""
+    path = os.path.join(WORKSPACE, 'frames')
+    os.makedirs(path, exist_ok=True)
+    source = SyntheticFrameSource(pool_size=count)
+    for i in range(count):
+        cv2.imwrite(os.path.join(path, f'{i:05d}.jpg'), source.read()[1])
+    return path
+
+
+def replay_vitals(manager, db, loops):
+    """Drives a BluetoothManager from the log until EOF; returns (samples, digest, alerts, elapsed)"""
+    source = SerialLogReplaySource(VITALS_LOG, speed=0)
+    source.records = source.records * loops
+    alerts, digest = [0], hashlib.sha256()
+
+    def sink(vitals):
+        digest.update(repr(sorted((k, v) for k, v in vitals.items() if k != 'timestamp')).encode())
+        alerts[0] += db.log_vitals(vitals.get('heart_rate'), vitals.get('spo2'), vitals.get('temperature'))
+
+    bluetooth = manager(source=source)
+    bluetooth.subscribe(sink)
+    started = time.perf_counter()
+    bluetooth.start_reading()
+    bluetooth.thread.join()
+    return len(source.records), digest.hexdigest(), alerts[0], time.perf_counter() - started
+
+
+def run(frames=300, loops=10, paced_frames=15):
+    from database.db_manager import DatabaseManager
+    from hardware.bluetooth_hc05 import BluetoothManager
+    from hardware.camera_stream import CameraStream
+
+    frame_dir = write_frames(30)
+    stream = CameraStream(source=FileReplaySource(frame_dir, speed=0, preload=True))
+    samples, elapsed = time_calls(stream.capture_frame, frames)
+
+    paced = FileReplaySource(frame_dir, speed=1.0, preload=True)
+    started = time.perf_counter()
+    for _ in range(paced_frames):
+        paced.read()
+    paced_fps = (paced_frames - 1) / (time.perf_counter() - started)
+
+    db = DatabaseManager(db_path=os.path.join(WORKSPACE, 'replay_vitals.db'))
+    first = replay_vitals(BluetoothManager, db, loops)
+    second = replay_vitals(BluetoothManager, db, loops)
+    lines, digest, alerts, vitals_elapsed = first
+    recorded_rate = 1 / 2.0  # The session log is ~0.5 Hz
+
+    return {
+        'camera_unpaced': dict(summarize(samples, elapsed),
+                               x_realtime=round(len(samples) / elapsed / Config.CAMERA_FRAMERATE, 1)),
+        'camera_paced_fps': round(paced_fps, 1),
+        'vitals': {
+            'lines': lines,
+            'alerts': alerts,
+            'throughput_per_s': round(lines / vitals_elapsed, 1),
+            'x_realtime': round(lines / vitals_elapsed / recorded_rate, 1),
+            'deterministic': digest == second[1] and alerts == second[2],
+        },
+    }
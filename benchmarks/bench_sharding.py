@@ -0,0 +1,98 @@
+"""
+Sharding benchmark: activity-log write throughput with the same writers
+spread over 1, 2 and 4 site shards, plus a split of a single-file database
+into shards and an LRU check with more sites than open slots.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from benchmarks.common import WORKSPACE, load_app
+from database.engine import create_storage_engine, sqlite_url
+from database.migrations import migrate
+from database.sharding import ShardRouter, split_database
+
+
+def write_throughput(robo_app, sites, writers, seconds):
+    directory = create_storage_engine(sqlite_url(os.path.join(WORKSPACE, f'directory-{sites}.db')))
+    migrate(directory)
+    router = ShardRouter(directory, robo_app.db.metadata, shard_dir=tempfile.mkdtemp(dir=WORKSPACE))
+    log_table = router.metadata.tables['activity_log']
+    names = [f'site-{i}' for i in range(sites)]
+    for name in names:
+        router.engine_for(name)
+
+    counts = [0] * writers
+    stop = threading.Event()
+
+    def writer(index):
+        engine = router.engine_for(names[index % sites])
+        while not stop.is_set():
+            with engine.begin() as conn:
+                conn.execute(log_table.insert(), {'user_id': index, 'action': 'Dispensed', 'timestamp': datetime.now(),
+                                                  'details': 'bench'})
+            counts[index] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads: t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads: t.join()
+    router.close()
+    return round(sum(counts) / seconds, 1)
+
+
+def split_check(robo_app, users):
+    """Seed `users` dashboards in the main database, split them over three sites, compare counts"""
+    client = robo_app.app.test_client()
+    usernames = []
+    for i in range(users):
+        client.post('/register', data={'username': f'shard-user-{i}', 'password': 'bench'})
+        client.get('/seed_full_day')
+        client.post('/api/task/toggle', json={'id': client.get('/api/schedule').get_json()[0]['id']})
+        client.get('/logout')
+        usernames.append(f'shard-user-{i}')
+
+    with robo_app.app.app_context():
+        source = robo_app.db.engine
+        user_ids = [u.id for u in robo_app.User.query.filter(robo_app.User.username.in_(usernames))]
+        Medication, Patient = robo_app.Medication, robo_app.Patient
+        before = robo_app.db.session.execute(
+            select(func.count()).select_from(Medication).join(Patient).where(Patient.user_id.in_(user_ids))).scalar()
+
+    router = ShardRouter(source, robo_app.db.metadata, shard_dir=tempfile.mkdtemp(dir=WORKSPACE), max_open=2)
+    assign = {name: f'site-{i % 3}' for i, name in enumerate(usernames)}
+    started = time.perf_counter()
+    summary = split_database(source, router, robo_app.db.metadata, assign)
+    elapsed = time.perf_counter() - started
+    # Every user in the main database is split, so count the bench users' rows on both sides
+    ids = ','.join(map(str, user_ids))
+    after = sum(row['n'] for row in router.query_all(
+        f'SELECT COUNT(*) AS n FROM medication JOIN patient ON patient.id = medication.patient_id '
+        f'WHERE patient.user_id IN ({ids})'))
+    return {
+        'users': users,
+        'sites': sorted(summary),
+        'medications_before': before,
+        'medications_after': after,
+        'consistent': before == after,
+        'split_s': round(elapsed, 3),
+        'open_after_split': len(router.stats()['open']),  # max_open=2 with three sites
+    }
+
+
+def run(site_counts=(1, 2, 4), writers=4, seconds=3.0, users=9):
+    robo_app = load_app()
+    throughput = {sites: write_throughput(robo_app, sites, writers, seconds) for sites in site_counts}
+    base = throughput[site_counts[0]]
+    return {
+        'writers': writers,
+        'writes_per_s': {str(sites): rate for sites, rate in throughput.items()},
+        'speedup': {str(sites): round(rate / base, 2) if base else None for sites, rate in throughput.items()},
+        'split': split_check(robo_app, users),
+    }
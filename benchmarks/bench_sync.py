@@ -0,0 +1,64 @@
+"""
+Delta sync benchmark: bytes and latency per dashboard poll with /api/sync
+deltas versus the previous full refetch of /api/schedule and
+/api/robot/status, at steady state and right after a dose is taken.
+"""
+
+import time
+
+from benchmarks.common import load_app, summarize
+
+LEGACY_ENDPOINTS = ['/api/schedule', '/api/robot/status']
+
+
+def legacy_poll(client):
+    size = 0
+    for endpoint in LEGACY_ENDPOINTS:
+        res = client.get(endpoint)
+        assert res.status_code == 200, (endpoint, res.status_code)
+        size += len(res.data)
+    return size
+
+
+def sync_poll(client, cursor):
+    res = client.get('/api/sync', query_string={'since': cursor} if cursor else None)
+    assert res.status_code == 200, res.status_code
+    return len(res.data), res.get_json()['cursor']
+
+
+def measure(poll, rounds):
+    samples, sizes = [], []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        sizes.append(poll())
+        samples.append(time.perf_counter() - t0)
+    return dict(summarize(samples), bytes_per_poll=round(sum(sizes) / len(sizes), 1))
+
+
+def run(rounds=50):
+    robo_app = load_app()
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'sync-user', 'password': 'bench'})
+    client.get('/seed_full_day')
+
+    full_bytes, cursor = sync_poll(client, None)
+    state = {'cursor': cursor}
+
+    def delta():
+        size, state['cursor'] = sync_poll(client, state['cursor'])
+        return size
+
+    legacy = measure(lambda: legacy_poll(client), rounds)
+    steady = measure(delta, rounds)
+
+    med_id = client.get('/api/schedule').get_json()[0]['id']
+    client.post('/api/task/toggle', json={'id': med_id, 'action': 'take'})
+    after_change, state['cursor'] = sync_poll(client, state['cursor'])
+
+    return {
+        'legacy': legacy,
+        'sync_steady': steady,
+        'sync_full_bytes': full_bytes,
+        'sync_after_toggle_bytes': after_change,
+        'bytes_saved_per_poll': round(legacy['bytes_per_poll'] - steady['bytes_per_poll'], 1),
+    }
@@ -0,0 +1,104 @@
+"""
+Concurrency stress test for dose toggles and inventory adjustments.
+Many threads hammer the same medication; the run fails loudly if stock or
+the activity log ever disagree with the number of doses actually taken.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from benchmarks.common import WORKSPACE, load_app, summarize
+
+
+def run(threads=16, toggles_per_thread=20, duplicate_every=4):
+    """
+    Args:
+        threads (int): Concurrent clients tapping "take" on the same dose
+        toggles_per_thread (int): Take requests per client
+        duplicate_every (int): Every Nth request is re-sent with the same
+            idempotency key to simulate a client retry
+    """
+    robo_app = load_app()
+    owner = robo_app.app.test_client()
+    owner.post('/register', data={'username': 'stress-user', 'password': 'bench'})
+    owner.get('/seed_full_day')
+    med_id = owner.get('/api/schedule').get_json()[0]['id']
+
+    with robo_app.app.app_context():
+        before = robo_app.db.session.get(robo_app.Medication, med_id).stock
+        user_id = robo_app.User.query.filter_by(username='stress-user').first().id
+
+    samples, statuses, replays = [], [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        client = robo_app.app.test_client()
+        client.post('/login', data={'username': 'stress-user', 'password': 'bench'})
+        barrier.wait()
+        for i in range(toggles_per_thread):
+            key = uuid.uuid4().hex
+            t0 = time.perf_counter()
+            res = client.post('/api/task/toggle', json={'id': med_id, 'action': 'take'}, headers={'Idempotency-Key': key})
+            elapsed = time.perf_counter() - t0
+            body = res.get_json()
+            retry = None
+            if i % duplicate_every == 0:
+                retry = client.post('/api/task/toggle', json={'id': med_id, 'action': 'take'}, headers={'Idempotency-Key': key}).get_json()
+            with lock:
+                samples.append(elapsed)
+                statuses.append(body.get('success'))
+                if retry is not None: replays.append(retry == body)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers: t.start()
+    for t in workers: t.join()
+    elapsed = time.perf_counter() - started
+
+    with robo_app.app.app_context():
+        after = robo_app.db.session.get(robo_app.Medication, med_id).stock
+        dispensed_logs = robo_app.ActivityLog.query.filter(
+            robo_app.ActivityLog.user_id == user_id, robo_app.ActivityLog.action.like('Dispensed%')).count()
+
+    successes = sum(1 for s in statuses if s)
+    toggle_report = {
+        'requests': len(statuses),
+        'successes': successes,
+        'stock_before': before,
+        'stock_after': after,
+        'dispensed_logs': dispensed_logs,
+        'replays_matched': all(replays),
+        'consistent': successes == 1 and before - after == 1 and dispensed_logs == 1 and all(replays),
+        'latency': summarize(samples, elapsed),
+    }
+
+    return {'toggle': toggle_report, 'inventory': run_inventory(threads, toggles_per_thread)}
+
+
+def run_inventory(threads, decrements_per_thread):
+    """Concurrent DatabaseManager.adjust_inventory calls must never oversell"""
+    from database.db_manager import DatabaseManager
+
+    manager = DatabaseManager(db_path=os.path.join(WORKSPACE, 'inventory-stress.db'))
+    start_qty = (threads * decrements_per_thread) // 2
+    manager.update_inventory('Medicine Pills', start_qty)
+    granted = []
+    lock = threading.Lock()
+
+    def worker():
+        ok = sum(1 for _ in range(decrements_per_thread) if manager.adjust_inventory('Medicine Pills', -1))
+        with lock: granted.append(ok)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers: t.start()
+    for t in workers: t.join()
+    final = next(row['quantity'] for row in manager.get_inventory() if row['item'] == 'Medicine Pills')
+    return {
+        'start_quantity': start_qty,
+        'granted': sum(granted),
+        'final_quantity': final,
+        'consistent': final == 0 and sum(granted) == start_qty,
+    }
@@ -0,0 +1,76 @@
+"""
+Worker pool benchmark: dashboard API latency (/api/schedule and
+/api/vitals/current) while a camera thread encodes privacy-blurred frames
+as fast as it can, with encoding in-process versus in the worker pool, plus
+the frame rate the camera reaches in each mode. The gain needs spare cores:
+on a single-core host the pool can only trade frames for latency.
+"""
+
+import threading
+import time
+
+from benchmarks.common import load_app, summarize
+from hardware.sources import SyntheticFrameSource
+
+ENDPOINTS = ['/api/schedule', '/api/vitals/current']
+
+
+def poll_dashboard(client, seconds):
+    samples = []
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for endpoint in ENDPOINTS:
+            t0 = time.perf_counter()
+            res = client.get(endpoint)
+            samples.append(time.perf_counter() - t0)
+            assert res.status_code == 200, (endpoint, res.status_code)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def measure(client, seconds, stream=None):
+    if stream is None:
+        return {'api': poll_dashboard(client, seconds)}
+    frames = [0]
+    stop = threading.Event()
+
+    def encode():
+        while not stop.is_set():
+            stream.capture_frame()
+            frames[0] += 1
+
+    thread = threading.Thread(target=encode, daemon=True)
+    started = time.perf_counter()
+    thread.start()
+    try:
+        api = poll_dashboard(client, seconds)
+    finally:
+        stop.set()
+        thread.join()
+    return {'api': api, 'camera_fps': round(frames[0] / (time.perf_counter() - started), 1)}
+
+
+def run(seconds=5.0):
+    from hardware.camera_stream import CameraStream
+    from workers.pool import WorkerPool
+
+    robo_app = load_app()
+    client = robo_app.app.test_client()
+    client.post('/register', data={'username': 'workers-user', 'password': 'bench'})
+    client.get('/seed_full_day')
+
+    pool = WorkerPool()
+    try:
+        stream = CameraStream(source=SyntheticFrameSource(), pool=pool)
+        stream.privacy_mode = True
+        stream.gate = None  # Noise frames always change; skip the comparison
+        stream.capture_frame()  # Start the encode workers before timing
+
+        results = {'idle': measure(client, seconds)}
+        stream.pool = None
+        results['in_process'] = measure(client, seconds, stream)
+        stream.pool = pool
+        results['worker_pool'] = measure(client, seconds, stream)
+    finally:
+        pool.close()
+    return results
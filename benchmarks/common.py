@@ -0,0 +1,64 @@
+"""
+Shared helpers for the benchmark suite: timing, percentiles and an isolated
+workspace so runs never touch database/medical_robot.db.
+"""
+
+import os
+import time
+import tempfile
+
+WORKSPACE = tempfile.mkdtemp(prefix='robo-bench-')
+DB_PATH = os.path.join(WORKSPACE, 'bench.db')
+
+# Must be set before app.py is imported anywhere
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + DB_PATH)
+os.environ.setdefault('DATABASE_PATH', os.path.join(WORKSPACE, 'robot.db'))
+os.environ.setdefault('ASSET_DIR', os.path.join(WORKSPACE, 'assets'))
+# Per-request access logs would dominate the output
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples))) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples, elapsed=None):
+    """
+    Reduce latency samples (seconds) to a JSON friendly report.
+
+    Args:
+        samples (list): Per-operation latencies in seconds
+        elapsed (float): Wall time for the whole run, used for throughput
+    """
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(ordered)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round((ordered[-1] if ordered else 0) * 1000, 3),
+        'throughput_per_s': round(len(ordered) / total, 1) if total > 0 else 0.0,
+    }
+
+
+def time_calls(fn, iterations):
+    """Call fn() repeatedly and return (samples, elapsed)"""
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - started
+
+
+def load_app():
+    """Import the Flask app against the benchmark database"""
+    import app as robo_app
+    robo_app.app.config['TESTING'] = True
+    robo_app.init_storage()
+    return robo_app
@@ -0,0 +1,108 @@
+"""
+Local stand-in for the remote model: an HTTP server that answers
+POST /generate after an injected delay (and optionally fails), plus a client
+exposing the same generate_content(prompt).text surface as the real SDK.
+
+Usage:
+    python -m benchmarks.fake_model_server --latency 2.0 --port 8765
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = {'response': 'Your next medicine is Aspirin at 08:00.', 'action': 'NONE'}
+
+
+class FakeModelServer:
+    def __init__(self, latency=0.05, slow_latency=None, slow_ratio=0.0, failure_rate=0.0, port=0):
+        """
+        Args:
+            latency (float): Normal response delay in seconds
+            slow_latency (float): Delay for the slow tail, if any
+            slow_ratio (float): Fraction of calls that take slow_latency
+            failure_rate (float): Fraction of calls answered with HTTP 503
+        """
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_ratio = slow_ratio
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/generate'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with fake.lock:
+                    fake.calls += 1
+                slow = fake.slow_latency is not None and random.random() < fake.slow_ratio
+                time.sleep(fake.slow_latency if slow else fake.latency)
+                if random.random() < fake.failure_rate:
+                    self.send_error(503)
+                    return
+                body = json.dumps({'text': json.dumps(REPLY)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='fake-model')
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModelClient:
+    """Drop-in for genai.GenerativeModel in benchmarks"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def generate_content(self, prompt):
+        req = urllib.request.Request(self.url, data=json.dumps({'prompt': prompt}).encode(),
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return FakeResponse(json.loads(resp.read())['text'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake model server with latency injection')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--slow-latency', type=float)
+    parser.add_argument('--slow-ratio', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = FakeModelServer(args.latency, args.slow_latency, args.slow_ratio, args.failure_rate, args.port)
+    print(f'Fake model listening on {server.url}')
+    server.server.serve_forever()
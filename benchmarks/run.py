@@ -0,0 +1,79 @@
+"""
+Benchmark Runner
+Runs every scenario offline and prints one JSON report, so results can be
+diffed between releases.
+
+Usage:
+    python -m benchmarks.run                      # all scenarios
+    python -m benchmarks.run --only api planner   # a subset
+    python -m benchmarks.run --quick --out bench_output.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import common  # noqa: F401  (isolates the database before app import)
+from benchmarks import bench_admission, bench_ai_executor, bench_api, bench_assets, bench_backup, bench_bulk_import, bench_camera, bench_contention, bench_db, bench_encoding, bench_fleet, bench_forecast, bench_hpa, bench_identity, bench_intent, bench_planner, bench_recorder, bench_reminders, bench_replay, bench_sharding, bench_sync, bench_toggle_stress, bench_vision, bench_workers
+
+SCENARIOS = {
+    'admission': (bench_admission.run, {'poll_threads': 16, 'sos_count': 20}),
+    'ai_executor': (bench_ai_executor.run, {'callers': 4, 'per_caller': 4}),
+    'api': (bench_api.run, {'dashboards': 2, 'rounds': 5}),
+    'assets': (bench_assets.run, {}),
+    'backup': (bench_backup.run, {'megabytes': 8}),
+    'bulk_import': (bench_bulk_import.run, {'residents': 20}),
+    'camera': (bench_camera.run, {'frames': 20}),
+    'contention': (bench_contention.run, {'seconds': 1.0}),
+    'db': (bench_db.run, {'samples': 50}),
+    'encoding': (bench_encoding.run, {'vitals': 200, 'map_size': 40, 'iterations': 20}),
+    'fleet': (bench_fleet.run, {'fleet_sizes': (1, 4), 'polls': 10}),
+    'forecast': (bench_forecast.run, {'users': 20, 'updates': 100}),
+    'hpa': (bench_hpa.run, {'floors': 2, 'cols': 96, 'rows': 64, 'queries': 10}),
+    'identity': (bench_identity.run, {'rounds': 10}),
+    'intent': (bench_intent.run, {'repeats': 5}),
+    'planner': (bench_planner.run, {'queries': 5}),
+    'recorder': (bench_recorder.run, {'seconds': 5}),
+    'reminders': (bench_reminders.run, {'medications': 500, 'users': 20}),
+    'replay': (bench_replay.run, {'frames': 30, 'loops': 2}),
+    'sharding': (bench_sharding.run, {'seconds': 1.0, 'users': 3}),
+    'sync': (bench_sync.run, {'rounds': 10}),
+    'toggle_stress': (bench_toggle_stress.run, {'threads': 4, 'toggles_per_thread': 5}),
+    'vision': (bench_vision.run, {'seconds': 8, 'inactivity_seconds': 3}),
+    'workers': (bench_workers.run, {'seconds': 2.0}),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Medical robot benchmark suite')
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='Scenarios to run')
+    parser.add_argument('--quick', action='store_true', help='Small iteration counts for smoke runs')
+    parser.add_argument('--out', help='Also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {},
+    }
+    for name in args.only or sorted(SCENARIOS):
+        fn, quick_kwargs = SCENARIOS[name]
+        print(f'>> running {name}', file=sys.stderr)
+        started = time.perf_counter()
+        result = fn(**quick_kwargs) if args.quick else fn()
+        result['duration_s'] = round(time.perf_counter() - started, 3)
+        report['results'][name] = result
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -70,12 +70,80 @@ class Config:
     
     # Database
     # Ensure the 'database' folder exists, otherwise this might error
-    DATABASE_PATH = 'database/medical_robot.db'
+    DATABASE_PATH = os.environ.get('DATABASE_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'database', 'medical_robot.db')
+    DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///' + DATABASE_PATH  # Shared by the web app and DatabaseManager
+    DB_BUSY_TIMEOUT = 5.0  # Seconds SQLite waits on another process's lock
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    
+    # Per-site shards (python -m database.sharding split); off keeps everything in DATABASE_URL
+    SHARDING_ENABLED = os.environ.get('SHARDING') == '1'
+    SHARD_DIR = os.environ.get('SHARD_DIR') or os.path.join(os.path.dirname(DATABASE_PATH), 'shards')
+    DEFAULT_SITE = os.environ.get('DEFAULT_SITE', 'main')
+    SHARD_MAX_OPEN = 16  # Shard engines kept open; least recently used idle ones are closed first
+    SHARD_IDLE_SECONDS = 600
+    SHARD_ID_SPAN = 2 ** 32  # Ids reserved per site; keeps ids unique across shards and JS-safe
+    
+    IDENTITY_CACHE_TTL = 30  # Seconds a user's cached patient/medication graph is reused
+    SYNC_CHANGE_RETENTION_DAYS = 7  # /api/sync change rows kept; clients offline longer resync in full
+    IDEMPOTENCY_KEY_TTL_HOURS = 48  # Idempotency-Key replays honoured this long; the nightly sweep drops older keys
+    
+    # CPU-bound work (JPEG encode, path planning) in worker processes, off the web process's GIL
+    WORKER_POOL_ENABLED = os.environ.get('WORKER_POOL', '1' if (os.cpu_count() or 1) > 1 else '0') == '1'
+    WORKER_LANES = {'encode': 2, 'plan': 1}  # Processes per lane; tasks are routed to lanes by kind
+    WORKER_MAX_PENDING = {'encode': 3, 'plan': 8}  # Tasks queued or running per lane before callers are refused
+    WORKER_MAX_PUBLISHED = 8  # Saved maps kept in shared memory
+    WORKER_TIMEOUT = 5.0  # Seconds a caller waits for a result
+    
+    # Online snapshots (python -m database.backup now|list|restore)
+    BACKUP_ENABLED = os.environ.get('BACKUP', '1') == '1'
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(os.path.dirname(DATABASE_PATH), 'backups')
+    BACKUP_INTERVAL = 6 * 3600  # Seconds between snapshots
+    BACKUP_PAGES = 64  # Pages copied per backup step (256 KB at the default page size)
+    BACKUP_PAUSE = 0.005  # Seconds between steps, leaving the disk to the app's writers
+    BACKUP_MAX_RESTARTS = 5  # Paged copies restarted by writes this often finish in one step
+    BACKUP_KEEP = 28  # Newest snapshots kept per database
+    BACKUP_RETENTION_DAYS = 14
+    
+    # Admission control (extensions/admission.py): emergency > dispense > write > poll > stream
+    ADMISSION_ENABLED = os.environ.get('ADMISSION', '1') == '1'
+    ADMISSION_CAPACITY = 16  # Requests running at once; emergencies are admitted even beyond it
+    ADMISSION_RESERVED = {'emergency': 2, 'dispense': 2, 'write': 2}  # Slots the classes below can't use
+    ADMISSION_MAX_WAIT = {'dispense': 5.0, 'write': 2.0, 'poll': 0.5, 'stream': 0}  # Seconds queued before a 503
+    ADMISSION_MAX_QUEUE = {'dispense': 64, 'write': 32, 'poll': 16, 'stream': 0}
+    ADMISSION_MAX_STREAMS = 4
+    ADMISSION_RETRY_AFTER = 2  # Seconds, sent with shed responses
+    
+    # API responses (extensions/encoding.py): JSON, columnar JSON or MessagePack, then zstd/gzip
+    COMPRESS_ENABLED = os.environ.get('COMPRESS', '1') == '1'
+    COMPRESS_MIN_SIZE = 1024  # Bytes; smaller bodies go out uncompressed
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_ZSTD_LEVEL = 3
+    
+    # Static assets: sources and the fingerprinted build (python -m extensions.assets)
+    STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    ASSET_DIR = os.environ.get('ASSET_DIR') or os.path.join(STATIC_DIR, 'dist')
     
     # Camera Settings
     CAMERA_RESOLUTION = (640, 480)  # Standard webcam resolution
     CAMERA_FRAMERATE = 30  # Increased to 30 for smoother laptop webcam
     CAMERA_ROTATION = 0  # 0, 90, 180, or 270
+    CAMERA_SKIP_UNCHANGED = True  # Reuse the last JPEG while the scene is static
+    
+    # Vision (motion / fall / inactivity on the camera feed)
+    VISION_ENABLED = True
+    VISION_STRIDE = 3  # Analyse at most every Nth frame
+    VISION_CPU_BUDGET = 0.05  # Max fraction of one core spent on motion analysis
+    VISION_INACTIVITY_SECONDS = 30 * 60  # No motion for this long raises an inactivity alert
+    
+    # Event Clips
+    CLIP_DIR = os.path.join(os.path.dirname(DATABASE_PATH), 'clips')
+    CLIP_PRE_ROLL_SECONDS = 10  # Footage kept from before the event
+    CLIP_POST_ROLL_SECONDS = 20  # Footage recorded after the (latest) event
+    CLIP_BUFFER_MAX_MB = 32  # Memory cap for the pre-roll ring buffer
+    CLIP_RETENTION_DAYS = 7
+    CLIP_MAX_TOTAL_MB = 1024  # Oldest clips are deleted beyond this
     
     # HC-05 Bluetooth Settings
     # Changed /dev/rfcomm0 (Linux) to COM1 (Windows Placeholder)
@@ -87,6 +155,9 @@ class Config:
     BATTERY_LOW_THRESHOLD = 20  # Percentage
     WATER_LOW_THRESHOLD = 2  # Remaining doses
     PILLS_LOW_THRESHOLD = 3  # Remaining pills
+    REORDER_LEAD_DAYS = 7  # Days of supply needed to cover a pharmacy reorder
+    STOCK_CRITICAL_DAYS = 2  # Supply for today + tomorrow or less is flagged 'low'
+    FORECAST_HORIZON_DAYS = 365  # Supplies lasting longer report no empty date
     
     # Alert Settings
     HEART_RATE_MIN = 50  # BPM
@@ -96,6 +167,41 @@ class Config:
     # Schedule Settings
     MEDICINE_TIMES = ['08:00', '14:00', '20:00']  # Daily medicine schedule
     WATER_REMINDER_INTERVAL = 2  # Hours
+    REMINDER_ESCALATE_AFTER = 15  # Minutes past the dose time before escalating
+    REMINDER_MISSED_AFTER = 60  # Minutes past the dose time before it counts as missed
+    REMINDER_STATE_PATH = os.path.join(os.path.dirname(DATABASE_PATH), 'reminders.json')
+    
+    # Fleet
+    ROOM_COORDINATES = {  # Grid cell (x, y) of each named location on the map
+        'charging_dock': (1, 1),
+        'living_room': (10, 6),
+        'kitchen': (20, 4),
+        'bedroom': (24, 14),
+        'bathroom': (16, 16),
+    }
+    DEFAULT_PATIENT_ROOM = 'bedroom'
+    TELEMETRY_FLUSH_INTERVAL = 5.0  # Seconds between coalesced robot_status writes
+    ROBOT_TOKEN = os.environ.get('ROBOT_TOKEN')  # Shared secret robots send as X-Robot-Token
+    
+    # Replay (run the camera/vitals pipelines from recordings instead of hardware)
+    CAMERA_REPLAY = os.environ.get('CAMERA_REPLAY')  # JPEG directory or video file for robot #1
+    VITALS_REPLAY = os.environ.get('VITALS_REPLAY')  # Recorded HC-05 serial log
+    REPLAY_SPEED = float(os.environ.get('REPLAY_SPEED', '1'))  # 1 = real time, 0 = as fast as possible
+    
+    # Voice Assistant
+    INTENT_CONFIDENCE_THRESHOLD = 0.6  # Below this the remote model is asked (when configured)
+    VOICE_CONFIRM_SECONDS = 60  # A voice TAKEN/ADD waits this long for "yes" before it is dropped
+    AI_TIMEOUT = 8.0  # Seconds a voice request waits for the remote model
+    AI_MAX_CONCURRENCY = 2  # Remote calls in flight at once; extra requests answer locally
+    AI_BREAKER_FAILURES = 3  # Consecutive failures/timeouts before the circuit opens
+    AI_BREAKER_RESET = 30.0  # Seconds before a single probe call is let through again
+    
+    # Diagnostics
+    ADMIN_USERS = [u for u in os.environ.get('ADMIN_USERS', '').split(',') if u]  # Usernames allowed on /admin
+    PROFILER_ALWAYS_ON = os.environ.get('PROFILER_ALWAYS_ON') == '1'
+    PROFILER_INTERVAL = 0.1  # Seconds between always-on samples (~10 Hz)
+    PROFILER_WINDOW = 300  # Seconds of rolling profile history kept
+    PROFILER_MAX_SECONDS = 60  # Longest on-demand capture
 
 # ==================== HARDWARE PINS (Reference Only) ====================
 class HardwareConfig:
@@ -0,0 +1,297 @@
+"""
+Online Backup
+Snapshots the live SQLite files while the app keeps writing:
+
+    - SQLite's online backup API copies BACKUP_PAGES pages per step and
+      pauses BACKUP_PAUSE seconds between steps
+    - in WAL mode the copy reads from one pinned read transaction: writers
+      carry on untouched (the WAL just grows until the copy finishes) and
+      the snapshot is consistent as of the moment the backup started
+    - without WAL, writes from other connections restart a paged backup;
+      after BACKUP_MAX_RESTARTS restarts the copy finishes in one step
+    - the copy is integrity-checked, gzip-compressed into BACKUP_DIR as
+      <name>-YYYYmmdd-HHMMSS.db.gz (-2, -3... for more in the same second)
+      and old snapshots are pruned: the BACKUP_KEEP newest are kept, none
+      older than BACKUP_RETENTION_DAYS
+    - BackupService takes a snapshot of every database (the main file and
+      each site shard) every BACKUP_INTERVAL seconds
+    - restore() puts a snapshot back in place; run it with the server stopped
+
+Usage:
+    python -m database.backup now
+    python -m database.backup list
+    python -m database.backup restore medical_robot-20261019-031500.db.gz [--to path]
+"""
+
+import gzip
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+BACKUP_SECONDS = REGISTRY.histogram('backup_duration_seconds', 'Wall time of one database snapshot',
+                                    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+BACKUPS_TOTAL = REGISTRY.counter('backups_total', 'Snapshots taken by outcome', ['outcome'])
+BACKUP_RESTARTS = REGISTRY.counter('backup_restarts_total', 'Paged backups restarted by concurrent writes')
+BACKUP_LAST_SUCCESS = REGISTRY.gauge('backup_last_success_timestamp', 'Unix time of the last good snapshot', ['name'])
+
+SNAPSHOT_NAME = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})(?:-(?P<seq>\d+))?\.db\.gz$')
+
+
+class BackupError(Exception):
+    """A snapshot or restore could not be completed; the live database is untouched"""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def online_copy(source_path, target_path, pages=None, pause=None, max_restarts=None):
+    """
+    Copies `source_path` into a fresh `target_path` with the online backup
+    API, `pages` pages per step with `pause` seconds between steps.
+
+    Returns: {'pages', 'steps', 'restarts', 'single_step', 'pinned'}
+    """
+    pages = pages or Config.BACKUP_PAGES
+    pause = Config.BACKUP_PAUSE if pause is None else pause
+    max_restarts = Config.BACKUP_MAX_RESTARTS if max_restarts is None else max_restarts
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'single_step': False, 'pinned': False}
+    last_remaining = [None]
+
+    def progress(status, remaining, total):
+        stats['steps'] += 1
+        stats['pages'] = total
+        if last_remaining[0] is not None and remaining > last_remaining[0]:
+            stats['restarts'] += 1
+            BACKUP_RESTARTS.inc()
+            if stats['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining[0] = remaining
+        if remaining and pause:
+            time.sleep(pause)  # Between steps no lock is held at all
+
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    source = sqlite3.connect(source_path, timeout=Config.DB_BUSY_TIMEOUT)
+    target = sqlite3.connect(target_path)
+    try:
+        if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            # An open read transaction pins one WAL snapshot for every step, so
+            # concurrent commits never restart the copy and never wait on it
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            stats['pinned'] = True
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            log.info("Backup restarting too often, finishing in one step", source=source_path,
+                     restarts=stats['restarts'])
+            source.backup(target, pages=-1)
+            stats['single_step'] = True
+    finally:
+        target.close()
+        source.close()
+    return stats
+
+
+def integrity_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed for {path}: {result}')
+
+
+def snapshot(source_path, name=None, backup_dir=None, now=None, **copy_options):
+    """
+    Takes one compressed snapshot of `source_path`.
+
+    Returns: {'name', 'path', 'bytes', 'seconds', 'pages', 'steps', 'restarts', 'single_step'}
+    """
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    name = name or os.path.splitext(os.path.basename(source_path))[0]
+    now = now or datetime.now()
+    os.makedirs(backup_dir, exist_ok=True)
+    final = reserve_path(backup_dir, name, now)
+    raw = final[:-3] + '.tmp'
+    started = time.perf_counter()
+    try:
+        stats = online_copy(source_path, raw, **copy_options)
+        integrity_check(raw)
+        with open(raw, 'rb') as src, gzip.open(final + '.tmp', 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(final + '.tmp', final)  # Readers only ever see complete snapshots
+    except Exception:
+        BACKUPS_TOTAL.inc(outcome='failed')
+        if os.path.exists(final + '.tmp'):
+            os.remove(final + '.tmp')
+        raise
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+    elapsed = time.perf_counter() - started
+    BACKUP_SECONDS.observe(elapsed)
+    BACKUPS_TOTAL.inc(outcome='ok')
+    BACKUP_LAST_SUCCESS.set(time.time(), name=name)
+    return dict(stats, name=name, path=final, bytes=os.path.getsize(final), seconds=round(elapsed, 3))
+
+
+def reserve_path(backup_dir, name, now):
+    """
+    A snapshot path no other run holds: the first free of <stamp>, <stamp>-2,
+    ... claimed by creating its .tmp file exclusively, so two runs in the
+    same second never write over each other
+    """
+    stamp = now.strftime('%Y%m%d-%H%M%S')
+    for seq in itertools.count(1):
+        final = os.path.join(backup_dir, f"{name}-{stamp}{'' if seq == 1 else f'-{seq}'}.db.gz")
+        if os.path.exists(final):
+            continue
+        try:
+            os.close(os.open(final + '.tmp', os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        return final
+
+
+def list_snapshots(backup_dir=None, name=None):
+    """Snapshots in `backup_dir` (optionally only `name`'s), newest first: [(name, taken_at, path)]"""
+    backup_dir = backup_dir or Config.BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    found = []
+    for filename in os.listdir(backup_dir):
+        match = SNAPSHOT_NAME.match(filename)
+        if match and (name is None or match['name'] == name):
+            taken_at = datetime.strptime(match['stamp'], '%Y%m%d-%H%M%S')
+            found.append((match['name'], taken_at, int(match['seq'] or 1), os.path.join(backup_dir, filename)))
+    return [(n, taken_at, path) for n, taken_at, _, path in sorted(found, key=lambda s: s[1:3], reverse=True)]
+
+
+def prune(name, backup_dir=None, keep=None, retention_days=None, now=None):
+    """Deletes `name`'s snapshots beyond the `keep` newest or older than `retention_days`; returns the paths removed"""
+    keep = Config.BACKUP_KEEP if keep is None else keep
+    retention_days = Config.BACKUP_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    removed = []
+    for i, (_, taken_at, path) in enumerate(list_snapshots(backup_dir, name)):
+        if i >= keep or taken_at < cutoff:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def restore(snapshot_path, target_path):
+    """
+    Replaces `target_path` with the snapshot. The current file is kept as
+    <target>.pre-restore, its WAL/SHM files moved along with it so SQLite
+    can't replay them over the restored copy. The server must be stopped.
+    """
+    staged = target_path + '.restore'
+    with gzip.open(snapshot_path, 'rb') as src, open(staged, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    try:
+        integrity_check(staged)
+    except BackupError:
+        os.remove(staged)
+        raise
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(target_path + suffix):
+            os.replace(target_path + suffix, target_path + '.pre-restore' + suffix)
+    os.replace(staged, target_path)
+    log.info("Database restored", snapshot=snapshot_path, target=target_path)
+    return target_path
+
+
+class BackupService:
+    def __init__(self, sources, interval=Config.BACKUP_INTERVAL, backup_dir=None):
+        """
+        Args:
+            sources (callable): Returns {name: sqlite file path} to back up, asked each round
+            interval (float): Seconds between rounds
+        """
+        self.sources = sources
+        self.interval = interval
+        self.backup_dir = backup_dir or Config.BACKUP_DIR
+        self.last = {}  # name -> result of the latest snapshot
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()  # One round at a time (timer thread vs run_now)
+
+    def run_now(self):
+        """One snapshot of every source plus pruning; a failing source doesn't stop the others"""
+        with self.lock:
+            results = {}
+            for name, path in self.sources().items():
+                try:
+                    results[name] = snapshot(path, name, self.backup_dir)
+                    prune(name, self.backup_dir)
+                    log.info("Snapshot taken", name=name, bytes=results[name]['bytes'],
+                             seconds=results[name]['seconds'], restarts=results[name]['restarts'])
+                except Exception as e:
+                    results[name] = {'error': str(e)}
+                    log.error("Snapshot failed", name=name, error=e)
+            self.last.update(results)
+            return results
+
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='db-backup', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.run_now()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Online database snapshots')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('now', help='Snapshot every database now')
+    sub.add_parser('list', help='Snapshots on disk, newest first')
+    restore_cmd = sub.add_parser('restore', help='Put a snapshot back (stop the server first)')
+    restore_cmd.add_argument('snapshot', help='Snapshot file, absolute or relative to BACKUP_DIR')
+    restore_cmd.add_argument('--to', help='Target database file (default: the one the snapshot was taken of)')
+    args = parser.parse_args(argv)
+
+    import app as robo_app  # Knows the main database and the shards
+    if args.command == 'now':
+        result = robo_app.get_backups().run_now()
+    elif args.command == 'list':
+        result = [{'name': n, 'taken_at': t.isoformat(), 'path': p} for n, t, p in list_snapshots()]
+    else:
+        path = args.snapshot if os.path.exists(args.snapshot) else os.path.join(Config.BACKUP_DIR, args.snapshot)
+        match = SNAPSHOT_NAME.match(os.path.basename(path))
+        target = args.to or (match and robo_app.backup_sources().get(match['name']))
+        if not target:
+            parser.error('Unknown snapshot name; pass --to')
+        result = {'restored': restore(path, target)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
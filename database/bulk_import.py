@@ -0,0 +1,151 @@
+"""
+Bulk Setup Import
+Parses patient/medication rosters (setup JSON or CSV) into one normalized
+shape and computes the minimal change set against what is already stored.
+"""
+
+import csv
+import io
+from itertools import zip_longest
+
+CSV_COLUMNS = ['patient', 'name', 'dosage', 'stock', 'time', 'instructions', 'frequency', 'days']
+DEFAULT_STOCK = 30
+
+
+class SetupImportError(ValueError):
+    """Raised when an uploaded roster is malformed"""
+
+
+def normalize_med(m_data):
+    """
+    Accepts both the setup form keys and the CSV column names. stock and
+    max_stock are only present when the row gave them, so a diff never
+    overwrites live counts with a default; new_med_row() fills them in.
+    """
+    try:
+        counts = {field: int(m_data[field]) for field in ('stock', 'max_stock') if m_data.get(field)}
+        name = m_data['name'].strip()
+        schedule_time = (m_data.get('time') or m_data.get('schedule_time') or '').strip()
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise SetupImportError(f"Invalid medication row {m_data!r}: {e}")
+    if not name or not schedule_time:
+        raise SetupImportError(f"Medication needs a name and time: {m_data!r}")
+    return {
+        'name': name,
+        'dosage': m_data.get('dosage') or '',
+        **counts,
+        'schedule_time': schedule_time,
+        'instructions': m_data.get('instructions') or '',
+        'frequency': m_data.get('frequency') or 'Daily',
+        'days': m_data.get('selected_days') or m_data.get('days') or 'All',
+    }
+
+
+def new_med_row(med):
+    """A normalized med ready to insert: stock defaults to DEFAULT_STOCK, max_stock to the stock"""
+    stock = med.get('stock', DEFAULT_STOCK)
+    return dict(med, stock=stock, max_stock=med.get('max_stock', stock))
+
+
+def parse_json(data):
+    """`{"patients": [{"name": ..., "meds": [...]}]}` as posted by setup.html"""
+    if not isinstance(data, dict) or not isinstance(data.get('patients', []), list):
+        raise SetupImportError("Expected an object with a 'patients' list")
+    patients = []
+    for p_data in data.get('patients', []):
+        if not isinstance(p_data, dict):
+            raise SetupImportError(f"Patient entries must be objects: {p_data!r}")
+        name = p_data.get('name')
+        if not isinstance(name, str) or not name.strip():
+            raise SetupImportError("Every patient needs a name")
+        meds = p_data.get('meds') or []
+        if not isinstance(meds, list):
+            raise SetupImportError(f"Medications of {name.strip()!r} must be a list")
+        patients.append({'name': name.strip(), 'meds': [normalize_med(m) for m in meds]})
+    return patients
+
+
+def parse_csv(text):
+    """One medication per row; rows are grouped by the `patient` column"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {'patient', 'name', 'time'} - set(reader.fieldnames or [])
+    if missing:
+        raise SetupImportError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    grouped = {}
+    for row in reader:
+        patient = (row.get('patient') or '').strip()
+        if not patient:
+            raise SetupImportError(f"Row without patient: {row!r}")
+        grouped.setdefault(patient, []).append(normalize_med(row))
+    return [{'name': name, 'meds': meds} for name, meds in grouped.items()]
+
+
+def med_key(med):
+    """What identifies a medication within a patient; the dose time is an attribute, so a new time updates in place"""
+    return (med['name'].strip().lower(), (med['dosage'] or '').strip().lower())
+
+
+def pair_meds(stored, wanted):
+    """
+    (stored, incoming) pairs for meds sharing one key, either side None when
+    unmatched: the same dose time first, so a twice-daily med keeps each
+    row's history, then the rest in time order
+    """
+    stored = sorted(stored, key=lambda m: m['schedule_time'])
+    unmatched = []
+    pairs = []
+    for med in sorted(wanted, key=lambda m: m['schedule_time']):
+        match = next((row for row in stored if row['schedule_time'] == med['schedule_time']), None)
+        if match is None:
+            unmatched.append(med)
+        else:
+            stored.remove(match)
+            pairs.append((match, med))
+    return pairs + list(zip_longest(stored, unmatched))
+
+
+def diff_plan(existing, incoming):
+    """
+    Compute the change set that turns `existing` into `incoming`. Patients
+    are matched by name, so incoming patients that share one are merged, the
+    way parse_csv groups rows.
+
+    Args:
+        existing (dict): patient name -> {'id': int, 'meds': [med dicts with 'id']}
+        incoming (list): Output of parse_json / parse_csv
+
+    Returns:
+        dict: add_patients, delete_patient_ids, add_meds (patient name, new_med_row),
+              update_meds (changed fields plus 'id'), delete_med_ids
+    """
+    plan = {'add_patients': [], 'delete_patient_ids': [], 'add_meds': [], 'update_meds': [], 'delete_med_ids': []}
+    merged = {}
+    for patient in incoming:
+        merged.setdefault(patient['name'], []).extend(patient['meds'])
+    incoming = [{'name': name, 'meds': meds} for name, meds in merged.items()]
+    seen = set()
+    for patient in incoming:
+        seen.add(patient['name'])
+        current = existing.get(patient['name'])
+        if current is None:
+            plan['add_patients'].append(patient['name'])
+            plan['add_meds'].extend((patient['name'], new_med_row(med)) for med in patient['meds'])
+            continue
+        groups = {}
+        for med in current['meds']:
+            groups.setdefault(med_key(med), ([], []))[0].append(med)
+        for med in patient['meds']:
+            groups.setdefault(med_key(med), ([], []))[1].append(med)
+        for stored_meds, wanted_meds in groups.values():
+            for stored, med in pair_meds(stored_meds, wanted_meds):
+                if med is None:
+                    plan['delete_med_ids'].append(stored['id'])
+                elif stored is None:
+                    plan['add_meds'].append((patient['name'], new_med_row(med)))
+                else:
+                    # Only what the row carries: stock, max_stock and last_taken stay as the robot left them
+                    changed = {field: value for field, value in med.items() if stored.get(field) != value}
+                    if changed:
+                        plan['update_meds'].append(dict(changed, id=stored['id']))
+    plan['delete_patient_ids'] = [p['id'] for name, p in existing.items() if name not in seen]
+    return plan
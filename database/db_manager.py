@@ -3,243 +3,240 @@ Database Manager for Medical Robot
 Handles all SQLite operations for patient schedule, logs, and inventory
 """
 
-import sqlite3
 import json
 from datetime import datetime, timedelta
+from sqlalchemy import text
 from config import Config
+from database.engine import get_engine, sqlite_url
+from database.migrations import migrate
+from monitoring.metrics import VITALS_SAMPLES_TOTAL, track_db
 
 class DatabaseManager:
-    def __init__(self, db_path=Config.DATABASE_PATH):
-        self.db_path = db_path
+    def __init__(self, db_path=None, engine=None):
+        """
+        Args:
+            db_path (str): SQLite file to use instead of Config.DATABASE_URL
+            engine: An existing engine (e.g. the web app's), shared as-is
+        """
+        if engine is None:
+            engine = get_engine(sqlite_url(db_path) if db_path else None)
+        self.engine = engine
+        self.db_path = engine.url.database
         self.init_database()
     
-    def get_connection(self):
-        """Create and return a database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        return conn
-    
     def init_database(self):
-        """Initialize all database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Schedule Table: Doctor's prescribed timeline
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                time TEXT NOT NULL,
-                task TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                completed_at TEXT,
-                notes TEXT
-            )
-        ''')
-        
-        # Inventory Table: Track supplies
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS inventory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item TEXT UNIQUE NOT NULL,
-                quantity INTEGER DEFAULT 0,
-                unit TEXT,
-                last_updated TEXT
-            )
-        ''')
-        
-        # Vitals Log: Patient health data history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vitals_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                heart_rate INTEGER,
-                spo2 INTEGER,
-                temperature REAL,
-                alert_triggered INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Robot Status: Current state
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS robot_status (
-                id INTEGER PRIMARY KEY,
-                battery_level INTEGER DEFAULT 100,
-                location TEXT DEFAULT 'charging_dock',
-                is_moving INTEGER DEFAULT 0,
-                last_update TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
-        # Seed initial data
+        """Bring the schema up to date and seed demo data"""
+        migrate(self.engine)
         self.seed_initial_data()
     
     def seed_initial_data(self):
         """Populate database with sample data for demo"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Check if data already exists
-        cursor.execute("SELECT COUNT(*) as count FROM schedule")
-        if cursor.fetchone()['count'] == 0:
-            # Create today's schedule
-            today = datetime.now().strftime('%Y-%m-%d')
-            schedule_items = [
-                (f'{today} 08:00', 'Morning Medicine', 'completed', f'{today} 08:05', 'Delivered successfully'),
-                (f'{today} 10:00', 'Water Reminder', 'completed', f'{today} 10:02', 'Patient hydrated'),
-                (f'{today} 12:00', 'Lunch Reminder', 'pending', None, None),
-                (f'{today} 14:00', 'Afternoon Medicine', 'pending', None, None),
-                (f'{today} 16:00', 'Water Reminder', 'pending', None, None),
-                (f'{today} 20:00', 'Evening Medicine', 'pending', None, None),
-            ]
-            cursor.executemany('''
-                INSERT INTO schedule (time, task, status, completed_at, notes)
-                VALUES (?, ?, ?, ?, ?)
-            ''', schedule_items)
-        
-        # Initialize inventory
-        cursor.execute("SELECT COUNT(*) as count FROM inventory")
-        if cursor.fetchone()['count'] == 0:
-            inventory_items = [
-                ('Medicine Pills', 25, 'pills', datetime.now().isoformat()),
-                ('Water', 8, 'doses', datetime.now().isoformat()),
-                ('Battery', 78, '%', datetime.now().isoformat()),
-            ]
-            cursor.executemany('''
-                INSERT INTO inventory (item, quantity, unit, last_updated)
-                VALUES (?, ?, ?, ?)
-            ''', inventory_items)
-        
-        # Initialize robot status
-        cursor.execute("SELECT COUNT(*) as count FROM robot_status")
-        if cursor.fetchone()['count'] == 0:
-            cursor.execute('''
-                INSERT INTO robot_status (id, battery_level, location, is_moving, last_update)
-                VALUES (1, 78, 'living_room', 0, ?)
-            ''', (datetime.now().isoformat(),))
-        
-        conn.commit()
-        conn.close()
+        now = datetime.now().isoformat()
+        with self.engine.begin() as conn:
+            # Check if data already exists
+            if conn.execute(text("SELECT COUNT(*) FROM schedule")).scalar() == 0:
+                # Create today's schedule
+                today = datetime.now().strftime('%Y-%m-%d')
+                schedule_items = [
+                    (f'{today} 08:00', 'Morning Medicine', 'completed', f'{today} 08:05', 'Delivered successfully'),
+                    (f'{today} 10:00', 'Water Reminder', 'completed', f'{today} 10:02', 'Patient hydrated'),
+                    (f'{today} 12:00', 'Lunch Reminder', 'pending', None, None),
+                    (f'{today} 14:00', 'Afternoon Medicine', 'pending', None, None),
+                    (f'{today} 16:00', 'Water Reminder', 'pending', None, None),
+                    (f'{today} 20:00', 'Evening Medicine', 'pending', None, None),
+                ]
+                conn.execute(text('''
+                    INSERT INTO schedule (time, task, status, completed_at, notes)
+                    VALUES (:time, :task, :status, :completed_at, :notes)
+                '''), [dict(zip(('time', 'task', 'status', 'completed_at', 'notes'), row)) for row in schedule_items])
+            
+            # Initialize inventory
+            if conn.execute(text("SELECT COUNT(*) FROM inventory")).scalar() == 0:
+                inventory_items = [
+                    ('Medicine Pills', 25, 'pills'),
+                    ('Water', 8, 'doses'),
+                    ('Battery', 78, '%'),
+                ]
+                conn.execute(text('''
+                    INSERT INTO inventory (item, quantity, unit, last_updated)
+                    VALUES (:item, :quantity, :unit, :now)
+                '''), [{'item': item, 'quantity': qty, 'unit': unit, 'now': now} for item, qty, unit in inventory_items])
+            
+            # Initialize robot status
+            if conn.execute(text("SELECT COUNT(*) FROM robot_status")).scalar() == 0:
+                conn.execute(text('''
+                    INSERT INTO robot_status (id, battery_level, location, is_moving, last_update)
+                    VALUES (1, 78, 'living_room', 0, :now)
+                '''), {'now': now})
+            
+            # The original single robot becomes robot #1 of the fleet
+            if conn.execute(text("SELECT COUNT(*) FROM robots")).scalar() == 0:
+                conn.execute(text('''
+                    INSERT INTO robots (id, name, camera_source, registered_at)
+                    VALUES (1, 'MediBot', NULL, :now)
+                '''), {'now': now})
     
+    @track_db('db_manager')
     def get_today_schedule(self):
         """Retrieve today's schedule"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
         today = datetime.now().strftime('%Y-%m-%d')
-        
-        cursor.execute('''
-            SELECT * FROM schedule 
-            WHERE time LIKE ? 
-            ORDER BY time ASC
-        ''', (f'{today}%',))
-        
-        schedule = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return schedule
+        with self.engine.connect() as conn:
+            rows = conn.execute(text('''
+                SELECT * FROM schedule 
+                WHERE time LIKE :day 
+                ORDER BY time ASC
+            '''), {'day': f'{today}%'}).mappings().all()
+        return [dict(row) for row in rows]
     
+    @track_db('db_manager')
     def update_task_status(self, task_id, status, notes=''):
         """Mark a task as completed or failed"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         completed_at = datetime.now().isoformat() if status == 'completed' else None
-        cursor.execute('''
-            UPDATE schedule 
-            SET status = ?, completed_at = ?, notes = ?
-            WHERE id = ?
-        ''', (status, completed_at, notes, task_id))
-        
-        conn.commit()
-        conn.close()
+        with self.engine.begin() as conn:
+            conn.execute(text('''
+                UPDATE schedule 
+                SET status = :status, completed_at = :completed_at, notes = :notes
+                WHERE id = :id
+            '''), {'status': status, 'completed_at': completed_at, 'notes': notes, 'id': task_id})
     
+    @track_db('db_manager')
     def get_inventory(self):
         """Get current inventory levels"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM inventory')
-        inventory = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return inventory
+        with self.engine.connect() as conn:
+            rows = conn.execute(text('SELECT * FROM inventory')).mappings().all()
+        return [dict(row) for row in rows]
+    
+    @track_db('db_manager')
+    def update_inventory(self, item, quantity, expected_quantity=None):
+        """
+        Update inventory quantity.
+        
+        Args:
+            expected_quantity (int): If given, only write when the stored
+                quantity still matches (compare-and-set). Returns False on conflict.
+        """
+        params = {'quantity': quantity, 'now': datetime.now().isoformat(), 'item': item}
+        with self.engine.begin() as conn:
+            if expected_quantity is None:
+                result = conn.execute(text('''
+                    UPDATE inventory 
+                    SET quantity = :quantity, last_updated = :now
+                    WHERE item = :item
+                '''), params)
+            else:
+                result = conn.execute(text('''
+                    UPDATE inventory 
+                    SET quantity = :quantity, last_updated = :now
+                    WHERE item = :item AND quantity = :expected
+                '''), dict(params, expected=expected_quantity))
+        return result.rowcount > 0
     
-    def update_inventory(self, item, quantity):
-        """Update inventory quantity"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE inventory 
-            SET quantity = ?, last_updated = ?
-            WHERE item = ?
-        ''', (quantity, datetime.now().isoformat(), item))
-        conn.commit()
-        conn.close()
+    @track_db('db_manager')
+    def adjust_inventory(self, item, delta):
+        """
+        Atomically add `delta` (negative to consume) to an item's quantity.
+        Never goes below zero; returns False if there was not enough stock.
+        """
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                UPDATE inventory 
+                SET quantity = quantity + :delta, last_updated = :now
+                WHERE item = :item AND quantity + :delta >= 0
+            '''), {'delta': delta, 'now': datetime.now().isoformat(), 'item': item})
+        return result.rowcount > 0
     
+    @track_db('db_manager')
     def log_vitals(self, heart_rate, spo2, temperature=None):
-        """Store patient vital signs"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """Store patient vital signs; None for a field the reading didn't include (stored NULL, never alerts)"""
         # Check if vitals trigger alert
         alert = 0
-        if heart_rate < Config.HEART_RATE_MIN or heart_rate > Config.HEART_RATE_MAX:
+        if heart_rate is not None and (heart_rate < Config.HEART_RATE_MIN or heart_rate > Config.HEART_RATE_MAX):
             alert = 1
-        if spo2 < Config.SPO2_MIN:
+        if spo2 is not None and spo2 < Config.SPO2_MIN:
             alert = 1
         
-        cursor.execute('''
-            INSERT INTO vitals_log (timestamp, heart_rate, spo2, temperature, alert_triggered)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (datetime.now().isoformat(), heart_rate, spo2, temperature, alert))
+        with self.engine.begin() as conn:
+            conn.execute(text('''
+                INSERT INTO vitals_log (timestamp, heart_rate, spo2, temperature, alert_triggered)
+                VALUES (:timestamp, :heart_rate, :spo2, :temperature, :alert)
+            '''), {'timestamp': datetime.now().isoformat(), 'heart_rate': heart_rate, 'spo2': spo2,
+                   'temperature': temperature, 'alert': alert})
         
-        conn.commit()
-        conn.close()
+        VITALS_SAMPLES_TOTAL.inc(source='db_manager')
         return alert
     
     def get_recent_vitals(self, limit=50):
         """Get recent vital readings for charts"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM vitals_log 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
-        vitals = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return vitals[::-1]  # Reverse to chronological order
+        fields, rows = self.get_recent_vitals_rows(limit)
+        return [dict(zip(fields, row)) for row in rows]
+    
+    @track_db('db_manager')
+    def get_recent_vitals_rows(self, limit=50):
+        """Recent vitals as (column names, row tuples) in chronological order, without a dict per row"""
+        with self.engine.connect() as conn:
+            result = conn.execute(text('''
+                SELECT * FROM vitals_log 
+                ORDER BY timestamp DESC 
+                LIMIT :limit
+            '''), {'limit': limit})
+            fields, rows = tuple(result.keys()), [tuple(row) for row in result]
+        rows.reverse()  # Chronological order
+        return fields, rows
     
-    def get_robot_status(self):
+    @track_db('db_manager')
+    def get_robot_status(self, robot_id=1):
         """Get current robot state"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM robot_status WHERE id = 1')
-        status = dict(cursor.fetchone())
-        conn.close()
-        return status
+        with self.engine.connect() as conn:
+            row = conn.execute(text('SELECT * FROM robot_status WHERE id = :id'), {'id': robot_id}).mappings().first()
+        return dict(row) if row else None
     
-    def update_robot_status(self, **kwargs):
+    @track_db('db_manager')
+    def get_all_robot_status(self):
+        """Status rows for the whole fleet in one query"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text('''
+                SELECT r.id, r.name, r.camera_source, s.battery_level, s.location, s.is_moving, s.last_update,
+                       s.pose_x, s.pose_y, s.pose_theta
+                FROM robots r LEFT JOIN robot_status s ON s.id = r.id
+                ORDER BY r.id
+            ''')).mappings().all()
+        return [dict(row) for row in rows]
+    
+    @track_db('db_manager')
+    def update_robot_status(self, robot_id=1, **kwargs):
         """Update robot status fields"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # Build dynamic UPDATE query
-        fields = ', '.join([f'{k} = ?' for k in kwargs.keys()])
-        values = list(kwargs.values()) + [datetime.now().isoformat(), 1]
+        fields = ', '.join([f'{k} = :{k}' for k in kwargs.keys()])
+        params = dict(kwargs, _now=datetime.now().isoformat(), _id=robot_id)
         
-        cursor.execute(f'''
-            UPDATE robot_status 
-            SET {fields}, last_update = ?
-            WHERE id = ?
-        ''', values)
-        
-        conn.commit()
-        conn.close()
+        with self.engine.begin() as conn:
+            conn.execute(text(f'''
+                UPDATE robot_status 
+                SET {fields}, last_update = :_now
+                WHERE id = :_id
+            '''), params)
+    
+    @track_db('db_manager')
+    def register_robot(self, name, camera_source=None):
+        """Add a robot to the fleet and give it a status row. Returns its id."""
+        now = datetime.now().isoformat()
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                INSERT INTO robots (name, camera_source, registered_at)
+                VALUES (:name, :camera_source, :now)
+            '''), {'name': name, 'camera_source': camera_source, 'now': now})
+            robot_id = result.lastrowid
+            conn.execute(text('''
+                INSERT OR IGNORE INTO robot_status (id, battery_level, location, is_moving, last_update)
+                VALUES (:id, 100, 'charging_dock', 0, :now)
+            '''), {'id': robot_id, 'now': now})
+        return robot_id
 
     # ==========================================
     # NEW CODE FOR VOICE COMMANDS STARTS HERE
     # ==========================================
     
+    @track_db('db_manager')
     def add_schedule_item(self, medicine, time_obj, instructions=""):
         """
         Add a new schedule item derived from voice command.
@@ -249,9 +246,6 @@ class DatabaseManager:
             time_obj (datetime): Python datetime object of when to take it
             instructions (str): Notes like "Before Food" or "After Food"
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
         # Convert datetime object to string format compatible with your DB
         # Your DB uses: 'YYYY-MM-DD HH:MM'
         if isinstance(time_obj, datetime):
@@ -259,12 +253,9 @@ class DatabaseManager:
         else:
             time_str = str(time_obj)
 
-        cursor.execute('''
-            INSERT INTO schedule (time, task, status, notes)
-            VALUES (?, ?, ?, ?)
-        ''', (time_str, medicine, 'pending', instructions))
-
-        new_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return new_id
\ No newline at end of file
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                INSERT INTO schedule (time, task, status, notes)
+                VALUES (:time, :task, 'pending', :notes)
+            '''), {'time': time_str, 'task': medicine, 'notes': instructions})
+        return result.lastrowid
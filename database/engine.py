@@ -0,0 +1,117 @@
+"""
+Storage Engine
+One SQLAlchemy engine (and connection pool) per database for every
+component: Flask routes, DatabaseManager, hardware loops and background
+threads all go through get_engine().
+
+SQLite is tuned for a mixed read/write workload:
+    - WAL journal, so readers never block the writer (and vice versa)
+    - busy_timeout, so cross-process contention waits instead of failing
+    - a process-wide write lock taken before a transaction's first write
+      and released at commit/rollback, so in-process writers queue on a
+      Python lock rather than racing for SQLite's lock and hitting
+      "database is locked"
+
+The write lock is a semaphore, not an RLock: connections can be committed,
+checked in or garbage-collected on a thread other than the one that wrote,
+and the lock must be released wherever that happens. The cost is that one
+thread writing through two connections at once would wait on itself; after
+busy_timeout the second write goes ahead unqueued and SQLite's own locking
+decides, as it did before the lock existed.
+"""
+
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+DB_WRITE_LOCK_WAIT = REGISTRY.histogram('db_write_lock_wait_seconds', 'Time writers waited for the write lock')
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def sqlite_url(path):
+    return 'sqlite:///' + path
+
+
+def is_write(statement):
+    return statement.lstrip()[:7].upper().startswith(WRITE_VERBS)
+
+
+def get_engine(url=None):
+    """The shared engine for `url` (default Config.DATABASE_URL), created on first use"""
+    url = make_url(url or Config.DATABASE_URL)
+    key = url.render_as_string(hide_password=False)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = create_storage_engine(url)
+    return engine
+
+
+def create_storage_engine(url, busy_timeout=None):
+    url = make_url(url)
+    busy_timeout = Config.DB_BUSY_TIMEOUT if busy_timeout is None else busy_timeout
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(url, pool_pre_ping=True)
+
+    memory = url.database in (None, '', ':memory:')
+    options = {'connect_args': {'timeout': busy_timeout, 'check_same_thread': False}}
+    if memory:
+        options['poolclass'] = StaticPool
+    else:
+        options.update(pool_size=Config.DB_POOL_SIZE, max_overflow=Config.DB_MAX_OVERFLOW)
+    engine = create_engine(url, **options)
+
+    @event.listens_for(engine, 'connect')
+    def _configure_connection(dbapi_conn, record):
+        cursor = dbapi_conn.cursor()
+        if not memory:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout * 1000)}')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    install_write_lock(engine, busy_timeout)
+    return engine
+
+
+def install_write_lock(engine, busy_timeout=None):
+    """Serialize write transactions on `engine` behind one process-wide lock, held per connection"""
+    lock = threading.Semaphore(1)  # Any thread may release it (see the module docstring)
+    engine.write_lock = lock
+    wait = Config.DB_BUSY_TIMEOUT if busy_timeout is None else busy_timeout
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _acquire(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get('holds_write_lock') or not is_write(statement):
+            return
+        started = time.perf_counter()
+        acquired = lock.acquire(timeout=wait)
+        DB_WRITE_LOCK_WAIT.observe(time.perf_counter() - started)
+        if acquired:
+            conn.info['holds_write_lock'] = True
+        else:
+            log.warning("Write lock wait timed out, writing unqueued", waited=round(wait, 1))
+
+    def _release(info):
+        # The flag, not the thread, says who holds the lock, so release exactly once per holder
+        if info is not None and info.pop('holds_write_lock', False):
+            lock.release()
+
+    event.listen(engine, 'commit', lambda conn: _release(conn.info))
+    event.listen(engine, 'rollback', lambda conn: _release(conn.info))
+    # Safety net: a connection returned to the pool never keeps the lock
+    event.listen(engine.pool, 'checkin', lambda dbapi_conn, record: _release(record.info if record else None))
+    return lock
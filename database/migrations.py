@@ -0,0 +1,134 @@
+"""
+Schema Migrations
+Numbered steps for the tables DatabaseManager owns, tracked in SQLite's
+PRAGMA user_version; the ORM models are created from their metadata after
+the numbered steps. Every step must be safe on databases created before
+migrations existed (CREATE ... IF NOT EXISTS, column checks).
+"""
+
+from sqlalchemy import text
+
+from monitoring.log import get_logger
+
+log = get_logger(__name__)
+
+
+def _hardware_tables(conn):
+    # Schedule Table: Doctor's prescribed timeline
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            time TEXT NOT NULL,
+            task TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            completed_at TEXT,
+            notes TEXT
+        )
+    ''')
+    # Inventory Table: Track supplies
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS inventory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item TEXT UNIQUE NOT NULL,
+            quantity INTEGER DEFAULT 0,
+            unit TEXT,
+            last_updated TEXT
+        )
+    ''')
+    # Vitals Log: Patient health data history
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS vitals_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            heart_rate INTEGER,
+            spo2 INTEGER,
+            temperature REAL,
+            alert_triggered INTEGER DEFAULT 0
+        )
+    ''')
+    # Robot Status: Current state
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS robot_status (
+            id INTEGER PRIMARY KEY,
+            battery_level INTEGER DEFAULT 100,
+            location TEXT DEFAULT 'charging_dock',
+            is_moving INTEGER DEFAULT 0,
+            last_update TEXT
+        )
+    ''')
+    # Robots: Fleet registry (one robot_status row per robot)
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS robots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            camera_source TEXT,
+            registered_at TEXT
+        )
+    ''')
+
+
+def _robot_pose(conn):
+    ensure_columns(conn, 'robot_status', {'pose_x': 'REAL', 'pose_y': 'REAL', 'pose_theta': 'REAL'})
+
+
+def _vitals_timestamp_index(conn):
+    # get_recent_vitals orders by timestamp; without this it sorts the whole log
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_vitals_log_timestamp ON vitals_log (timestamp)')
+
+
+def _shard_directory(conn):
+    # Site name -> number; the number picks the shard's id range (see database.sharding)
+    conn.exec_driver_sql('''
+        CREATE TABLE IF NOT EXISTS shard_sites (
+            name TEXT PRIMARY KEY,
+            number INTEGER UNIQUE NOT NULL,
+            created_at TEXT
+        )
+    ''')
+
+
+def _user_site(conn):
+    # Fresh databases get the column from the User model via create_all
+    if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user'").first():
+        ensure_columns(conn, 'user', {'site': 'VARCHAR(64)'})
+
+
+MIGRATIONS = [
+    (1, 'hardware tables', _hardware_tables),
+    (2, 'robot pose columns', _robot_pose),
+    (3, 'vitals timestamp index', _vitals_timestamp_index),
+    (4, 'shard directory', _shard_directory),
+    (5, 'user site', _user_site),
+]
+
+
+def ensure_columns(conn, table, columns):
+    """ALTER TABLE ADD COLUMN for any of `columns` the table is missing"""
+    existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+    for name, col_type in columns.items():
+        if name not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {name} {col_type}')
+
+
+def schema_version(engine):
+    with engine.connect() as conn:
+        return conn.execute(text('PRAGMA user_version')).scalar()
+
+
+def migrate(engine, metadata=None):
+    """
+    Apply pending numbered steps (one transaction each), then create any
+    missing ORM tables from `metadata`. Returns the resulting version.
+    """
+    version = schema_version(engine)
+    for number, name, step in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+        log.info("Migration applied", version=number, name=name)
+        version = number
+    if metadata is not None:
+        metadata.create_all(engine)
+    return version
@@ -0,0 +1,332 @@
+"""
+Tenant Sharding
+Each care site keeps its patients, medications, logs and dose history in its
+own SQLite file under Config.SHARD_DIR. Every shard has its own engine and
+write lock, so one site's writes never queue behind another's. Accounts and
+the site directory stay in the main database.
+
+    - ShardRouter opens shards on demand and keeps at most SHARD_MAX_OPEN
+      of them, closing the least recently used idle one first; a shard
+      held through lease() (or acquire()/release()) is never closed, so
+      nobody keeps using an engine the router has already replaced
+    - rows get globally unique ids: every shard's tables are AUTOINCREMENT
+      with a sequence starting at site_number * SHARD_ID_SPAN, so background
+      services keyed by medication id work across shards
+    - query_all() runs one admin query on every shard
+    - split_database() moves an existing single-file database into shards
+
+Usage:
+    python -m database.sharding split --assign alice=north bob=south
+    python -m database.sharding stats
+"""
+
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import MetaData, Integer, select, text
+
+from config import Config
+from database.engine import create_storage_engine, sqlite_url
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+SHARDS_OPEN = REGISTRY.gauge('shards_open', 'Shard engines currently open')
+SHARD_EVICTIONS = REGISTRY.counter('shard_evictions_total', 'Shard engines closed by the LRU')
+
+DIRECTORY_TABLES = {'user'}  # Stay in the main database; everything else in the ORM metadata is per site
+SITE_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+current_site = contextvars.ContextVar('current_site', default=None)
+
+
+@contextmanager
+def use_site(site):
+    """Route ORM tenant tables to `site`'s shard for the duration of the block"""
+    token = current_site.set(site)
+    try:
+        yield
+    finally:
+        current_site.reset(token)
+
+
+def check_site(site):
+    if not site or not SITE_NAME.match(site):
+        raise ValueError(f'Invalid site name: {site!r}')
+    return site
+
+
+def tenant_tables(metadata):
+    return [table for table in metadata.sorted_tables if table.name not in DIRECTORY_TABLES]
+
+
+def shard_metadata(metadata):
+    """
+    The ORM schema with AUTOINCREMENT on tenant tables' integer primary keys,
+    so their sequences can be seeded. Directory tables are copied too (and
+    left empty) so foreign keys still resolve.
+    """
+    copy = MetaData()
+    for table in metadata.sorted_tables:
+        shard_table = table.to_metadata(copy)
+        pk = list(shard_table.primary_key.columns)
+        if table.name not in DIRECTORY_TABLES and len(pk) == 1 and isinstance(pk[0].type, Integer):
+            shard_table.dialect_kwargs['sqlite_autoincrement'] = True
+    return copy
+
+
+def site_number(engine, site):
+    """Stable small integer for `site` from the main database's directory, allocated on first use"""
+    with engine.begin() as conn:
+        number = conn.execute(text('SELECT number FROM shard_sites WHERE name = :name'), {'name': site}).scalar()
+        if number is None:
+            number = conn.execute(text('SELECT COALESCE(MAX(number), 0) + 1 FROM shard_sites')).scalar()
+            conn.execute(text('INSERT INTO shard_sites (name, number, created_at) VALUES (:name, :number, :now)'),
+                         {'name': site, 'number': number, 'now': datetime.now().isoformat()})
+    return number
+
+
+class ShardRouter:
+    def __init__(self, directory, metadata, shard_dir=None, max_open=Config.SHARD_MAX_OPEN,
+                 idle_seconds=Config.SHARD_IDLE_SECONDS, id_span=Config.SHARD_ID_SPAN, clock=time.monotonic):
+        """
+        Args:
+            directory: Engine of the main database (accounts and shard_sites)
+            metadata: ORM metadata; tenant tables are created in every shard
+            max_open (int): Shard engines kept open; idle ones beyond this are closed
+            idle_seconds (float): evict_idle() closes shards unused for this long
+            id_span (int): Ids reserved per site (site n starts at n * id_span)
+        """
+        self.directory = directory
+        self.metadata = shard_metadata(metadata)
+        self.shard_dir = shard_dir or Config.SHARD_DIR
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.id_span = id_span
+        self.clock = clock
+        self.engines = OrderedDict()  # site -> engine, least recently used first
+        self.last_used = {}
+        self.leases = Counter()  # site -> holders that must not see it closed
+        self.prepared = set()  # Sites whose shard file has been migrated this process
+        self.lock = threading.Lock()
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def path_for(self, site):
+        return os.path.join(self.shard_dir, f'{check_site(site)}.db')
+
+    def sites(self):
+        """Every site with a shard file, opened or not"""
+        return sorted(name[:-3] for name in os.listdir(self.shard_dir) if name.endswith('.db'))
+
+    def engine_for(self, site):
+        """The shard's engine, unpinned: only safe while a lease on `site` is held or for one-off use"""
+        return self._open(site, pin=False)
+
+    def acquire(self, site):
+        """The shard's engine, pinned open until the matching release(site)"""
+        return self._open(site, pin=True)
+
+    def release(self, site):
+        with self.lock:
+            self.leases[site] -= 1
+            if self.leases[site] <= 0:
+                del self.leases[site]
+            self._evict(self.max_open)  # Shards kept over the limit by a lease can go now
+            SHARDS_OPEN.set(len(self.engines))
+
+    @contextmanager
+    def lease(self, site):
+        engine = self.acquire(site)
+        try:
+            yield engine
+        finally:
+            self.release(site)
+
+    def _open(self, site, pin):
+        with self.lock:
+            engine = self.engines.get(site)
+            if engine is not None:
+                self.engines.move_to_end(site)
+                self.last_used[site] = self.clock()
+                if pin:
+                    self.leases[site] += 1
+                return engine
+        engine = create_storage_engine(sqlite_url(self.path_for(site)))
+        if site not in self.prepared:
+            self._prepare(site, engine)
+        with self.lock:
+            existing = self.engines.get(site)
+            if existing is not None:  # Another thread opened it first
+                engine.dispose()
+                engine = existing
+            else:
+                self.engines[site] = engine
+            self.last_used[site] = self.clock()
+            if pin:
+                self.leases[site] += 1
+            self._evict(self.max_open, spare=site)
+            SHARDS_OPEN.set(len(self.engines))
+        return engine
+
+    def _busy(self, site):
+        """Leased, or a connection is out: closing it now would strand its users on a disposed engine"""
+        return self.leases[site] > 0 or self.engines[site].pool.checkedout() > 0
+
+    def _prepare(self, site, engine):
+        """Schema plus id sequences for a shard; a no-op for shards that already have them"""
+        self.metadata.create_all(engine)
+        base = site_number(self.directory, site) * self.id_span
+        with engine.begin() as conn:
+            for table in self.metadata.sorted_tables:
+                if not table.dialect_options['sqlite']['autoincrement']:
+                    continue
+                exists = conn.execute(text('SELECT 1 FROM sqlite_sequence WHERE name = :t'), {'t': table.name}).first()
+                if not exists:
+                    conn.execute(text('INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :seq)'),
+                                 {'t': table.name, 'seq': base})
+        self.prepared.add(site)
+        log.info("Shard ready", site=site, id_base=base)
+
+    def _evict(self, keep, spare=None):
+        """Close least recently used shards that aren't busy (or `spare`) until `keep` remain (lock held)"""
+        for site in list(self.engines):
+            if len(self.engines) <= keep:
+                break
+            if site == spare or self._busy(site):
+                continue
+            del self.last_used[site]
+            self.engines.pop(site).dispose()
+            SHARD_EVICTIONS.inc()
+
+    def evict_idle(self):
+        """Close shards unused for idle_seconds; returns how many were closed"""
+        cutoff = self.clock() - self.idle_seconds
+        closed = 0
+        with self.lock:
+            for site in [s for s, used in self.last_used.items() if used < cutoff]:
+                if self._busy(site):
+                    continue
+                del self.last_used[site]
+                self.engines.pop(site).dispose()
+                SHARD_EVICTIONS.inc()
+                closed += 1
+            SHARDS_OPEN.set(len(self.engines))
+        return closed
+
+    def query_all(self, sql, params=None, sites=None, workers=4):
+        """Runs one read query on every shard in parallel; rows come back as dicts with a 'site' key"""
+        def run(site):
+            with self.lease(site) as engine, engine.connect() as conn:
+                return [dict(row, site=site) for row in conn.execute(text(sql), params or {}).mappings()]
+
+        sites = self.sites() if sites is None else sites
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sites) or 1))) as pool:
+            return [row for rows in pool.map(run, sites) for row in rows]
+
+    def stats(self):
+        with self.lock:
+            open_sites = list(self.engines)
+        return {'sites': self.sites(), 'open': open_sites, 'max_open': self.max_open}
+
+    def close(self):
+        with self.lock:
+            self._evict(0)
+            SHARDS_OPEN.set(len(self.engines))
+
+
+# ---------- splitting an existing database ----------
+def split_database(source, router, metadata, assign=None, default_site=None):
+    """
+    Copies each user's tenant rows from `source` (the single-file engine)
+    into their site's shard and records the site on the user row. Ids are
+    kept, so links between tables and to background state stay valid.
+    Source rows are left in place as a fallback; refuses shards that already
+    hold data.
+
+    Args:
+        assign (dict): username -> site; others keep user.site or default_site
+    Returns: {site: {table: rows copied}}
+    """
+    assign = assign or {}
+    default_site = check_site(default_site or Config.DEFAULT_SITE)
+    users = metadata.tables['user']
+    with source.connect() as conn:
+        rows = conn.execute(select(users.c.id, users.c.username, users.c.site)).all()
+    site_of = {row.id: check_site(assign.get(row.username) or row.site or default_site) for row in rows}
+
+    summary = {}
+    for site in sorted(set(site_of.values())):
+        user_ids = [uid for uid, s in site_of.items() if s == site]
+        with router.lease(site) as engine:
+            summary[site] = copy_tenant_rows(source, engine, metadata, user_ids)
+
+    with source.begin() as conn:
+        for user_id, site in site_of.items():
+            conn.execute(users.update().where(users.c.id == user_id).values(site=site))
+    log.info("Database split", sites=len(summary), users=len(site_of))
+    return summary
+
+
+def copy_tenant_rows(source, target, metadata, user_ids):
+    """
+    Rows owned by `user_ids`: tables with a user_id column directly, then any
+    table whose foreign key points at rows already copied (medication via patient).
+    """
+    copied_ids = {}
+    counts = {}
+    with source.connect() as src, target.begin() as dst:
+        for table in tenant_tables(metadata):
+            if dst.execute(select(table).limit(1)).first():
+                raise ValueError(f'Shard already has rows in {table.name}; refusing to split into it')
+            if 'user_id' in table.c:
+                query = select(table).where(table.c.user_id.in_(user_ids))
+            else:
+                fk = next((fk for fk in table.foreign_keys if fk.column.table.name in copied_ids), None)
+                if fk is None:
+                    continue
+                query = select(table).where(fk.parent.in_(copied_ids[fk.column.table.name]))
+            rows = [dict(row) for row in src.execute(query).mappings()]
+            if rows:
+                dst.execute(table.insert(), rows)
+            if 'id' in table.c:
+                copied_ids[table.name] = [row['id'] for row in rows]
+            counts[table.name] = len(rows)
+    return counts
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Per-site database shards')
+    sub = parser.add_subparsers(dest='command', required=True)
+    split = sub.add_parser('split', help='Move tenant rows from the main database into per-site shards')
+    split.add_argument('--assign', nargs='*', default=[], metavar='USER=SITE')
+    split.add_argument('--default-site', default=Config.DEFAULT_SITE)
+    sub.add_parser('stats', help='Sites and row counts per shard')
+    args = parser.parse_args(argv)
+
+    import app as robo_app  # Needs the ORM metadata
+    robo_app.init_storage()
+    with robo_app.app.app_context():
+        engine = robo_app.db.engine
+    router = robo_app.shards or ShardRouter(engine, robo_app.db.metadata)
+    if args.command == 'split':
+        assign = dict(pair.split('=', 1) for pair in args.assign)
+        result = split_database(engine, router, robo_app.db.metadata, assign, args.default_site)
+    else:
+        result = router.query_all("SELECT (SELECT COUNT(*) FROM patient) AS patients, "
+                                  "(SELECT COUNT(*) FROM activity_log) AS log_rows")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Priority Admission Control
+Every request is classified before it runs and admitted against one shared
+concurrency budget, so a panic button press never queues behind chart polls:
+
+    emergency > dispense > write > poll > stream
+
+    - each class may only use the capacity not reserved for the classes
+      above it; emergencies are always admitted, even over capacity
+    - when no slot is free a request waits, higher classes first, for at most
+      its class's max wait and queue length, then is shed with 503 and
+      Retry-After; polls and streams wait least, so they are shed first
+    - MJPEG streams keep their slot until the client disconnects and have
+      their own cap
+    - queue wait, in-flight and shed counts per class are exported as metrics
+
+Routes are classified by endpoint name; anything unlisted is a poll when it
+only reads (GET/HEAD/OPTIONS) and a write otherwise.
+"""
+
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import QUEUE_DEPTH, REGISTRY
+
+log = get_logger(__name__)
+
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    'admission_queue_wait_seconds', 'Time admitted requests waited for a slot', ['priority'])
+ADMISSION_SHED = REGISTRY.counter('admission_shed_total', 'Requests rejected with 503 under load', ['priority'])
+ADMISSION_IN_FLIGHT = REGISTRY.gauge('admission_in_flight', 'Admitted requests still running', ['priority'])
+
+PRIORITIES = ('emergency', 'dispense', 'write', 'poll', 'stream')  # Most important first
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class AdmissionController:
+    def __init__(self, capacity=Config.ADMISSION_CAPACITY, reserved=Config.ADMISSION_RESERVED,
+                 max_wait=Config.ADMISSION_MAX_WAIT, max_queue=Config.ADMISSION_MAX_QUEUE,
+                 max_streams=Config.ADMISSION_MAX_STREAMS):
+        """
+        Args:
+            capacity (int): Requests running at once across all classes
+            reserved (dict): priority -> slots that classes below it can't use
+            max_wait (dict): priority -> seconds a request may queue before it is shed
+            max_queue (dict): priority -> requests allowed to queue at once
+            max_streams (int): Concurrent streams, within the stream class's share
+        """
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.max_streams = max_streams
+        self.limits = {}
+        held_back = 0
+        for priority in PRIORITIES:
+            self.limits[priority] = float('inf') if priority == 'emergency' else capacity - held_back
+            held_back += reserved.get(priority, 0)
+        self.in_flight = dict.fromkeys(PRIORITIES, 0)
+        self.waiting = dict.fromkeys(PRIORITIES, 0)
+        self.running = 0
+        self.cond = threading.Condition()
+
+    def _can_run(self, priority):
+        """Lock held. A free slot within the class's share and nobody more important queued"""
+        if self.running >= self.limits[priority]:
+            return False
+        if priority == 'stream' and self.in_flight['stream'] >= self.max_streams:
+            return False
+        return not any(self.waiting[p] for p in PRIORITIES[:PRIORITIES.index(priority)])
+
+    def acquire(self, priority):
+        """Takes a slot for `priority`; returns the seconds spent queued, or None if the request is shed"""
+        started = time.monotonic()
+        with self.cond:
+            if not self._can_run(priority):
+                max_wait = self.max_wait.get(priority, 0)
+                if max_wait <= 0 or self.waiting[priority] >= self.max_queue.get(priority, 0):
+                    ADMISSION_SHED.inc(priority=priority)
+                    return None
+                deadline = started + max_wait
+                self.waiting[priority] += 1
+                QUEUE_DEPTH.set(self.waiting[priority], queue=f'admission_{priority}')
+                try:
+                    while not self._can_run(priority):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            ADMISSION_SHED.inc(priority=priority)
+                            return None
+                        self.cond.wait(remaining)
+                finally:
+                    self.waiting[priority] -= 1
+                    QUEUE_DEPTH.set(self.waiting[priority], queue=f'admission_{priority}')
+                    self.cond.notify_all()  # Lower classes may have been waiting on this one
+            self.in_flight[priority] += 1
+            self.running += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight[priority], priority=priority)
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(waited, priority=priority)
+        return waited
+
+    def release(self, priority):
+        with self.cond:
+            self.in_flight[priority] -= 1
+            self.running -= 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight[priority], priority=priority)
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {'capacity': self.capacity, 'running': self.running,
+                    'in_flight': dict(self.in_flight), 'waiting': dict(self.waiting)}
+
+
+class Admission:
+    def __init__(self, app=None, routes=None, controller=None, enabled=Config.ADMISSION_ENABLED,
+                 retry_after=Config.ADMISSION_RETRY_AFTER):
+        """
+        Args:
+            routes (dict): endpoint name -> priority, for routes the method default gets wrong
+            retry_after (int): Seconds suggested to shed clients
+        """
+        self.routes = routes or {}
+        self.controller = controller or AdmissionController()
+        self.enabled = enabled
+        self.retry_after = retry_after
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for endpoint, priority in self.routes.items():
+            if priority not in PRIORITIES:
+                raise ValueError(f'Unknown priority {priority!r} for {endpoint}')
+        # Ahead of every other hook, so shed requests cost nothing beyond this check
+        app.before_request_funcs.setdefault(None, []).insert(0, self.admit)
+        app.after_request(self.hold_stream)
+        app.teardown_request(self.release)
+        app.extensions['admission'] = self
+
+    def classify(self):
+        if request.endpoint in self.routes:
+            return self.routes[request.endpoint]
+        return 'poll' if request.method in READ_METHODS else 'write'
+
+    def admit(self):
+        if not self.enabled:
+            return None
+        priority = self.classify()
+        if self.controller.acquire(priority) is None:
+            log.debug("Request shed", priority=priority, endpoint=request.endpoint)
+            response = jsonify({'success': False, 'message': 'Server busy, please retry'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(self.retry_after)
+            return response
+        g.admission_priority = priority
+        return None
+
+    def hold_stream(self, response):
+        """Streamed bodies run after teardown; keep their slot until the client goes away"""
+        if g.get('admission_priority') == 'stream' and response.is_streamed:
+            priority = g.pop('admission_priority')
+            response.call_on_close(lambda: self.controller.release(priority))
+        return response
+
+    def release(self, exc):
+        priority = g.pop('admission_priority', None)
+        if priority is not None:
+            self.controller.release(priority)
@@ -0,0 +1,238 @@
+"""
+Static Asset Pipeline
+Build step plus Flask extension for the dashboard's JS and CSS:
+
+    - per-page bundles are concatenated and minified
+    - each output is named by its content hash (dashboard.3f9a1c2e.js), so
+      it can be cached forever and a new build is a new URL
+    - gzip (and brotli, when the `brotli` package is installed) variants are
+      written next to it and picked by Accept-Encoding at request time
+    - asset_url('dashboard.js') in templates resolves through the manifest,
+      falling back to the plain /static file when nothing has been built
+
+Build with `python -m extensions.assets` (or `flask assets build`); the app
+also rebuilds stale bundles at startup.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+from config import Config
+from monitoring.log import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Output name -> sources (relative to static/), in load order
+BUNDLES = {
+    'app.css': ['css/style.css'],
+    'dashboard.js': ['js/script.js'],
+    'landing.js': ['js/landing_script.js'],
+    'map.js': ['js/astar.js'],
+}
+
+# ---------- minifiers ----------
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    """Comments, whitespace runs and spaces around punctuation; selectors keep their meaning"""
+    css = _CSS_COMMENT.sub('', source)
+    css = _CSS_SPACE.sub(' ', css)
+    css = _CSS_PUNCT.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def minify_js(source):
+    """
+    Conservative: drops comments and indentation and blank lines but keeps
+    line breaks, so automatic semicolon insertion behaves exactly as before.
+    Strings, template literals and regex literals are copied verbatim.
+    """
+    out, i, n = [], 0, len(source)
+    last = '('  # Last significant character copied, to tell regex literals from division
+    while i < n:
+        ch = source[i]
+        if ch in '"\'`':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i, last = j + 1, ch
+        elif source.startswith('//', i):
+            while i < n and source[i] != '\n':
+                i += 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+        elif ch == '/' and last in _REGEX_PREFIX:
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/') and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            out.append(source[i:j + 1])
+            i, last = j + 1, '/'
+        else:
+            out.append(ch)
+            if not ch.isspace():
+                last = ch
+            i += 1
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# ---------- build ----------
+def fingerprint(name, content):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:8]}{ext}'
+
+
+def write_variants(path, content):
+    """The file itself plus precompressed siblings; gzip mtime is pinned so builds are reproducible"""
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def source_mtimes(static_dir, bundles):
+    return {src: os.path.getmtime(os.path.join(static_dir, src)) for sources in bundles.values() for src in sources}
+
+
+def build(static_dir=None, out_dir=None, bundles=None):
+    """
+    Writes every bundle to `out_dir` and returns the manifest:
+    {'assets': {name: fingerprinted name}, 'sources': {src: mtime}}.
+    Outputs from earlier builds are removed.
+    """
+    static_dir = static_dir or Config.STATIC_DIR
+    out_dir = out_dir or Config.ASSET_DIR
+    bundles = bundles or BUNDLES
+    os.makedirs(out_dir, exist_ok=True)
+
+    assets = {}
+    for name, sources in bundles.items():
+        parts = []
+        for src in sources:
+            with open(os.path.join(static_dir, src), encoding='utf-8') as f:
+                parts.append(f.read())
+        minify = MINIFIERS.get(os.path.splitext(name)[1], lambda text: text)
+        content = '\n'.join(minify(part) for part in parts).encode('utf-8')
+        assets[name] = fingerprint(name, content)
+        write_variants(os.path.join(out_dir, assets[name]), content)
+
+    keep = {MANIFEST} | {f + suffix for f in assets.values() for suffix in ('', '.gz', '.br')}
+    for stale in set(os.listdir(out_dir)) - keep:
+        os.remove(os.path.join(out_dir, stale))
+
+    manifest = {'assets': assets, 'sources': source_mtimes(static_dir, bundles)}
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    log.info("Assets built", bundles=len(assets), out_dir=out_dir, brotli=brotli is not None)
+    return manifest
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------- Flask extension ----------
+class Assets:
+    def __init__(self, app=None, static_dir=None, out_dir=None, bundles=None):
+        self.static_dir = static_dir or Config.STATIC_DIR
+        self.out_dir = out_dir or Config.ASSET_DIR
+        self.bundles = bundles or BUNDLES
+        self.manifest = load_manifest(self.out_dir)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+        app.extensions['assets'] = self
+
+        @app.cli.group('assets')
+        def assets_cli():
+            """Static asset pipeline"""
+
+        @assets_cli.command('build')
+        def build_command():
+            """Bundle, minify, fingerprint and precompress static assets"""
+            self.build()
+
+    def build(self):
+        self.manifest = build(self.static_dir, self.out_dir, self.bundles)
+        return self.manifest
+
+    def is_stale(self):
+        if not self.manifest or set(self.manifest['assets']) != set(self.bundles):
+            return True
+        try:
+            return source_mtimes(self.static_dir, self.bundles) != self.manifest['sources']
+        except OSError:
+            return True
+
+    def build_if_stale(self):
+        return self.build() if self.is_stale() else self.manifest
+
+    def url(self, name):
+        """Fingerprinted URL for a bundle; unbuilt bundles fall back to their single /static source"""
+        if self.manifest and name in self.manifest['assets']:
+            return url_for('assets', filename=self.manifest['assets'][name])
+        return url_for('static', filename=self.bundles[name][0])
+
+    def serve(self, filename):
+        """Serves the best precompressed variant the client accepts, cached as immutable"""
+        accepted = request.accept_encodings
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if accepted[name] and os.path.exists(os.path.join(self.out_dir, filename + suffix)):
+                encoding = name
+                break
+        path = filename + dict(ENCODINGS)[encoding] if encoding else filename
+        response = send_from_directory(self.out_dir, path, mimetype=mimetypes.guess_type(filename)[0],
+                                       conditional=True, max_age=31536000)
+        if encoding:
+            response.content_encoding = encoding
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+if __name__ == '__main__':
+    manifest = build()
+    print(json.dumps(manifest['assets'], indent=2))
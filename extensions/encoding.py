@@ -0,0 +1,151 @@
+"""
+Response Encoding
+Content negotiation and compression for the JSON APIs:
+
+    - tabular endpoints hand respond() a Table (field names plus row tuples)
+      and it is encoded in the format the client's Accept header prefers:
+        application/json                      list of objects, as jsonify always sent
+        application/vnd.medrobot.columns+json one array per field: {"time": [...], "task": [...]}
+        application/msgpack                   the columnar shape as MessagePack
+                                              (when the `msgpack` package is installed)
+      columns are transposed straight from the row tuples; only the default
+      JSON shape builds one dict per row
+    - any response body over COMPRESS_MIN_SIZE is compressed with zstd (when
+      the `zstandard` package is installed) or gzip, whichever the client's
+      Accept-Encoding allows, unless it is streamed, a file, or already encoded
+
+Clients that send neither header get exactly the bytes they got before.
+"""
+
+import gzip
+import json
+import time
+
+from flask import current_app, jsonify, request
+
+from config import Config
+from monitoring.metrics import REGISTRY
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = 'application/json'
+COLUMNS = 'application/vnd.medrobot.columns+json'
+MSGPACK = 'application/msgpack'
+COMPRESSIBLE = {JSON, COLUMNS, MSGPACK, 'text/html', 'text/plain', 'text/csv', 'text/css', 'application/javascript'}
+
+RESPONSE_ENCODE_SECONDS = REGISTRY.histogram('response_encode_seconds', 'Serializing API responses by format',
+                                             ['format'], buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
+RESPONSE_COMPRESSED = REGISTRY.counter('responses_compressed_total', 'Responses compressed by encoding', ['encoding'])
+RESPONSE_BYTES_SAVED = REGISTRY.counter('response_bytes_saved_total', 'Body bytes removed by compression')
+
+
+class Table:
+    """Rows that share one set of fields, kept as tuples until the response is written"""
+
+    __slots__ = ('fields', 'rows')
+
+    def __init__(self, fields, rows):
+        self.fields = tuple(fields)
+        self.rows = rows if isinstance(rows, list) else list(rows)
+
+    def dicts(self):
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in self.rows]
+
+    def columns(self):
+        if not self.rows:
+            return {field: [] for field in self.fields}
+        return dict(zip(self.fields, map(list, zip(*self.rows))))
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, separators=(',', ':'), default=str).encode()
+
+
+def preferred_format():
+    """JSON, COLUMNS or MSGPACK: the best the Accept header allows; JSON when it says nothing"""
+    accept = request.headers.get('Accept', '')
+    if 'columns' not in accept and 'msgpack' not in accept:
+        return JSON  # Nearly every request; skips the full quality-value parse
+    offered = [JSON, COLUMNS, MSGPACK] if msgpack is not None else [JSON, COLUMNS]
+    return request.accept_mimetypes.best_match(offered, default=JSON)
+
+
+def respond(data, status=200):
+    """
+    Response for `data` (a Table or any JSON-able value) in the negotiated
+    format. Only Tables have a columnar shape; other values are sent as
+    MessagePack or plain JSON.
+    """
+    fmt = preferred_format()
+    started = time.perf_counter()
+    if fmt == MSGPACK:
+        body = msgpack.packb(data.columns() if isinstance(data, Table) else data, default=str)
+        response = current_app.response_class(body, mimetype=MSGPACK)
+    elif fmt == COLUMNS and isinstance(data, Table):
+        response = current_app.response_class(_dumps(data.columns()), mimetype=COLUMNS)
+    else:
+        fmt = JSON
+        response = jsonify(data.dicts() if isinstance(data, Table) else data)
+    RESPONSE_ENCODE_SECONDS.observe(time.perf_counter() - started, format=fmt.rsplit('/', 1)[-1])
+    response.status_code = status
+    response.headers['Vary'] = 'Accept'  # A fresh response: no need to parse and merge an existing Vary
+    return response
+
+
+def compress(body, encoding):
+    if encoding == 'zstd':
+        # Compressor objects aren't safe to share between request threads
+        return zstandard.ZstdCompressor(level=Config.COMPRESS_ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=Config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class Encoding:
+    def __init__(self, app=None, enabled=Config.COMPRESS_ENABLED, min_size=Config.COMPRESS_MIN_SIZE):
+        """
+        Args:
+            min_size (int): Smaller bodies are sent as-is; the header overhead isn't worth it
+        """
+        self.enabled = enabled
+        self.min_size = min_size
+        self.encodings = ('zstd', 'gzip') if zstandard is not None else ('gzip',)  # Preferred first
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        app.extensions['encoding'] = self
+
+    def compress_response(self, response):
+        if (not self.enabled or response.direct_passthrough or response.is_streamed
+                or response.content_encoding or response.mimetype not in COMPRESSIBLE
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = next((name for name in self.encodings if request.accept_encodings[name]), None)
+        body = response.get_data()
+        if encoding is None or len(body) < self.min_size:
+            return response
+        packed = compress(body, encoding)
+        if len(packed) >= len(body):
+            return response
+        response.set_data(packed)
+        response.content_encoding = encoding
+        RESPONSE_COMPRESSED.inc(encoding=encoding)
+        RESPONSE_BYTES_SAVED.inc(len(body) - len(packed))
+        return response
@@ -0,0 +1,123 @@
+"""
+Session Identity Cache
+Keeps authentication off the database for the common case:
+
+    - the principal (id, username) travels in the signed session cookie, so
+      auth-only polls like /api/vitals/current build current_user without a
+      query
+    - the patient -> medication graph behind current_user.patients is cached
+      per user for a short TTL, loaded on first use and dropped by the write
+      routes once their transaction commits
+
+Graph entries are plain tuples detached from any SQLAlchemy session, so they
+are safe to share between request threads.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from flask_login import UserMixin
+
+from config import Config
+from monitoring.metrics import REGISTRY
+
+IDENTITY_CACHE_TOTAL = REGISTRY.counter('identity_cache_total', 'Identity lookups by result', ['part', 'result'])
+
+SESSION_KEY = 'identity'
+
+PatientView = namedtuple('PatientView', 'id name medications')
+MedicationView = namedtuple('MedicationView', 'id patient_id name dosage stock max_stock schedule_time '
+                                              'instructions frequency days last_taken')
+
+
+def session_claims(user):
+    """What authorization needs, stored next to Flask-Login's _user_id"""
+    return {'id': user.id, 'username': user.username, 'site': user.site}
+
+
+class Identity(UserMixin):
+    """current_user for cached sessions; `patients` is fetched lazily from the cache"""
+
+    def __init__(self, cache, id, username, site=None):
+        self.cache = cache
+        self.id = id
+        self.username = username
+        self.site = site
+
+    @property
+    def patients(self):
+        return self.cache.patients(self.id)
+
+    def __repr__(self):
+        return f'<Identity {self.id} {self.username}>'
+
+
+class IdentityCache:
+    def __init__(self, load_user, load_patients, ttl=Config.IDENTITY_CACHE_TTL, clock=time.monotonic):
+        """
+        Args:
+            load_user (callable): user_id -> claims dict (see session_claims) or None
+            load_patients (callable): user_id -> [PatientView]
+            ttl (float): Seconds a graph stays valid without an invalidation
+        """
+        self.load_user = load_user
+        self.load_patients = load_patients
+        self.ttl = ttl
+        self.clock = clock
+        self.principals = {}  # user_id -> claims
+        self.graphs = {}  # user_id -> (expires_at, (PatientView, ...))
+        self.versions = {}  # user_id -> bumped on invalidate, so in-flight loads are discarded
+        self.lock = threading.Lock()
+
+    def identity(self, user_id, claims=None):
+        """
+        Identity for `user_id`, trusting `claims` from the signed session when
+        they name the same user. Returns None for unknown users.
+        """
+        if claims and claims.get('id') == user_id:
+            IDENTITY_CACHE_TOTAL.inc(part='principal', result='session')
+        else:
+            with self.lock:
+                claims = self.principals.get(user_id)
+            if claims is not None:
+                IDENTITY_CACHE_TOTAL.inc(part='principal', result='hit')
+            else:
+                IDENTITY_CACHE_TOTAL.inc(part='principal', result='miss')
+                claims = self.load_user(user_id)
+                if claims is None:
+                    return None
+                with self.lock:
+                    self.principals[user_id] = claims
+        return Identity(self, user_id, claims['username'], claims.get('site'))
+
+    def patients(self, user_id):
+        now = self.clock()
+        with self.lock:
+            entry = self.graphs.get(user_id)
+            version = self.versions.get(user_id, 0)
+        if entry is not None and entry[0] > now:
+            IDENTITY_CACHE_TOTAL.inc(part='graph', result='hit')
+            return entry[1]
+        IDENTITY_CACHE_TOTAL.inc(part='graph', result='miss')
+        graph = tuple(self.load_patients(user_id))
+        with self.lock:
+            if self.versions.get(user_id, 0) == version:
+                self.graphs[user_id] = (now + self.ttl, graph)
+        return graph
+
+    def invalidate(self, user_id):
+        """Drop the user's graph; call after the write that changed it has committed"""
+        with self.lock:
+            self.graphs.pop(user_id, None)
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+
+    def forget(self, user_id):
+        """Drop the principal too (account changes)"""
+        with self.lock:
+            self.principals.pop(user_id, None)
+        self.invalidate(user_id)
+
+    def stats(self):
+        with self.lock:
+            return {'principals': len(self.principals), 'graphs': len(self.graphs)}
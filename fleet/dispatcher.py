@@ -0,0 +1,53 @@
+"""
+Dose Dispatcher
+Groups pending doses into one trip per destination room and hands each
+trip to the nearest free robot (greedy, earliest dose first).
+"""
+
+from config import Config
+
+
+def robot_position(handle):
+    """Latest reported pose if any, otherwise the coordinates of its named location"""
+    pose = handle.status.get('pose')
+    if pose:
+        return pose['x'], pose['y']
+    return Config.ROOM_COORDINATES.get(handle.status.get('location'), Config.ROOM_COORDINATES['charging_dock'])
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def plan_trips(doses):
+    """
+    Args:
+        doses (list): dicts with at least 'time' and 'room'
+
+    Returns:
+        list: trips [{'room', 'time', 'doses'}] ordered by earliest dose
+    """
+    trips = {}
+    for dose in doses:
+        trip = trips.setdefault(dose['room'], {'room': dose['room'], 'time': dose['time'], 'doses': []})
+        trip['time'] = min(trip['time'], dose['time'])
+        trip['doses'].append(dose)
+    return sorted(trips.values(), key=lambda t: t['time'])
+
+
+def assign(doses, robots, min_battery=Config.BATTERY_LOW_THRESHOLD, distance=manhattan):
+    """
+    Returns:
+        tuple: ({robot_id: trip}, [unassigned trips])
+    """
+    free = [r for r in robots if r.is_free() and (r.status.get('battery_level') or 0) > min_battery]
+    assignments, waiting = {}, []
+    for trip in plan_trips(doses):
+        if not free:
+            waiting.append(trip)
+            continue
+        target = Config.ROOM_COORDINATES.get(trip['room'], Config.ROOM_COORDINATES[Config.DEFAULT_PATIENT_ROOM])
+        best = min(free, key=lambda r: distance(robot_position(r), target))
+        free.remove(best)
+        assignments[best.robot_id] = trip
+    return assignments, waiting
@@ -0,0 +1,121 @@
+"""
+Fleet Registry
+Keeps per-robot state (status, telemetry, camera) in memory so status
+fan-out is a dictionary walk instead of one SQLite query per robot.
+"""
+
+import threading
+from datetime import datetime
+
+from config import Config
+from fleet.telemetry import TimeSeries
+from monitoring.log import get_logger
+
+log = get_logger(__name__)
+
+TELEMETRY_HISTORY = 600  # Samples kept per robot (~10 minutes at 1 Hz)
+
+
+class RobotHandle:
+    """Everything the backend knows about one robot"""
+
+    def __init__(self, robot_id, name, camera_source=None, status=None):
+        self.robot_id = robot_id
+        self.name = name
+        self.camera_source = camera_source
+        self.status = dict(status or {})
+        self.telemetry = TimeSeries(('battery_level', 'x', 'y', 'theta'), capacity=TELEMETRY_HISTORY)
+        self.task = None  # Current dispatch assignment, None when free
+        self.last_sample_ts = 0.0
+        self.lock = threading.Lock()
+        self._camera = None
+
+    @property
+    def camera(self):
+        """Lazily opened CameraStream of this robot's own; without a source it is the local webcam"""
+        if self._camera is None:
+            from hardware import camera_stream
+            source = self.camera_source
+            if source is None and self.robot_id == 1 and Config.CAMERA_REPLAY:
+                source = 'replay:' + Config.CAMERA_REPLAY
+            self._camera = camera_stream.CameraStream(source=open_camera_source(source))
+            if Config.VISION_ENABLED and self._camera.detector is None:
+                from hardware.vision import MotionDetector
+                from monitoring.alerts import BUS
+                self._camera.detector = MotionDetector(robot_id=self.robot_id, bus=BUS)
+        return self._camera
+
+    def is_free(self):
+        return self.task is None and not self.status.get('is_moving')
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.status, id=self.robot_id, name=self.name, task=self.task, is_free=self.is_free())
+
+
+def open_camera_source(source):
+    """
+    Device index ('0', '1'), any URL/path OpenCV can open, or
+    'replay:<frame dir or video>' for a looping recording at REPLAY_SPEED.
+    """
+    import cv2
+    if source is None:
+        return None
+    if str(source).startswith('replay:'):
+        from hardware.sources import FileReplaySource
+        return FileReplaySource(source[len('replay:'):], speed=Config.REPLAY_SPEED)
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+
+class FleetRegistry:
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.robots = {}
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Rebuild the in-memory registry from the robots/robot_status tables"""
+        rows = self.db.get_all_robot_status()
+        with self.lock:
+            for row in rows:
+                status = {k: row[k] for k in ('battery_level', 'location', 'is_moving', 'last_update')}
+                if row.get('pose_x') is not None:
+                    status['pose'] = {'x': row['pose_x'], 'y': row['pose_y'], 'theta': row['pose_theta']}
+                handle = self.robots.get(row['id'])
+                if handle is None:
+                    self.robots[row['id']] = RobotHandle(row['id'], row['name'], row['camera_source'], status)
+                else:
+                    handle.status.update(status)
+        log.info("Fleet loaded", robots=len(rows))
+
+    def register(self, name, camera_source=None):
+        robot_id = self.db.register_robot(name, camera_source)
+        with self.lock:
+            self.robots[robot_id] = RobotHandle(robot_id, name, camera_source, self.db.get_robot_status(robot_id))
+        return self.robots[robot_id]
+
+    def get(self, robot_id):
+        return self.robots.get(robot_id)
+
+    def all(self):
+        with self.lock:
+            return list(self.robots.values())
+
+    def update_status(self, robot_id, **fields):
+        """Updates memory and persists the row"""
+        handle = self.robots[robot_id]
+        with handle.lock:
+            handle.status.update(fields, last_update=datetime.now().isoformat())
+        self.db.update_robot_status(robot_id, **fields)
+        return handle
+
+    def persist_status(self, robot_id, **columns):
+        """Writes already-applied in-memory state to robot_status"""
+        self.db.update_robot_status(robot_id, **columns)
+        handle = self.robots[robot_id]
+        with handle.lock:
+            handle.status['last_update'] = datetime.now().isoformat()
+
+    def snapshot(self):
+        return [handle.snapshot() for handle in self.all()]
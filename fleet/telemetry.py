@@ -0,0 +1,155 @@
+"""
+Robot Telemetry Ingestion
+Accepts batched samples, keeps the latest state in memory and coalesces
+database writes to at most one per robot per flush interval, so high-rate
+odometry never turns into one SQLite transaction per sample.
+"""
+
+import math
+import threading
+import time
+from array import array
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+TELEMETRY_SAMPLES = REGISTRY.counter('telemetry_samples_total', 'Telemetry samples received', ['robot'])
+TELEMETRY_DB_WRITES = REGISTRY.counter('telemetry_db_writes_total', 'Coalesced robot_status writes', ['robot'])
+
+PERSISTED_FIELDS = ('battery_level', 'location', 'is_moving')
+
+
+class TimeSeries:
+    """
+    Fixed-capacity ring of float columns (NaN = not reported).
+    Samples closer than `min_spacing` seconds to the previous one are
+    dropped so the window covers a useful span at high sample rates.
+    """
+
+    def __init__(self, fields, capacity=600, min_spacing=1.0):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.min_spacing = min_spacing
+        self.timestamps = array('d', [0.0] * capacity)
+        self.columns = {f: array('f', [math.nan] * capacity) for f in self.fields}
+        self.size = 0
+        self.head = 0  # Next slot to write
+        self.lock = threading.Lock()
+
+    def append(self, ts, values):
+        with self.lock:
+            if self.size and ts - self.timestamps[(self.head - 1) % self.capacity] < self.min_spacing:
+                return False
+            self.timestamps[self.head] = ts
+            for f in self.fields:
+                value = values.get(f)
+                self.columns[f][self.head] = math.nan if value is None else float(value)
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            return True
+
+    def export(self, since=0.0):
+        """Columnar dict {'ts': [...], field: [...]} in chronological order"""
+        with self.lock:
+            start = (self.head - self.size) % self.capacity
+            order = [(start + i) % self.capacity for i in range(self.size)]
+            order = [i for i in order if self.timestamps[i] > since]
+            out = {'ts': [self.timestamps[i] for i in order]}
+            for f in self.fields:
+                out[f] = [None if math.isnan(self.columns[f][i]) else round(self.columns[f][i], 3) for i in order]
+        return out
+
+
+class TelemetryIngestor:
+    def __init__(self, fleet, flush_interval=Config.TELEMETRY_FLUSH_INTERVAL):
+        self.fleet = fleet
+        self.flush_interval = flush_interval
+        self.dirty = {}  # robot_id -> fields changed since last flush
+        self.last_flush = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def ingest(self, robot_id, samples):
+        """
+        Apply a batch of samples (oldest first) to a robot.
+
+        Each sample may carry: ts, battery_level, location, is_moving,
+        pose {'x', 'y', 'theta'}. Returns the number of samples applied.
+        """
+        handle = self.fleet.get(robot_id)
+        if handle is None:
+            raise KeyError(robot_id)
+        latest = {}
+        now = time.time()
+        for sample in sorted(samples, key=lambda s: s.get('ts') or now):
+            ts = sample.get('ts') or now
+            pose = sample.get('pose') or {}
+            # History first: it converts to float, so a bad value fails before the live state moves
+            handle.telemetry.append(ts, {
+                'battery_level': sample.get('battery_level'),
+                'x': pose.get('x'), 'y': pose.get('y'), 'theta': pose.get('theta'),
+            })
+            if ts >= handle.last_sample_ts:
+                # Late batches still fill history but never roll back the live state
+                handle.last_sample_ts = ts
+                for field in PERSISTED_FIELDS:
+                    if field in sample: latest[field] = sample[field]
+                if pose: latest['pose'] = pose
+        if latest:
+            with handle.lock:
+                handle.status.update(latest)
+            with self.lock:
+                self.dirty.setdefault(robot_id, {}).update(latest)
+        TELEMETRY_SAMPLES.inc(len(samples), robot=robot_id)
+        self.maybe_flush(robot_id)
+        return len(samples)
+
+    def maybe_flush(self, robot_id, force=False):
+        """Write the coalesced state if the interval has elapsed"""
+        now = time.monotonic()
+        with self.lock:
+            if robot_id not in self.dirty:
+                return False
+            if not force and now - self.last_flush.get(robot_id, 0) < self.flush_interval:
+                return False
+            fields = self.dirty.pop(robot_id)
+            self.last_flush[robot_id] = now
+        pose = fields.pop('pose', None)
+        if pose:
+            fields.update(pose_x=pose.get('x'), pose_y=pose.get('y'), pose_theta=pose.get('theta'))
+        if 'is_moving' in fields:
+            fields['is_moving'] = int(bool(fields['is_moving']))
+        self.fleet.persist_status(robot_id, **fields)
+        TELEMETRY_DB_WRITES.inc(robot=robot_id)
+        return True
+
+    def flush_all(self, force=False):
+        with self.lock:
+            pending = list(self.dirty)
+        return sum(1 for robot_id in pending if self.maybe_flush(robot_id, force=force))
+
+    def start(self):
+        """Background flusher so the last sample of a burst still reaches the DB"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='telemetry-flusher', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.flush_all()
+            except Exception as e:
+                log.error("Telemetry flush failed", error=e)
+            time.sleep(self.flush_interval)
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self.flush_all(force=True)
@@ -1,9 +1,10 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useMemo } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Mic, MicOff, Pill, Utensils, CheckCircle2, Clock } from 'lucide-react';
 import { apiClient } from '@/src/lib/api';
+import { syncStore, todaySchedule, useSyncState } from '@/src/lib/syncStore';
 import { ScheduleItem } from '@/src/types';
 
 export function ActiveMedication() {
@@ -17,27 +18,15 @@ export function ActiveMedication() {
     dosage: '500mg • 2 Tablets'
   };
 
-  const [currentTask, setCurrentTask] = useState<ScheduleItem>(demoTask);
+  const synced = useSyncState((state) => state.medications);
+  const currentTask = useMemo(() => {
+    const schedule = todaySchedule(synced);
+    return schedule.find(item => item.status === 'pending') ?? demoTask;
+  }, [synced]);
   const [isListening, setIsListening] = useState(false);
   const [transcript, setTranscript] = useState('');
   const [voiceStatus, setVoiceStatus] = useState<'idle' | 'listening' | 'processing' | 'success' | 'error'>('idle');
 
-  useEffect(() => {
-    const fetchCurrentTask = async () => {
-      try {
-        const schedule = await apiClient.getTodaySchedule();
-        const pending = schedule.find(item => item.status === 'pending');
-        if (pending) setCurrentTask(pending);
-      } catch (error) {
-        console.log('Using demo task data');
-      }
-    };
-
-    fetchCurrentTask();
-    const interval = setInterval(fetchCurrentTask, 5000);
-    return () => clearInterval(interval);
-  }, []);
-
   const handleVoiceCommand = () => {
     if (!('webkitSpeechRecognition' in window) && !('SpeechRecognition' in window)) {
       setVoiceStatus('error');
@@ -76,6 +65,7 @@ export function ActiveMedication() {
         setVoiceStatus('processing');
         try {
           await apiClient.processVoiceCommand(transcript);
+          syncStore.sync();
           setVoiceStatus('success');
           setTimeout(() => setVoiceStatus('idle'), 3000);
         } catch {
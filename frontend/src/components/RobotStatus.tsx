@@ -15,11 +15,13 @@ import {
   Home
 } from 'lucide-react';
 import { apiClient } from '@/src/lib/api';
+import { useSyncState } from '@/src/lib/syncStore';
 import { RobotCommand } from '@/src/types';
 
 export function RobotStatus() {
   // Demo fallback data - shows even when API fails
-  const [battery, setBattery] = useState(85);
+  const syncedBattery = useSyncState((state) => state.status?.battery_level as number | undefined);
+  const battery = syncedBattery && syncedBattery > 0 ? syncedBattery : 85;
   const [heartRate, setHeartRate] = useState(72);
   const [isAlert, setIsAlert] = useState(false);
   const [activeCommand, setActiveCommand] = useState<RobotCommand | null>(null);
@@ -27,11 +29,8 @@ export function RobotStatus() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [status, vitals] = await Promise.all([
-          apiClient.getRobotStatus(),
-          apiClient.getCurrentVitals(),
-        ]);
-        if (status.battery_level > 0) setBattery(status.battery_level);
+        // Robot status arrives through the sync store; only vitals are polled here
+        const vitals = await apiClient.getCurrentVitals();
         if (vitals.heart_rate > 0) setHeartRate(vitals.heart_rate);
         setIsAlert(vitals.alert || false);
       } catch (error) {
@@ -1,9 +1,9 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useMemo } from 'react';
 import { motion } from 'framer-motion';
 import { Calendar, CheckCircle2, Clock, AlertTriangle, Pill } from 'lucide-react';
-import { apiClient } from '@/src/lib/api';
+import { todaySchedule, useSyncState } from '@/src/lib/syncStore';
 import { ScheduleItem } from '@/src/types';
 
 export function ScheduleTimeline() {
@@ -40,27 +40,13 @@ export function ScheduleTimeline() {
     }
   ];
 
-  const [schedule, setSchedule] = useState<ScheduleItem[]>(demoSchedule);
-  const [loading, setLoading] = useState(false);
-
-  useEffect(() => {
-    const fetchSchedule = async () => {
-      try {
-        const data = await apiClient.getTodaySchedule();
-        if (data && data.length > 0) {
-          setSchedule(data);
-        }
-        setLoading(false);
-      } catch (error) {
-        console.log('Using demo schedule data');
-        setLoading(false);
-      }
-    };
-
-    fetchSchedule();
-    const interval = setInterval(fetchSchedule, 5000);
-    return () => clearInterval(interval);
-  }, []);
+  // Derived from the delta-synced cache; keeps rendering from it while offline
+  const synced = useSyncState((state) => state.medications);
+  const schedule = useMemo(() => {
+    const items = todaySchedule(synced);
+    return items.length > 0 ? items : demoSchedule;
+  }, [synced]);
+  const loading = false;
 
   const formatTime = (timeString: string) => {
     try {
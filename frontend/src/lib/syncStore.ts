@@ -0,0 +1,221 @@
+/**
+ * Client-side cache fed by /api/sync deltas.
+ *
+ * The store keeps the last synced state in localStorage, keyed by user, so a
+ * reload renders immediately and the dashboard keeps working while the
+ * backend is unreachable. Each poll only downloads what changed since the
+ * stored cursor. When the session ends or another user signs in, the cached
+ * state is dropped and wiped from storage before anything else renders.
+ */
+
+import { useEffect, useSyncExternalStore } from 'react';
+import { DoseEvent, LogEntry, ScheduleItem, SyncMedication, SyncResponse } from '@/src/types';
+
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000';
+const STORAGE_PREFIX = 'medibot-sync-v2:';
+const CURRENT_USER_KEY = `${STORAGE_PREFIX}user`; // Whose cache to restore on reload
+const LEGACY_STORAGE_KEY = 'medibot-sync-v1'; // Unscoped cache from before per-user keys
+const KEEP_EVENTS = 200; // Dose events and log entries kept locally
+
+export interface SyncState {
+  userId: number | null;
+  cursor: string | null;
+  medications: Record<number, SyncMedication>;
+  doseEvents: DoseEvent[];
+  logs: LogEntry[];
+  status: Record<string, unknown> | null;
+  online: boolean;
+  lastSyncedAt: string | null;
+}
+
+const emptyState: SyncState = {
+  userId: null,
+  cursor: null,
+  medications: {},
+  doseEvents: [],
+  logs: [],
+  status: null,
+  online: true,
+  lastSyncedAt: null,
+};
+
+function appendById<T extends { id: number }>(current: T[], incoming: T[]): T[] {
+  if (incoming.length === 0) return current;
+  const seen = new Set(current.map((item) => item.id));
+  return [...current, ...incoming.filter((item) => !seen.has(item.id))].slice(-KEEP_EVENTS);
+}
+
+export function mergeDelta(state: SyncState, delta: SyncResponse): SyncState {
+  const medications = delta.full ? {} : { ...state.medications };
+  for (const med of delta.medications) medications[med.id] = med;
+  for (const id of delta.deleted.medications) delete medications[id];
+
+  return {
+    userId: delta.user,
+    cursor: delta.cursor,
+    medications,
+    doseEvents: appendById(state.doseEvents, delta.dose_events),
+    logs: appendById(state.logs, delta.logs),
+    status: delta.status ?? state.status,
+    online: true,
+    lastSyncedAt: new Date().toISOString(),
+  };
+}
+
+class SyncStore {
+  private state: SyncState = emptyState;
+  private listeners = new Set<() => void>();
+  private timer: ReturnType<typeof setInterval> | null = null;
+  private inflight: Promise<void> | null = null;
+  private subscribers = 0;
+  private pausedUntil = 0; // Set from Retry-After when the server sheds load
+
+  constructor(private baseUrl: string = API_BASE_URL) {
+    this.state = this.restore();
+  }
+
+  getState = (): SyncState => this.state;
+
+  getServerState = (): SyncState => emptyState;
+
+  subscribe = (listener: () => void): (() => void) => {
+    this.listeners.add(listener);
+    return () => this.listeners.delete(listener);
+  };
+
+  /** Starts polling while at least one component is mounted */
+  retain(intervalMs: number = 5000): () => void {
+    this.subscribers += 1;
+    if (!this.timer) {
+      this.sync();
+      this.timer = setInterval(() => this.sync(), intervalMs);
+    }
+    return () => {
+      this.subscribers -= 1;
+      if (this.subscribers === 0 && this.timer) {
+        clearInterval(this.timer);
+        this.timer = null;
+      }
+    };
+  }
+
+  /** One delta round trip; concurrent callers share it. Follows 'more' pages immediately. */
+  sync(): Promise<void> {
+    if (Date.now() < this.pausedUntil) return Promise.resolve();
+    if (!this.inflight) {
+      this.inflight = this.pull().finally(() => {
+        this.inflight = null;
+      });
+    }
+    return this.inflight;
+  }
+
+  /** Drops the cached state and every user's stored copy (logout, or another user signed in) */
+  reset(): void {
+    if (typeof window !== 'undefined') {
+      try {
+        Object.keys(window.localStorage)
+          .filter((key) => key.startsWith(STORAGE_PREFIX))
+          .forEach((key) => window.localStorage.removeItem(key));
+      } catch {
+        // Storage disabled; nothing was persisted
+      }
+    }
+    this.state = emptyState;
+    this.listeners.forEach((listener) => listener());
+  }
+
+  private async pull(): Promise<void> {
+    try {
+      let more = true;
+      while (more) {
+        const query = this.state.cursor ? `?since=${encodeURIComponent(this.state.cursor)}` : '';
+        // Manual redirects: a logged-out session answers with a redirect to the login page
+        const response = await fetch(`${this.baseUrl}/api/sync${query}`, { credentials: 'include', redirect: 'manual' });
+        if (response.type === 'opaqueredirect' || response.status === 401 || response.status === 302) {
+          this.reset();
+          return;
+        }
+        if (response.status === 503) {
+          // Busy server: back off as asked and keep serving the cache meanwhile
+          this.pausedUntil = Date.now() + Number(response.headers.get('Retry-After') || 5) * 1000;
+          return;
+        }
+        if (!response.ok) throw new Error(`API Error: ${response.status}`);
+        const delta: SyncResponse = await response.json();
+        if (this.state.userId !== null && delta.user !== this.state.userId) {
+          // Another user's session: never merge into (or keep showing) the previous user's data
+          this.reset();
+          if (!delta.full) continue; // The cursor was theirs too; ask again from scratch
+        }
+        this.setState(mergeDelta(this.state, delta));
+        more = delta.more;
+      }
+    } catch (error) {
+      // Offline: keep serving the cached state and retry on the next tick
+      if (this.state.online) this.setState({ ...this.state, online: false });
+    }
+  }
+
+  private setState(next: SyncState): void {
+    this.state = next;
+    this.persist();
+    this.listeners.forEach((listener) => listener());
+  }
+
+  private restore(): SyncState {
+    if (typeof window === 'undefined') return emptyState;
+    try {
+      window.localStorage.removeItem(LEGACY_STORAGE_KEY);
+      const userId = window.localStorage.getItem(CURRENT_USER_KEY);
+      const saved = userId && window.localStorage.getItem(STORAGE_PREFIX + userId);
+      return saved ? { ...emptyState, ...JSON.parse(saved) } : emptyState;
+    } catch {
+      return emptyState;
+    }
+  }
+
+  private persist(): void {
+    if (typeof window === 'undefined' || this.state.userId === null) return;
+    try {
+      window.localStorage.setItem(CURRENT_USER_KEY, String(this.state.userId));
+      window.localStorage.setItem(STORAGE_PREFIX + this.state.userId, JSON.stringify(this.state));
+    } catch {
+      // Storage full or disabled; the in-memory state still works
+    }
+  }
+}
+
+export const syncStore = new SyncStore();
+
+/** Subscribes a component to the store and keeps polling while it is mounted */
+export function useSyncState<T>(select: (state: SyncState) => T): T {
+  const state = useSyncExternalStore(syncStore.subscribe, syncStore.getState, syncStore.getServerState);
+  useEffect(() => syncStore.retain(), []);
+  return select(state);
+}
+
+// ==================== DERIVED VIEWS ====================
+const WEEKDAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+
+function localDate(date: Date): string {
+  const pad = (n: number) => String(n).padStart(2, '0');
+  return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+}
+
+/** Today's doses, same rules as the Flask /api/schedule endpoint */
+export function todaySchedule(medications: SyncState['medications'], now: Date = new Date()): ScheduleItem[] {
+  const today = localDate(now);
+  const weekday = WEEKDAYS[now.getDay()];
+  return Object.values(medications)
+    .filter((med) => med.frequency === 'Daily' || (med.days ?? '').includes(weekday))
+    .map((med): ScheduleItem => ({
+      id: med.id,
+      time: `${today} ${med.schedule_time}`,
+      task: med.name,
+      status: med.last_taken === today ? 'completed' : 'pending',
+      notes: med.instructions,
+      dosage: med.dosage,
+    }))
+    .sort((a, b) => a.time.localeCompare(b.time));
+}
@@ -42,4 +42,48 @@ export type RobotCommand =
   | 'right' 
   | 'stop' 
   | 'dock' 
-  | 'emergency';
\ No newline at end of file
+  | 'emergency';
+
+// ==================== DELTA SYNC (/api/sync) ====================
+export interface SyncMedication {
+  id: number;
+  patient_id: number;
+  patient: string;
+  name: string;
+  dosage?: string;
+  stock: number;
+  max_stock: number;
+  schedule_time: string; // "HH:MM"
+  instructions?: string;
+  frequency: string; // "Daily" or "Custom"
+  days?: string; // e.g. "Mon,Wed,Fri"
+  last_taken?: string | null; // "YYYY-MM-DD"
+}
+
+export interface DoseEvent {
+  id: number;
+  medication_id: number;
+  scheduled_slot: string;
+  taken_at: string;
+  source: string;
+  kind: 'taken' | 'undone';
+}
+
+export interface LogEntry {
+  id: number;
+  action: string;
+  timestamp: string;
+  details?: string;
+}
+
+export interface SyncResponse {
+  user: number;
+  cursor: string;
+  full: boolean;
+  medications: SyncMedication[];
+  deleted: { medications: number[] };
+  dose_events: DoseEvent[];
+  logs: LogEntry[];
+  status: Record<string, unknown> | null;
+  more: boolean;
+}
@@ -148,18 +148,31 @@
 
 """
 Bluetooth HC-05 Handler (Windows Simulation Version)
-Simulates data connection when real hardware is missing.
+Simulates data connection when real hardware is missing, or reads from any
+serial-like source (e.g. a SerialLogReplaySource) when one is given.
 """
 
 import threading
 import time
 import random
+from hardware.sources import parse_vitals
+from monitoring.log import get_logger
+from monitoring.metrics import VITALS_SAMPLES_TOTAL
+
+log = get_logger(__name__)
 
 class BluetoothManager:
-    def __init__(self):
-        self.is_connected = False  # False means we are in Simulation Mode
+    def __init__(self, source=None):
+        """
+        Args:
+            source: Optional object with a pyserial-like readline(); without
+                    one, random vitals are simulated.
+        """
+        self.source = source
+        self.is_connected = source is not None  # False means we are in Simulation Mode
         self.running = False
         self.thread = None
+        self.listeners = []  # Called with each new reading: only the fields it carried, plus timestamp
         
         # Store latest simulated vitals
         self.latest_vitals = {
@@ -169,43 +182,82 @@ class BluetoothManager:
             'timestamp': None
         }
         
-        print("⚠ Bluetooth hardware not found. Using SIMULATION MODE.")
+        if source is None:
+            log.warning("Bluetooth hardware not found, using simulation mode")
 
     def start_reading(self):
         """Start the background thread to generate fake data"""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._simulate_data_loop)
+            loop = self._read_source_loop if self.source is not None else self._simulate_data_loop
+            self.thread = threading.Thread(target=loop, name='bluetooth-reader')
             self.thread.daemon = True
             self.thread.start()
-            print("✓ Simulation Data Stream Started")
+            log.info("Simulation data stream started")
 
     def _simulate_data_loop(self):
         """Internal loop to generate random vital signs"""
         while self.running:
             # Generate realistic random values
-            self.latest_vitals['heart_rate'] = random.randint(65, 85)
-            self.latest_vitals['spo2'] = random.randint(96, 99)
-            self.latest_vitals['temperature'] = round(random.uniform(36.5, 37.2), 1)
-            self.latest_vitals['timestamp'] = time.time()
+            reading = {'heart_rate': random.randint(65, 85), 'spo2': random.randint(96, 99),
+                       'temperature': round(random.uniform(36.5, 37.2), 1), 'timestamp': time.time()}
+            self.latest_vitals.update(reading)
+            VITALS_SAMPLES_TOTAL.inc(source='bluetooth')
+            self._notify(reading)
             
             # Update every 2 seconds
             time.sleep(2)
 
+    def _read_source_loop(self):
+        """Internal loop reading lines from the serial source until EOF/stop"""
+        while self.running:
+            line = self.source.readline()
+            if not line:
+                log.info("Vitals source exhausted")
+                self.running = False
+                break
+            self.ingest_line(line)
+
+    def ingest_line(self, line):
+        """Parse one serial line into latest_vitals; returns the vitals or None"""
+        vitals = parse_vitals(line)
+        if vitals is None:
+            log.debug("Unparseable vitals line", line=line)
+            return None
+        reading = dict(vitals, timestamp=time.time())
+        self.latest_vitals.update(reading)
+        VITALS_SAMPLES_TOTAL.inc(source='bluetooth')
+        # Listeners get this line's fields only: a SpO2-only line must not re-log a stale heart rate
+        self._notify(reading)
+        return vitals
+
+    def subscribe(self, callback):
+        """callback(reading) after every new reading; fields the line didn't carry are absent"""
+        self.listeners.append(callback)
+
+    def _notify(self, reading):
+        for callback in self.listeners:
+            try:
+                callback(dict(reading))
+            except Exception as e:
+                log.error("Vitals listener failed", error=e)
+
     def get_latest_vitals(self):
         """Return the current readings"""
         return self.latest_vitals
 
     def send_data(self, data):
         """Fake sending data to robot"""
-        print(f"[SIMULATION] Sending command to Robot: {data}")
+        log.info("Simulated command to robot", data=data)
 
     def stop(self):
         """Stop the simulation thread"""
         self.running = False
         if self.thread:
             self.thread.join(timeout=1.0)
-        print("Bluetooth simulation stopped")
+        if self.source is not None:
+            self.source.close()
+        log.info("Bluetooth simulation stopped")
 
 # Create the global instance that app.py imports
 bluetooth = BluetoothManager()
\ No newline at end of file
@@ -112,22 +112,55 @@ import time
 import threading
 import cv2  # Changed from picamera2 to cv2
 import numpy as np
-from PIL import Image, ImageFilter
+from PIL import Image
 from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import CAMERA_CAPTURE_SECONDS, CAMERA_ENCODE_SECONDS
+from hardware.vision import CAMERA_FRAMES_REUSED, FrameChangeGate
+from workers.pool import Backpressure, get_pool
+from workers.tasks import encode_frame
+
+log = get_logger(__name__)
 
 # We no longer check for picamera2 since we are on Windows
 CAMERA_AVAILABLE = True 
 
 class CameraStream:
-    def __init__(self):
+    def __init__(self, source=None, detector=None, recorder=None, pool=None):
+        """
+        Args:
+            source: Optional object with the cv2.VideoCapture interface
+                    (isOpened/read/release). Defaults to the laptop webcam.
+            detector: Optional MotionDetector fed every raw frame
+            recorder: Optional ClipRecorder fed every encoded frame
+            pool: Optional WorkerPool that encodes frames in another process;
+                  defaults to the shared pool when WORKER_POOL_ENABLED
+        """
         self.camera = None
         self.frame = None
         self.lock = threading.Lock()
         self.privacy_mode = False
         self.is_streaming = False
+        self.detector = detector
+        self.gate = FrameChangeGate() if Config.CAMERA_SKIP_UNCHANGED else None
+        self.last_jpeg = None
+        self.last_privacy = False
+        self.recorder = recorder
+        self.pool = pool if pool is not None else (get_pool() if Config.WORKER_POOL_ENABLED else None)
+        
+        # Background capture: one producer, any number of viewers
+        self.capturing = False
+        self.capture_thread = None
+        self.new_frame = threading.Condition()
+        self.frame_seq = 0
+        self.latest = None
         
-        # Initialize the laptop webcam
-        self.init_camera()
+        if source is not None:
+            self.camera = source
+            self.create_dummy_frame()
+        else:
+            # Initialize the laptop webcam
+            self.init_camera()
     
     def init_camera(self):
         """Initialize Laptop Webcam using OpenCV"""
@@ -143,10 +176,10 @@ class CameraStream:
             self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.CAMERA_RESOLUTION[1])
             
             time.sleep(1)  # Brief warm-up
-            print("✓ Laptop Camera initialized successfully")
+            log.info("Laptop camera initialized")
             
         except Exception as e:
-            print(f"✗ Camera initialization failed: {e}")
+            log.error("Camera initialization failed", error=e)
             self.camera = None
             self.create_dummy_frame()
     
@@ -162,35 +195,85 @@ class CameraStream:
         if self.camera and self.camera.isOpened():
             try:
                 # Read frame from OpenCV
-                ret, frame_array = self.camera.read()
+                with CAMERA_CAPTURE_SECONDS.time():
+                    ret, frame_array = self.camera.read()
                 
                 if ret:
-                    # OpenCV uses BGR, convert to RGB for PIL
-                    frame_rgb = cv2.cvtColor(frame_array, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(frame_rgb)
-                    
-                    # Apply privacy blur if enabled
-                    if self.privacy_mode:
-                        img = img.filter(ImageFilter.GaussianBlur(radius=20))
-                    
-                    # Resize to match config exactly (in case webcam ignored settings)
-                    if img.size != Config.CAMERA_RESOLUTION:
-                         img = img.resize(Config.CAMERA_RESOLUTION)
-
-                    # Convert to JPEG
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='JPEG', quality=85)
-                    return buffer.getvalue()
+                    if self.detector is not None:
+                        self.detector.process(frame_array)
+                    # Static scene: serve the previous JPEG instead of re-encoding
+                    if (self.gate is not None and not self.gate.changed(frame_array)
+                            and self.last_jpeg is not None and self.privacy_mode == self.last_privacy):
+                        CAMERA_FRAMES_REUSED.inc()
+                        return self._deliver(self.last_jpeg)
+                    encode_started = time.perf_counter()
+                    # Colour convert, privacy blur, resize and JPEG encode
+                    jpeg = self._encode(frame_array)
+                    if jpeg is None:
+                        # Encoder lane full: drop this frame and keep serving the last one
+                        return self._deliver(self.last_jpeg) if self.last_jpeg else self.frame
+                    CAMERA_ENCODE_SECONDS.observe(time.perf_counter() - encode_started)
+                    self.last_jpeg, self.last_privacy = jpeg, self.privacy_mode
+                    return self._deliver(self.last_jpeg)
                 else:
-                    print("Failed to read frame")
+                    log.warning("Failed to read frame")
                     return self.frame
             except Exception as e:
-                print(f"Frame capture error: {e}")
+                log.error("Frame capture error", error=e)
                 return self.frame
         return self.frame
     
+    def _encode(self, frame_array):
+        """JPEG bytes for a raw frame, in the worker pool when there is one; None under backpressure"""
+        if self.pool is None:
+            return encode_frame(frame_array, self.privacy_mode, Config.CAMERA_RESOLUTION)
+        try:
+            return self.pool.run('encode_frame', self.privacy_mode, Config.CAMERA_RESOLUTION, share=[frame_array])
+        except Backpressure:
+            return None
+    
+    def _deliver(self, jpeg):
+        if self.recorder is not None:
+            self.recorder.add_frame(jpeg)
+        return jpeg
+    
+    def start_background_capture(self):
+        """Capture continuously so the recorder and detector see frames even with no viewer"""
+        if self.capturing:
+            return
+        self.latest = self.frame
+        self.capturing = True
+        self.capture_thread = threading.Thread(target=self._capture_loop, name='camera-capture', daemon=True)
+        self.capture_thread.start()
+    
+    def _capture_loop(self):
+        while self.capturing:
+            with self.lock:
+                frame = self.capture_frame()
+            with self.new_frame:
+                self.latest = frame
+                self.frame_seq += 1
+                self.new_frame.notify_all()
+            if not getattr(self.camera, 'paced', False):
+                time.sleep(1 / Config.CAMERA_FRAMERATE)
+    
+    def stop_background_capture(self):
+        self.capturing = False
+        if self.capture_thread:
+            self.capture_thread.join(timeout=1.0)
+            self.capture_thread = None
+    
     def generate_stream(self):
         """Generator function for MJPEG streaming"""
+        if self.capturing:
+            # Viewers share the capture thread's frames instead of each reading the camera
+            seen = -1
+            while True:
+                with self.new_frame:
+                    self.new_frame.wait_for(lambda: self.frame_seq != seen, timeout=1.0)
+                    seen, frame = self.frame_seq, self.latest
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
         while True:
             with self.lock:
                 frame = self.capture_frame()
@@ -199,7 +282,9 @@ class CameraStream:
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
             
-            time.sleep(1 / Config.CAMERA_FRAMERATE)
+            # Replay sources pace themselves (possibly faster than real time)
+            if not getattr(self.camera, 'paced', False):
+                time.sleep(1 / Config.CAMERA_FRAMERATE)
     
     def toggle_privacy(self):
         """Toggle privacy blur mode"""
@@ -210,7 +295,4 @@ class CameraStream:
         """Release camera resources"""
         if self.camera:
             self.camera.release()
-            print("Camera stopped")
-
-# Global camera instance
-camera = CameraStream()
\ No newline at end of file
+            log.info("Camera stopped")
@@ -0,0 +1,215 @@
+"""
+Event Clip Recorder
+Keeps the last few seconds of encoded JPEG frames in a byte-bounded ring
+buffer. When an event fires (SOS, vitals alert, suspected fall) it writes a
+clip covering the pre-roll plus the following seconds.
+
+The capture thread only appends references to already encoded frames; all
+disk I/O happens on a separate writer thread, so live streaming never waits
+on the filesystem. Clips are concatenated JPEGs (.mjpeg, playable by
+VLC/ffmpeg) with a JSON sidecar, pruned by age and total size.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import QUEUE_DEPTH, REGISTRY
+
+log = get_logger(__name__)
+
+CLIPS_WRITTEN = REGISTRY.counter('clips_written_total', 'Event clips written to disk', ['reason'])
+CLIP_BUFFER_BYTES = REGISTRY.gauge('clip_buffer_bytes', 'Bytes held in the pre-roll ring buffer')
+
+
+class Recording:
+    """A clip in progress: pre-roll frames plus everything until `until`"""
+
+    def __init__(self, clip_id, reasons, frames, started, until, meta):
+        self.clip_id = clip_id
+        self.reasons = reasons
+        self.frames = frames  # [(ts, jpeg bytes)]
+        self.started = started
+        self.until = until
+        self.meta = meta
+
+
+class ClipRecorder:
+    def __init__(self, clip_dir=Config.CLIP_DIR, pre_roll=Config.CLIP_PRE_ROLL_SECONDS,
+                 post_roll=Config.CLIP_POST_ROLL_SECONDS, max_buffer_bytes=Config.CLIP_BUFFER_MAX_MB * 2 ** 20,
+                 retention_days=Config.CLIP_RETENTION_DAYS, max_total_bytes=Config.CLIP_MAX_TOTAL_MB * 2 ** 20,
+                 clock=time.time):
+        self.clip_dir = clip_dir
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_buffer_bytes = max_buffer_bytes
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.clock = clock
+        self.buffer = deque()  # (ts, jpeg)
+        self.buffer_bytes = 0
+        self.active = None  # The Recording being extended, if any
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.writer = None
+        os.makedirs(clip_dir, exist_ok=True)
+
+    # ---------- capture side (must stay cheap) ----------
+    def add_frame(self, jpeg, ts=None):
+        ts = self.clock() if ts is None else ts
+        with self.lock:
+            self.buffer.append((ts, jpeg))
+            self.buffer_bytes += len(jpeg)
+            while self.buffer and (ts - self.buffer[0][0] > self.pre_roll or self.buffer_bytes > self.max_buffer_bytes):
+                self.buffer_bytes -= len(self.buffer.popleft()[1])
+            CLIP_BUFFER_BYTES.set(self.buffer_bytes)
+            finished = None
+            if self.active is not None:
+                if ts <= self.active.until:
+                    self.active.frames.append((ts, jpeg))
+                else:
+                    finished, self.active = self.active, None
+        if finished:
+            self._queue(finished)
+
+    def trigger(self, reason, **meta):
+        """Start (or extend) a clip; returns its id immediately"""
+        now = self.clock()
+        with self.lock:
+            if self.active is not None and now <= self.active.until:
+                # Overlapping events share one clip that runs until the latest post-roll
+                self.active.until = now + self.post_roll
+                if reason not in self.active.reasons:
+                    self.active.reasons.append(reason)
+                self.active.meta.setdefault('events', []).append(dict(meta, reason=reason, ts=now))
+                return self.active.clip_id
+            clip_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{uuid.uuid4().hex[:6]}"
+            self.active = Recording(clip_id, [reason], list(self.buffer), now, now + self.post_roll,
+                                    {'events': [dict(meta, reason=reason, ts=now)]})
+        log.info("Clip recording", clip=clip_id, reason=reason)
+        self.start()
+        return clip_id
+
+    def _queue(self, recording):
+        self.pending.put(recording)
+        QUEUE_DEPTH.set(self.pending.qsize(), queue='clips')
+
+    # ---------- writer thread ----------
+    def start(self):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name='clip-writer', daemon=True)
+            self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            try:
+                recording = self.pending.get(timeout=1.0)
+            except queue.Empty:
+                recording = self._expired()
+                if recording is None:
+                    continue
+            if recording is False:
+                return
+            try:
+                self.write(recording)
+            except OSError as e:
+                log.error("Clip write failed", clip=recording.clip_id, error=e)
+            QUEUE_DEPTH.set(self.pending.qsize(), queue='clips')
+
+    def _expired(self):
+        """Finish a clip whose post-roll ended while no frames were arriving"""
+        with self.lock:
+            if self.active is not None and self.clock() > self.active.until:
+                finished, self.active = self.active, None
+                return finished
+        return None
+
+    def write(self, recording):
+        if not recording.frames:
+            log.warning("Clip had no frames (camera not capturing?)", clip=recording.clip_id)
+            return None
+        video_path = os.path.join(self.clip_dir, recording.clip_id + '.mjpeg')
+        size = 0
+        with open(video_path + '.tmp', 'wb') as f:
+            for _, jpeg in recording.frames:
+                f.write(jpeg)
+                size += len(jpeg)
+        os.replace(video_path + '.tmp', video_path)
+        first, last = recording.frames[0][0], recording.frames[-1][0]
+        info = {
+            'id': recording.clip_id,
+            'reasons': recording.reasons,
+            'triggered_at': recording.started,
+            'start': first,
+            'end': last,
+            'frames': len(recording.frames),
+            'fps': round((len(recording.frames) - 1) / (last - first), 2) if last > first else None,
+            'bytes': size,
+            'events': recording.meta.get('events', []),
+        }
+        with open(os.path.join(self.clip_dir, recording.clip_id + '.json'), 'w') as f:
+            json.dump(info, f)
+        CLIPS_WRITTEN.inc(reason=recording.reasons[0])
+        log.info("Clip saved", clip=recording.clip_id, frames=len(recording.frames), bytes=size)
+        self.prune()
+        return info
+
+    def flush(self):
+        """Finish the active clip now and wait until everything queued is on disk"""
+        with self.lock:
+            finished, self.active = self.active, None
+        if finished:
+            self._queue(finished)
+        while not self.pending.empty():
+            recording = self.pending.get()
+            if recording is not False:
+                self.write(recording)
+
+    def stop(self):
+        self.flush()
+        if self.writer is not None:
+            self.pending.put(False)
+            self.writer.join(timeout=1.0)
+            self.writer = None
+
+    # ---------- stored clips ----------
+    def clips(self):
+        """Sidecar info of stored clips, newest first"""
+        items = []
+        for name in os.listdir(self.clip_dir):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.clip_dir, name)) as f:
+                        items.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(items, key=lambda info: info['triggered_at'], reverse=True)
+
+    def path_for(self, clip_id):
+        """Video path for a stored clip id, or None (ids never contain path separators)"""
+        if not clip_id or os.path.basename(clip_id) != clip_id:
+            return None
+        path = os.path.join(self.clip_dir, clip_id + '.mjpeg')
+        return path if os.path.exists(path) else None
+
+    def prune(self):
+        """Retention: drop clips older than retention_days, then oldest first over the size cap"""
+        cutoff = self.clock() - self.retention_days * 86400
+        total = 0
+        removed = 0
+        for info in self.clips():
+            total += info.get('bytes', 0)
+            if info['triggered_at'] < cutoff or total > self.max_total_bytes:
+                for ext in ('.mjpeg', '.json'):
+                    try:
+                        os.remove(os.path.join(self.clip_dir, info['id'] + ext))
+                    except OSError:
+                        pass
+                removed += 1
+        return removed
@@ -0,0 +1,223 @@
+"""
+Pluggable Hardware Sources
+Stand-ins for the webcam (cv2.VideoCapture interface) and the HC-05 serial
+port (readline interface) so the stream and vitals pipelines can run on a
+dev box: replay recorded JPEGs/video and serial logs at 1x, at N x, or as
+fast as possible.
+"""
+
+import json
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from monitoring.log import get_logger
+
+log = get_logger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VITALS_FIELDS = {'hr': 'heart_rate', 'heart_rate': 'heart_rate', 'bpm': 'heart_rate',
+                 'spo2': 'spo2', 'o2': 'spo2', 'temp': 'temperature', 'temperature': 'temperature'}
+VITALS_PAIR = re.compile(r'([A-Za-z_0-9]+)\s*[:=]\s*(-?\d+(?:\.\d+)?)')
+
+
+class Pacer:
+    """
+    Sleeps so media timestamps are released at `speed` x real time.
+    speed <= 0 disables pacing (as fast as possible).
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.origin = None  # (wall clock, media time) of the first item
+        self.last = None
+
+    def wait(self, media_ts):
+        if self.speed <= 0:
+            return
+        now = time.monotonic()
+        if self.origin is None or media_ts < self.last:
+            self.origin = (now, media_ts)  # First item, or the replay looped
+            self.last = media_ts
+            return
+        self.last = media_ts
+        delay = self.origin[0] + (media_ts - self.origin[1]) / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def parse_vitals(line):
+    """
+    One HC-05 line -> {'heart_rate', 'spo2', 'temperature'} or None.
+    Accepts 'HR:72,SPO2:98,TEMP:36.8' style pairs or a JSON object.
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            pairs = json.loads(line).items()
+        except ValueError:
+            return None
+    else:
+        pairs = VITALS_PAIR.findall(line)
+    vitals = {}
+    for key, value in pairs:
+        field = VITALS_FIELDS.get(str(key).lower())
+        if field is None:
+            continue
+        try:
+            vitals[field] = float(value) if field == 'temperature' else int(float(value))
+        except (TypeError, ValueError):
+            return None
+    return vitals if 'heart_rate' in vitals or 'spo2' in vitals else None
+
+
+# ==================== CAMERA SOURCES ====================
+class SyntheticFrameSource:
+    """Stands in for cv2.VideoCapture with deterministic noisy BGR frames"""
+
+    paced = False
+
+    def __init__(self, resolution=Config.CAMERA_RESOLUTION, pool_size=8, seed=42):
+        width, height = resolution
+        rng = np.random.default_rng(seed)
+        self.frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(pool_size)]
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class FileReplaySource:
+    """
+    Replays a directory of JPEG/PNG frames (name order) or a video file
+    through the cv2.VideoCapture interface.
+
+    Args:
+        path (str): Frame directory or video file
+        speed (float): 1 = recorded rate, N = N x faster, 0 = unpaced
+        fps (float): Frame rate for image directories (videos use their own)
+        loop (bool): Start over at the end instead of reporting EOF
+        preload (bool): Decode a frame directory once up front, so replay
+            cost is the pipeline's alone
+    """
+
+    paced = True
+
+    def __init__(self, path, speed=1.0, fps=Config.CAMERA_FRAMERATE, loop=True, preload=False):
+        self.path = path
+        self.loop = loop
+        self.pacer = Pacer(speed)
+        self.index = 0
+        self.video = None
+        self.files = []
+        self.cache = None
+        if os.path.isdir(path):
+            self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(IMAGE_EXTENSIONS))
+            self.fps = fps
+            if preload:
+                self.cache = [cv2.imread(name) for name in self.files]
+        else:
+            self.video = cv2.VideoCapture(path)
+            self.fps = self.video.get(cv2.CAP_PROP_FPS) or fps
+        log.info("Camera replay opened", path=path, frames=len(self.files) or None, speed=speed)
+
+    def isOpened(self):
+        return bool(self.files) if self.video is None else self.video.isOpened()
+
+    def _next_frame(self):
+        if self.video is not None:
+            ok, frame = self.video.read()
+            if not ok and self.loop:
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self.video.read()
+            return frame if ok else None
+        if self.index >= len(self.files):
+            if not self.loop or not self.files:
+                return None
+            self.index = 0
+        position = self.index
+        self.index += 1
+        return self.cache[position] if self.cache is not None else cv2.imread(self.files[position])
+
+    def read(self):
+        position = self.index
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+        if self.video is not None:
+            position = int(self.video.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        self.pacer.wait(position / self.fps)
+        return True, frame
+
+    def set(self, prop, value):
+        return False  # Resolution requests don't apply to recordings
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+
+
+# ==================== SERIAL SOURCES ====================
+class SerialLogReplaySource:
+    """
+    Replays a recorded HC-05 session through a pyserial-like readline().
+
+    Log lines are '<seconds> <payload>' (seconds may be absolute or relative
+    to the start); lines without a timestamp are spaced `interval` apart.
+    Returns b'' at the end, like a serial read timeout, unless `loop` is set.
+    """
+
+    paced = True
+
+    def __init__(self, path, speed=1.0, loop=False, interval=2.0):
+        self.path = path
+        self.loop = loop
+        self.pacer = Pacer(speed)
+        self.records = []
+        with open(path, 'rb') as f:
+            for number, raw in enumerate(f):
+                raw = raw.strip()
+                if not raw or raw.startswith(b'#'):
+                    continue
+                stamp, _, payload = raw.partition(b' ')
+                try:
+                    ts = float(stamp)
+                except ValueError:
+                    ts, payload = number * interval, raw
+                self.records.append((ts, payload.strip() + b'\n'))
+        self.index = 0
+        self.is_open = True
+        log.info("Serial replay opened", path=path, lines=len(self.records), speed=speed)
+
+    def readline(self):
+        if self.index >= len(self.records):
+            if not self.loop or not self.records:
+                return b''
+            self.index = 0
+        ts, payload = self.records[self.index]
+        self.index += 1
+        self.pacer.wait(ts)
+        return payload
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
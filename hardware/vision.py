@@ -0,0 +1,188 @@
+"""
+On-Robot Vision
+Cheap motion analysis on downscaled grayscale NumPy frames: a running
+background model, frame differencing, coarse motion regions and simple
+fall / inactivity heuristics. Analysis is gated by a frame stride and a CPU
+duty-cycle budget so it can never starve the MJPEG stream.
+
+FrameChangeGate is the even cheaper check the stream uses to reuse the last
+JPEG when nothing in the room changed.
+"""
+
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+VISION_FRAMES = REGISTRY.counter('vision_frames_total', 'Frames seen by the motion detector', ['result'])
+VISION_SECONDS = REGISTRY.histogram('vision_analysis_seconds', 'Motion analysis time per analysed frame')
+CAMERA_FRAMES_REUSED = REGISTRY.counter('camera_frames_reused_total', 'Frames served from the last JPEG (no change)')
+
+MotionResult = namedtuple('MotionResult', 'ts motion_ratio regions')  # regions: [(x, y, w, h)] in frame pixels
+
+BGR_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def to_gray(frame, scale):
+    """Downscale by pixel skipping, then luminance; float32 (h/scale, w/scale)"""
+    small = frame[::scale, ::scale]
+    if small.ndim == 3:
+        return small.astype(np.float32) @ BGR_WEIGHTS
+    return small.astype(np.float32)
+
+
+def find_regions(mask, cell, cell_fill):
+    """Connected blocks of `cell` x `cell` mask cells at least `cell_fill` active -> [(x, y, w, h)]"""
+    rows, cols = mask.shape[0] // cell, mask.shape[1] // cell
+    grid = mask[:rows * cell, :cols * cell].reshape(rows, cell, cols, cell).mean(axis=(1, 3)) >= cell_fill
+    seen = np.zeros_like(grid)
+    regions = []
+    for r, c in zip(*np.nonzero(grid)):
+        if seen[r, c]:
+            continue
+        stack, r0, r1, c0, c1 = [(r, c)], r, r, c, c
+        seen[r, c] = True
+        while stack:
+            y, x = stack.pop()
+            r0, r1, c0, c1 = min(r0, y), max(r1, y), min(c0, x), max(c1, x)
+            for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                if 0 <= ny < rows and 0 <= nx < cols and grid[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        regions.append((c0 * cell, r0 * cell, (c1 - c0 + 1) * cell, (r1 - r0 + 1) * cell))
+    return sorted(regions, key=lambda box: box[2] * box[3], reverse=True)
+
+
+class MotionDetector:
+    def __init__(self, robot_id=1, bus=None, scale=4, alpha=0.05, threshold=25, min_motion=0.005,
+                 stride=Config.VISION_STRIDE, cpu_budget=Config.VISION_CPU_BUDGET,
+                 inactivity_seconds=Config.VISION_INACTIVITY_SECONDS, fall_window=2.0, clock=time.monotonic):
+        """
+        Args:
+            bus (AlertBus): Where fall_suspected / inactivity / activity_resumed go
+            scale (int): Pixel skip for the analysis frame (4 -> 160x120 from VGA)
+            alpha (float): Background learning rate per analysed frame
+            threshold (int): Grey-level difference that counts as changed
+            min_motion (float): Changed fraction below which the frame is still
+            stride (int): Analyse at most every Nth frame
+            cpu_budget (float): Max fraction of one core spent analysing
+        """
+        self.robot_id = robot_id
+        self.bus = bus
+        self.scale = scale
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_motion = min_motion
+        self.stride = max(1, stride)
+        self.cpu_budget = cpu_budget
+        self.inactivity_seconds = inactivity_seconds
+        self.fall_window = fall_window
+        self.clock = clock
+
+        self.background = None
+        self.frame_count = 0
+        self.next_allowed = 0.0
+        self.last_motion = None
+        self.inactive_alerted = False
+        self.last_fall = -float('inf')
+        self.history = deque()  # (ts, largest region) inside the fall window
+        self.latest = None
+
+    def process(self, frame):
+        """Analyse `frame` if stride and budget allow; returns a MotionResult or None when skipped"""
+        self.frame_count += 1
+        now = self.clock()
+        if self.frame_count % self.stride or now < self.next_allowed:
+            VISION_FRAMES.inc(result='skipped')
+            return None
+
+        started = time.perf_counter()
+        gray = to_gray(frame, self.scale)
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray
+            self.last_motion = now
+            VISION_FRAMES.inc(result='analysed')
+            return None
+        mask = np.abs(gray - self.background) > self.threshold
+        self.background += self.alpha * (gray - self.background)
+        ratio = float(mask.mean())
+        regions = []
+        if ratio >= self.min_motion:
+            regions = [tuple(int(v) * self.scale for v in box) for box in find_regions(mask, 8, 0.2)]
+        self.latest = MotionResult(now, ratio, regions)
+
+        self._check_activity(now, ratio >= self.min_motion)
+        if regions:
+            self._check_fall(now, regions[0], frame.shape[0])
+
+        cost = time.perf_counter() - started
+        VISION_SECONDS.observe(cost)
+        VISION_FRAMES.inc(result='analysed')
+        # Duty cycle: after spending `cost`, idle long enough to stay within budget
+        self.next_allowed = now + cost * (1.0 / self.cpu_budget - 1.0)
+        return self.latest
+
+    def _check_activity(self, now, moving):
+        if moving:
+            if self.inactive_alerted:
+                self._publish('activity_resumed', idle_s=round(now - self.last_motion, 1))
+            self.last_motion = now
+            self.inactive_alerted = False
+        elif not self.inactive_alerted and now - self.last_motion >= self.inactivity_seconds:
+            self.inactive_alerted = True
+            self._publish('inactivity_alert', idle_s=round(now - self.last_motion, 1))
+
+    def _check_fall(self, now, box, frame_height):
+        """Tall region turning wide while its centre drops sharply within the window"""
+        self.history.append((now, box))
+        while self.history and now - self.history[0][0] > self.fall_window:
+            self.history.popleft()
+        x, y, w, h = box
+        if w < 1.3 * h or now - self.last_fall < 30:
+            return
+        centre = y + h / 2
+        for _, (px, py, pw, ph) in self.history:
+            if ph >= 1.25 * pw and centre - (py + ph / 2) >= 0.15 * frame_height:
+                self.last_fall = now
+                self.history.clear()
+                self._publish('fall_suspected', region=list(box))
+                return
+
+    def _publish(self, kind, **payload):
+        log.warning("Vision event", kind=kind, robot_id=self.robot_id, **payload)
+        if self.bus is not None:
+            self.bus.publish(kind, robot_id=self.robot_id, **payload)
+
+
+class FrameChangeGate:
+    """
+    Decides whether a frame differs enough from the last encoded one to be
+    worth a new JPEG. Compares a 1/`scale` thumbnail, so sensor noise is
+    ignored; re-encodes at least every `max_reuse` frames regardless.
+    """
+
+    def __init__(self, scale=16, threshold=2.0, max_reuse=Config.CAMERA_FRAMERATE):
+        self.scale = scale
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.reference = None
+        self.reused = 0
+
+    def changed(self, frame):
+        thumb = frame[::self.scale, ::self.scale].astype(np.int16)
+        if (self.reference is None or self.reference.shape != thumb.shape or self.reused >= self.max_reuse
+                or np.abs(thumb - self.reference).mean() > self.threshold):
+            self.reference = thumb
+            self.reused = 0
+            return True
+        self.reused += 1
+        return False
+
+    def reset(self):
+        self.reference = None
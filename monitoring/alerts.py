@@ -0,0 +1,56 @@
+"""
+In-process Alert Bus
+Producers (reminder scheduler, vitals checks, camera) publish typed events;
+subscribers (logging, email, robot dispatch) react without the producer
+knowing about them. A bounded history backs the dashboard's alert poll.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+from monitoring.log import get_logger
+from monitoring.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+ALERTS_TOTAL = REGISTRY.counter('alerts_published_total', 'Alerts published on the bus', ['kind'])
+
+
+class AlertBus:
+    def __init__(self, history=500):
+        self.subscribers = []  # (callback, kinds or None)
+        self.recent = deque(maxlen=history)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback, kinds=None):
+        """callback(alert_dict) for every alert, or only those whose kind is in `kinds`"""
+        with self.lock:
+            self.subscribers.append((callback, frozenset(kinds) if kinds else None))
+
+    def publish(self, kind, **payload):
+        alert = dict(payload, id=next(self.ids), kind=kind, ts=time.time())
+        with self.lock:
+            self.recent.append(alert)
+            subscribers = list(self.subscribers)
+        ALERTS_TOTAL.inc(kind=kind)
+        for callback, kinds in subscribers:
+            if kinds is not None and kind not in kinds:
+                continue
+            try:
+                callback(alert)
+            except Exception as e:
+                # One broken subscriber must not stop the others
+                log.error("Alert subscriber failed", kind=kind, error=e)
+        return alert
+
+    def since(self, last_id=0, **filters):
+        """Alerts newer than `last_id` whose fields match every filter"""
+        with self.lock:
+            items = [a for a in self.recent if a['id'] > last_id]
+        return [a for a in items if all(a.get(k) == v for k, v in filters.items())]
+
+
+BUS = AlertBus()
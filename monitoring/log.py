@@ -0,0 +1,68 @@
+"""
+Structured Logging
+key=value log lines tagged with the current request id, replacing the
+ad-hoc print() calls.
+
+Usage:
+    log = get_logger(__name__)
+    log.info("email sent", to=address)
+"""
+
+import contextvars
+import logging
+import os
+import sys
+
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+_RESERVED = {'exc_info', 'stack_info', 'stacklevel', 'extra'}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        line = '{} level={} logger={} request_id={} msg="{}"'.format(
+            self.formatTime(record, '%Y-%m-%dT%H:%M:%S'), record.levelname.lower(), record.name,
+            getattr(record, 'request_id', '-'), record.getMessage().replace('"', "'"))
+        for key, value in getattr(record, 'fields', {}).items():
+            text = str(value)
+            line += f' {key}="{text}"' if ' ' in text else f' {key}={text}'
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Turns keyword arguments into structured fields"""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _RESERVED}
+        if fields:
+            kwargs.setdefault('extra', {})['fields'] = fields
+        return msg, kwargs
+
+
+_configured = False
+
+
+def configure_logging(level=None):
+    """Install the key=value handler on the root logger (idempotent)"""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(KeyValueFormatter())
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level or os.getenv('LOG_LEVEL', 'INFO').upper())
+    _configured = True
+
+
+def get_logger(name):
+    return StructuredLogger(logging.getLogger(name), {})
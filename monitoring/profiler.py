@@ -0,0 +1,120 @@
+"""
+Sampling Profiler
+Periodically snapshots every thread's stack via sys._current_frames() and
+aggregates them as collapsed stacks ("thread;outer;inner count"), the input
+format of flamegraph.pl and speedscope. Nothing is traced, so overhead is
+bounded by the sampling interval rather than by how busy the app is.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+from monitoring.metrics import REGISTRY
+
+PROFILER_OVERHEAD = REGISTRY.gauge(
+    'profiler_overhead_ratio', 'Fraction of wall time the always-on profiler spends sampling')
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(skip_ident=None):
+    """Return one collapsed stack string per live thread"""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks = []
+    for ident, frame in sys._current_frames().items():
+        if ident == skip_ident:
+            continue
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.append(names.get(ident, f'thread-{ident}'))
+        stacks.append(';'.join(reversed(labels)))
+    return stacks
+
+
+def to_collapsed(counts):
+    """Render a Counter of stacks in flamegraph collapsed format"""
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+
+
+def profile_for(seconds, interval=0.005):
+    """
+    Sample all other threads from the calling thread for a fixed duration.
+
+    Returns:
+        collections.Counter: collapsed stack -> sample count
+    """
+    counts = collections.Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        counts.update(sample_stacks(skip_ident=me))
+        time.sleep(interval)
+    return counts
+
+
+class RollingProfiler:
+    """Always-on low-rate sampler keeping per-second buckets for a rolling window"""
+
+    def __init__(self, interval=0.1, window_seconds=300):
+        self.interval = interval
+        self.window_seconds = window_seconds
+        self.buckets = collections.deque()
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.busy_time = 0.0
+        self.started_at = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._loop, name='rolling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def _loop(self):
+        me = threading.get_ident()
+        while self.running:
+            t0 = time.perf_counter()
+            stacks = sample_stacks(skip_ident=me)
+            second = int(time.time())
+            with self.lock:
+                if not self.buckets or self.buckets[-1][0] != second:
+                    self.buckets.append((second, collections.Counter()))
+                self.buckets[-1][1].update(stacks)
+                while self.buckets and self.buckets[0][0] < second - self.window_seconds:
+                    self.buckets.popleft()
+            self.busy_time += time.perf_counter() - t0
+            PROFILER_OVERHEAD.set(round(self.overhead(), 6))
+            time.sleep(self.interval)
+
+    def overhead(self):
+        """Sampling time as a fraction of wall time since start"""
+        if not self.started_at:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.busy_time / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self, seconds=None):
+        """Merge the buckets from the last `seconds` (default: whole window)"""
+        cutoff = int(time.time()) - (seconds or self.window_seconds)
+        merged = collections.Counter()
+        with self.lock:
+            for second, counts in self.buckets:
+                if second >= cutoff:
+                    merged.update(counts)
+        return merged
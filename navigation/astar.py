@@ -0,0 +1,62 @@
+"""
+A* Path Planner (Server Side)
+Python port of static/js/astar.js so routes can be planned on the robot.
+Grid format matches the saved UserMap: grid[x][y], 0 = free, 1 = wall.
+"""
+
+import heapq
+
+
+def get_neighbors(grid, x, y):
+    """4-neighbour expansion, same order as getNeighbors() in astar.js"""
+    cols, rows = len(grid), len(grid[0])
+    if x < cols - 1: yield x + 1, y
+    if x > 0: yield x - 1, y
+    if y < rows - 1: yield x, y + 1
+    if y > 0: yield x, y - 1
+
+
+def find_path(grid, start, end):
+    """
+    Find the shortest path between two cells.
+
+    Args:
+        grid (list): Column-major occupancy grid (grid[x][y])
+        start (tuple): (x, y) start cell
+        end (tuple): (x, y) goal cell
+
+    Returns:
+        list: Cells from start to end inclusive, or [] if unreachable
+    """
+    if grid[start[0]][start[1]] == 1 or grid[end[0]][end[1]] == 1:
+        return []
+
+    ex, ey = end
+    open_heap = [(abs(start[0] - ex) + abs(start[1] - ey), 0, start)]
+    g_score = {start: 0}
+    parent = {start: None}
+    closed = set()
+
+    while open_heap:
+        _, g, current = heapq.heappop(open_heap)
+        if current in closed:
+            continue
+        if current == end:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = parent[current]
+            return path[::-1]
+        closed.add(current)
+
+        for nx, ny in get_neighbors(grid, *current):
+            neighbor = (nx, ny)
+            if neighbor in closed or grid[nx][ny] == 1:
+                continue
+            tentative = g + 1
+            if tentative < g_score.get(neighbor, float('inf')):
+                g_score[neighbor] = tentative
+                parent[neighbor] = current
+                heapq.heappush(open_heap, (tentative + abs(nx - ex) + abs(ny - ey), tentative, neighbor))
+
+    return []
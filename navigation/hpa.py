@@ -0,0 +1,397 @@
+"""
+Hierarchical Path Planner (HPA*)
+Plans across large multi-room, multi-floor maps without expanding every cell.
+
+    - each floor is cut into square clusters of CLUSTER_SIZE cells
+    - entrances are picked on every open stretch of a cluster border (one in
+      the middle of narrow gaps such as doorways, one at each end of wide ones)
+    - entrance-to-entrance costs and paths inside each cluster are computed
+      once when the map is built
+    - elevators link the same shaft's cells on different floors
+    - a query connects start and goal to their cluster's entrances, runs A*
+      on the small abstract graph, then stitches the cached cell paths
+    - routes between floors skip the search: shortest-path trees rooted at
+      every elevator stop are built once, and the best route is the cheapest
+      start -> stop -> goal combination
+
+Routes are near-optimal (typically within a few percent of flat A*); query
+cost depends on the number of clusters crossed, not on cells, and on the
+number of elevator stops for routes between floors.
+
+Map format: a single grid as saved by UserMap (grid[x][y], 0 = free,
+1 = wall) or a building
+
+    {'floors': [grid, ...], 'elevators': [[[floor, x, y], ...], ...]}
+
+where each elevator lists the cell it occupies on every floor it serves.
+Cells are (floor, x, y) internally; single-grid maps take and return (x, y).
+"""
+
+import hashlib
+import heapq
+import json
+import threading
+from collections import OrderedDict, deque
+from itertools import count
+
+from navigation.astar import get_neighbors
+
+CLUSTER_SIZE = 10
+ELEVATOR_COST = 20  # Per floor travelled, in cell steps
+WIDE_ENTRANCE = 6  # Border openings at least this long get two entrances
+
+INF = float('inf')
+
+
+def check_grid(grid, name='grid'):
+    """ValueError unless `grid` is a non-empty rectangle of 0/1 cells"""
+    if not isinstance(grid, list) or not grid or not all(isinstance(col, list) and col for col in grid):
+        raise ValueError(f'{name} must be a non-empty list of non-empty columns')
+    if any(len(col) != len(grid[0]) for col in grid):
+        raise ValueError(f'{name} columns must all be the same length')
+    if any(type(cell) is not int or cell not in (0, 1) for col in grid for cell in col):
+        raise ValueError(f'{name} cells must be 0 (free) or 1 (wall)')
+
+
+def check_map(data):
+    """ValueError unless `data` is a map from_map() can build: a grid, or floors plus elevators inside them"""
+    if not isinstance(data, dict):
+        check_grid(data)
+        return
+    floors = data.get('floors')
+    if not isinstance(floors, list) or not floors:
+        raise ValueError('floors must be a non-empty list of grids')
+    for f, grid in enumerate(floors):
+        check_grid(grid, f'floor {f}')
+    shafts = data.get('elevators', [])
+    if not isinstance(shafts, list) or not all(isinstance(shaft, list) for shaft in shafts):
+        raise ValueError('elevators must be a list of cell lists')
+    for shaft in shafts:
+        for cell in shaft:
+            if (not isinstance(cell, list) or len(cell) != 3 or any(type(v) is not int for v in cell)
+                    or not 0 <= cell[0] < len(floors)
+                    or not (0 <= cell[1] < len(floors[cell[0]]) and 0 <= cell[2] < len(floors[cell[0]][0]))):
+                raise ValueError(f'Elevator cell {cell!r} is not [floor, x, y] inside the building')
+
+
+class HierarchicalMap:
+    def __init__(self, floors, elevators=(), cluster_size=CLUSTER_SIZE, elevator_cost=ELEVATOR_COST):
+        """
+        Args:
+            floors (list): One column-major grid per floor
+            elevators (list): Each a list of (floor, x, y) cells, one per floor served
+            cluster_size (int): Cluster edge length in cells
+            elevator_cost (int): Cost of riding one floor
+        """
+        self.floors = floors
+        self.multi_floor = True
+        self.cluster_size = cluster_size
+        self.elevator_cost = elevator_cost
+        self.entrances = {}  # cluster -> abstract nodes on it
+        self.edges = {}  # node -> {node: cost}
+        self.paths = {}  # (node, node) -> cells from one to the other
+        self.stops = {}  # floor -> elevator cells on it
+        self._find_entrances()
+        self._link_elevators(elevators)
+        for cluster in list(self.entrances):
+            self._connect_cluster(cluster)
+        self._build_elevator_trees()
+
+    @classmethod
+    def from_map(cls, data, **options):
+        """Builds from a saved map: a plain grid or a {'floors', 'elevators'} building"""
+        if isinstance(data, dict):
+            elevators = [[tuple(cell) for cell in shaft] for shaft in data.get('elevators', [])]
+            return cls(data['floors'], elevators, **options)
+        planner = cls([data], **options)
+        planner.multi_floor = False
+        return planner
+
+    # ---------- geometry ----------
+    def cluster_of(self, cell):
+        f, x, y = cell
+        return f, x // self.cluster_size, y // self.cluster_size
+
+    def bounds(self, cluster):
+        f, cx, cy = cluster
+        grid, s = self.floors[f], self.cluster_size
+        return cx * s, min((cx + 1) * s, len(grid)), cy * s, min((cy + 1) * s, len(grid[0]))
+
+    def is_free(self, cell):
+        f, x, y = cell
+        if not (0 <= f < len(self.floors)):
+            return False
+        grid = self.floors[f]
+        return 0 <= x < len(grid) and 0 <= y < len(grid[0]) and grid[x][y] == 0
+
+    def cell(self, value):
+        """Request coordinates -> (floor, x, y); single-grid maps take [x, y]"""
+        cell = tuple(int(v) for v in value)
+        if len(cell) != (3 if self.multi_floor else 2):
+            raise ValueError(f'Expected {"[floor, x, y]" if self.multi_floor else "[x, y]"}, got {value!r}')
+        return cell if self.multi_floor else (0, *cell)
+
+    def export(self, path):
+        """Cells back in request coordinates"""
+        return [list(c) if self.multi_floor else [c[1], c[2]] for c in path]
+
+    # ---------- build ----------
+    def _add_node(self, cell):
+        nodes = self.entrances.setdefault(self.cluster_of(cell), [])
+        if cell not in self.edges:
+            nodes.append(cell)
+            self.edges[cell] = {}
+
+    def _link(self, a, b, path):
+        self._add_node(a)
+        self._add_node(b)
+        cost = self._cost(path)
+        if cost < self.edges[a].get(b, INF):
+            self.edges[a][b] = self.edges[b][a] = cost
+            self.paths[a, b] = path
+            self.paths[b, a] = path[::-1]
+
+    def _cost(self, path):
+        """Steps on a floor cost 1, elevator rides elevator_cost per floor"""
+        return sum(abs(a[0] - b[0]) * self.elevator_cost or 1 for a, b in zip(path, path[1:]))
+
+    def _find_entrances(self):
+        s = self.cluster_size
+        for f, grid in enumerate(self.floors):
+            cols, rows = len(grid), len(grid[0])
+            for x in range(s, cols, s):  # Vertical borders between columns x-1 and x
+                for y0 in range(0, rows, s):
+                    self._add_border(f, [((x - 1, y), (x, y)) for y in range(y0, min(y0 + s, rows))])
+            for y in range(s, rows, s):
+                for x0 in range(0, cols, s):
+                    self._add_border(f, [((x, y - 1), (x, y)) for x in range(x0, min(x0 + s, cols))])
+
+    def _add_border(self, f, pairs):
+        """Entrances on one border segment: pairs of facing cells in two neighbouring clusters"""
+        grid = self.floors[f]
+        runs, run = [], []
+        for a, b in pairs:
+            if grid[a[0]][a[1]] == 0 and grid[b[0]][b[1]] == 0:
+                run.append((a, b))
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+        for run in runs:
+            picks = [run[len(run) // 2]] if len(run) < WIDE_ENTRANCE else [run[0], run[-1]]
+            for a, b in picks:
+                self._link((f, *a), (f, *b), [(f, *a), (f, *b)])
+
+    def _link_elevators(self, elevators):
+        for shaft in elevators:
+            stops = sorted(shaft)
+            for cell in stops:
+                if not self.is_free(cell):
+                    raise ValueError(f'Elevator cell {cell} is a wall or off the map')
+                self.stops.setdefault(cell[0], []).append(cell)
+                self._add_node(cell)
+            for a, b in zip(stops, stops[1:]):
+                self._link(a, b, [a, b])
+
+    def _connect_cluster(self, cluster):
+        nodes = self.entrances[cluster]
+        for i, node in enumerate(nodes):
+            parent = self._search_cluster(node)
+            for other in nodes[i + 1:]:
+                if other[1:] in parent:
+                    self._link(node, other, self._trace(parent, node[0], other[1:]))
+
+    def _search_cluster(self, source):
+        """Breadth-first search from `source` that stays inside its cluster; returns the parent map"""
+        f = source[0]
+        grid = self.floors[f]
+        x0, x1, y0, y1 = self.bounds(self.cluster_of(source))
+        parent = {source[1:]: None}
+        queue = deque([source[1:]])
+        while queue:
+            current = queue.popleft()
+            for nx, ny in get_neighbors(grid, *current):
+                if x0 <= nx < x1 and y0 <= ny < y1 and grid[nx][ny] == 0 and (nx, ny) not in parent:
+                    parent[nx, ny] = current
+                    queue.append((nx, ny))
+        return parent
+
+    @staticmethod
+    def _trace(parent, f, cell):
+        path = []
+        while cell is not None:
+            path.append((f, *cell))
+            cell = parent[cell]
+        return path[::-1]
+
+    def _build_elevator_trees(self):
+        """Shortest-path trees over the abstract graph rooted at every elevator stop, for cross-floor queries"""
+        self.trees = {}
+        for stop in (cell for cells in self.stops.values() for cell in cells):
+            dist, parent = {stop: 0}, {stop: None}
+            heap = [(0, stop)]
+            while heap:
+                d, node = heapq.heappop(heap)
+                if d > dist[node]:
+                    continue
+                for neighbor, cost in self.edges[node].items():
+                    if d + cost < dist.get(neighbor, INF):
+                        dist[neighbor] = d + cost
+                        parent[neighbor] = node
+                        heapq.heappush(heap, (d + cost, neighbor))
+            self.trees[stop] = (dist, parent)
+
+    # ---------- queries ----------
+    def find_path(self, start, end):
+        """
+        Args:
+            start (tuple): (floor, x, y)
+            end (tuple): (floor, x, y)
+        Returns:
+            list: Cells from start to end inclusive, or [] if unreachable
+        """
+        if not self.is_free(start) or not self.is_free(end):
+            return []
+        if start == end:
+            return [start]
+
+        start_parent, start_links = self._local_links(start)
+        _, end_links = self._local_links(end)
+        if start[0] != end[0] and self.trees:
+            return self._via_elevators(start_links, end_links)
+
+        # Temporary edges from start/goal to their clusters' entrances; the map itself is never mutated
+        extra, extra_paths = {}, {}
+
+        def add(a, b, path):
+            cost = self._cost(path)
+            if cost < extra.setdefault(a, {}).get(b, INF):
+                extra[a][b] = extra.setdefault(b, {})[a] = cost
+                extra_paths[a, b], extra_paths[b, a] = path, path[::-1]
+
+        for cell, links in ((start, start_links), (end, end_links)):
+            for node, path in links.items():
+                if node != cell:
+                    add(cell, node, path)
+        if self.cluster_of(end) == self.cluster_of(start) and end[1:] in start_parent:
+            add(start, end, self._trace(start_parent, start[0], end[1:]))
+
+        route = self._search_abstract(start, end, extra, self._heuristic_to(end))
+        if not route:
+            return []
+        path = [start]
+        for a, b in zip(route, route[1:]):
+            path.extend((extra_paths.get((a, b)) or self.paths[a, b])[1:])
+        return path
+
+    def _local_links(self, cell):
+        """Paths from `cell` to the abstract nodes of its cluster (itself included when it is one)"""
+        parent = self._search_cluster(cell)
+        links = {cell: [cell]} if cell in self.edges else {}
+        for node in self.entrances.get(self.cluster_of(cell), ()):
+            if node != cell and node[1:] in parent:
+                links[node] = self._trace(parent, cell[0], node[1:])
+        return parent, links
+
+    def _via_elevators(self, start_links, end_links):
+        """
+        Every route between floors passes an elevator stop, so the best one is
+        the minimum over stops of (start -> stop) + (stop -> end), read off the
+        precomputed trees. Costs a few lookups per stop instead of a search.
+        """
+        def nearest(links, dist):
+            return min(((self._cost(path) + dist[node], node, path) for node, path in links.items() if node in dist),
+                       key=lambda option: option[0], default=None)
+
+        best = None
+        for stop, (dist, parent) in self.trees.items():
+            to_stop, from_stop = nearest(start_links, dist), nearest(end_links, dist)
+            if to_stop and from_stop and (best is None or to_stop[0] + from_stop[0] < best[0]):
+                best = (to_stop[0] + from_stop[0], parent, to_stop, from_stop)
+        if best is None:
+            return []
+
+        _, parent, (_, first, head), (_, last, tail) = best
+        route = self._climb(parent, first) + self._climb(parent, last)[::-1][1:]
+        path = list(head)
+        for a, b in zip(route, route[1:]):
+            path.extend(self.paths[a, b][1:])
+        path.extend(tail[::-1][1:])
+        return path
+
+    @staticmethod
+    def _climb(parent, node):
+        """Abstract nodes from `node` up to the tree's root"""
+        route = []
+        while node is not None:
+            route.append(node)
+            node = parent[node]
+        return route
+
+    def _heuristic_to(self, end):
+        """
+        Admissible estimate towards `end`: Manhattan distance on its floor;
+        from other floors, the walk to the nearest elevator, the ride, and the
+        walk from the elevator nearest the goal.
+        """
+        _, ex, ey = end
+        arrive = min((abs(x - ex) + abs(y - ey) for _, x, y in self.stops.get(end[0], ())), default=0)
+
+        def estimate(node):
+            f, x, y = node
+            if f == end[0]:
+                return abs(x - ex) + abs(y - ey)
+            leave = min((abs(x - sx) + abs(y - sy) for _, sx, sy in self.stops.get(f, ())), default=0)
+            return leave + abs(f - end[0]) * self.elevator_cost + arrive
+        return estimate
+
+    def _search_abstract(self, start, end, extra, heuristic):
+        tie = count()
+        open_heap = [(heuristic(start), 0, next(tie), start)]
+        g_score = {start: 0}
+        parent = {start: None}
+        closed = set()
+        while open_heap:
+            _, g, _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            if current == end:
+                return self._climb(parent, current)[::-1]
+            closed.add(current)
+            for edges in (self.edges.get(current, {}), extra.get(current, {})):
+                for neighbor, cost in edges.items():
+                    tentative = g + cost
+                    if neighbor not in closed and tentative < g_score.get(neighbor, INF):
+                        g_score[neighbor] = tentative
+                        parent[neighbor] = current
+                        heapq.heappush(open_heap, (tentative + heuristic(neighbor), tentative, next(tie), neighbor))
+        return []
+
+    def stats(self):
+        return {
+            'floors': len(self.floors),
+            'clusters': len(self.entrances),
+            'nodes': len(self.edges),
+            'edges': sum(len(e) for e in self.edges.values()) // 2,
+        }
+
+
+_planners = OrderedDict()
+_planners_lock = threading.Lock()
+
+
+def planner_for(map_json, max_cached=32):
+    """Planners are cached by the saved map's content, so a saved edit builds a new one"""
+    key = hashlib.sha1(map_json.encode()).hexdigest()
+    with _planners_lock:
+        planner = _planners.get(key)
+        if planner is not None:
+            _planners.move_to_end(key)
+            return planner
+    planner = HierarchicalMap.from_map(json.loads(map_json))
+    with _planners_lock:
+        _planners[key] = planner
+        while len(_planners) > max_cached:
+            _planners.popitem(last=False)
+    return planner
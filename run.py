@@ -0,0 +1,11 @@
+"""
+Server entry point: python run.py
+
+Worker processes are spawned, and spawn re-imports the parent's __main__
+module in each of them. This module is that __main__: importing it does
+nothing, so workers load only workers.tasks, not the Flask app.
+"""
+
+if __name__ == '__main__':
+    import app
+    app.main()
@@ -0,0 +1,279 @@
+"""
+Reminder Scheduler
+Keeps every upcoming dose occurrence in a min-heap and sleeps on a
+Condition until the earliest one is due, so each event costs O(log n)
+instead of rescanning all medications on a timer.
+
+Per dose slot the flow is:
+    reminder (at the scheduled time)
+      -> escalation (still not taken after `escalate_after`)
+        -> missed (still not taken after `missed_after`)
+Water reminders repeat per user every `water_interval` seconds.
+
+Edits never search the heap: a changed medication gets a new version and
+stale entries are dropped when they reach the top (lazy cancellation).
+The high-water mark and pending follow-ups are persisted as JSON so a
+restart neither repeats reminders nor forgets doses that were missed while
+the server was down.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from monitoring.log import get_logger
+from monitoring.metrics import QUEUE_DEPTH
+
+log = get_logger(__name__)
+
+Dose = namedtuple('Dose', 'med_id user_id patient name time frequency days')
+
+REMINDER, ESCALATION, MISSED, WATER = 'reminder', 'escalation', 'missed', 'water'
+ALERT_KINDS = {REMINDER: 'dose_reminder', ESCALATION: 'dose_escalation', MISSED: 'dose_missed', WATER: 'water_reminder'}
+SLOT_FORMAT = '%Y-%m-%d %H:%M'
+CATCH_UP_WINDOW = 24 * 3600  # Oldest downtime occurrences replayed after a restart
+MAX_WAIT = 60.0  # Re-check the wall clock at least this often (NTP/DST jumps)
+
+
+def is_due_on(dose, day):
+    """Same rule as the dashboard schedule: daily, or custom days like 'Mon,Wed'"""
+    return (dose.frequency == "Daily") or bool(dose.days and day.strftime("%a") in dose.days)
+
+
+def next_occurrence(dose, after):
+    """Epoch seconds of the first scheduled time strictly after `after`, or None"""
+    try:
+        hour, minute = map(int, dose.time.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    start = datetime.fromtimestamp(after).date()
+    for offset in range(8):
+        day = start + timedelta(days=offset)
+        due = datetime(day.year, day.month, day.day, hour, minute).timestamp()
+        if due > after and is_due_on(dose, day):
+            return due
+    return None
+
+
+class ReminderScheduler:
+    def __init__(self, load_doses, dose_taken, bus, state_path=None,
+                 escalate_after=15 * 60, missed_after=60 * 60, water_interval=2 * 3600, clock=time.time):
+        """
+        Args:
+            load_doses (callable): (user_id=None) -> [Dose], all users when None
+            dose_taken (callable): (med_id, 'YYYY-MM-DD') -> bool, or None if the med is gone
+            bus (AlertBus): Where reminder/escalation/missed events are published
+            state_path (str): JSON file for restart state (None = in memory only)
+            water_interval (float): Seconds between water reminders (0 disables)
+        """
+        self.load_doses = load_doses
+        self.dose_taken = dose_taken
+        self.bus = bus
+        self.state_path = state_path
+        self.escalate_after = escalate_after
+        self.missed_after = missed_after
+        self.water_interval = water_interval
+        self.clock = clock
+
+        self.heap = []  # (due, seq, kind, key, version, slot)
+        self.seq = itertools.count()
+        self.doses = {}  # med_id -> Dose
+        self.versions = {}  # med_id -> current version
+        self.by_user = {}  # user_id -> {med_id}
+        self.water_due = {}  # user_id -> next water reminder
+        self.followups = {}  # (kind, med_id, slot) -> due, persisted across restarts
+        self.watermark = None  # Everything due at or before this has been handled
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    # ---------- heap maintenance (caller holds self.cond) ----------
+    def _push(self, due, kind, key, version=0, slot=None):
+        heapq.heappush(self.heap, (due, next(self.seq), kind, key, version, slot))
+        if kind in (ESCALATION, MISSED):
+            self.followups[(kind, key, slot)] = due
+
+    def _add(self, dose, since):
+        version = self.versions.get(dose.med_id, 0) + 1
+        self.versions[dose.med_id] = version
+        self.doses[dose.med_id] = dose
+        self.by_user.setdefault(dose.user_id, set()).add(dose.med_id)
+        due = next_occurrence(dose, since)
+        if due is not None:
+            self._push(due, REMINDER, dose.med_id, version)
+        if self.water_interval and dose.user_id not in self.water_due:
+            self.water_due[dose.user_id] = since + self.water_interval
+            self._push(since + self.water_interval, WATER, dose.user_id)
+
+    def _remove(self, med_id):
+        dose = self.doses.pop(med_id, None)
+        self.versions[med_id] = self.versions.get(med_id, 0) + 1
+        if dose is not None:
+            meds = self.by_user.get(dose.user_id, set())
+            meds.discard(med_id)
+            if not meds:
+                self.by_user.pop(dose.user_id, None)
+                self.water_due.pop(dose.user_id, None)
+
+    # ---------- loading ----------
+    def load(self):
+        """Seed the heap from the database plus persisted state"""
+        state = self._read_state()
+        now = self.clock()
+        since = max(state.get('watermark') or now, now - CATCH_UP_WINDOW)
+        doses = self.load_doses()
+        with self.cond:
+            self.heap.clear()
+            self.doses.clear()
+            self.by_user.clear()
+            self.water_due.clear()
+            self.followups.clear()
+            for dose in doses:
+                self._add(dose, since)
+            for due, kind, med_id, slot in state.get('followups', []):
+                if med_id in self.doses:
+                    self._push(due, kind, med_id, slot=slot)
+            self.watermark = since
+            self.cond.notify()
+        log.info("Reminders loaded", doses=len(doses), pending=len(self.heap))
+        return len(doses)
+
+    def reload_user(self, user_id):
+        """Re-sync one user's medications after an edit; unchanged doses keep their entries"""
+        fresh = {dose.med_id: dose for dose in self.load_doses(user_id)}
+        now = self.clock()
+        with self.cond:
+            for med_id in self.by_user.get(user_id, set()) - set(fresh):
+                self._remove(med_id)
+            for med_id, dose in fresh.items():
+                if self.doses.get(med_id) != dose:
+                    self._add(dose, now)
+            self.cond.notify()
+
+    # ---------- firing ----------
+    def run_due(self, now=None):
+        """Handle every entry due at or before `now`; returns the number of alerts published"""
+        now = self.clock() if now is None else now
+        with self.cond:
+            batch = []
+            while self.heap and self.heap[0][0] <= now:
+                batch.append(heapq.heappop(self.heap))
+        published = sum(self._fire(entry, now) for entry in batch)
+        if batch:
+            with self.cond:
+                self.watermark = max(self.watermark or 0, batch[-1][0])
+                QUEUE_DEPTH.set(len(self.heap), queue='reminders')
+            self._save_state()
+        return published
+
+    def _fire(self, entry, now):
+        due, _, kind, key, version, slot = entry
+        if kind == WATER:
+            with self.cond:
+                if self.water_due.get(key) != due:
+                    return 0
+                next_due = due + self.water_interval
+                while next_due <= now:  # Don't replay a backlog of water reminders
+                    next_due += self.water_interval
+                self.water_due[key] = next_due
+                self._push(next_due, WATER, key)
+            self.bus.publish(ALERT_KINDS[WATER], user_id=key)
+            return 1
+
+        with self.cond:
+            self.followups.pop((kind, key, slot), None)
+            dose = self.doses.get(key)
+            if dose is None or (kind == REMINDER and self.versions.get(key) != version):
+                return 0  # Cancelled lazily
+            if kind == REMINDER:
+                slot = datetime.fromtimestamp(due).strftime(SLOT_FORMAT)
+                next_due = next_occurrence(dose, due)
+                if next_due is not None:
+                    self._push(next_due, REMINDER, key, version)
+
+        if self.dose_taken(key, slot[:10]) is not False:
+            return 0  # Taken already (or deleted meanwhile)
+
+        slot_due = datetime.strptime(slot, SLOT_FORMAT).timestamp()
+        with self.cond:
+            if kind == REMINDER and now - slot_due >= self.missed_after:
+                # Came due while we were down: skip straight to the missed check
+                self._push(slot_due + self.missed_after, MISSED, key, slot=slot)
+                return 0
+            if kind == REMINDER:
+                self._push(slot_due + self.escalate_after, ESCALATION, key, slot=slot)
+            elif kind == ESCALATION:
+                self._push(slot_due + self.missed_after, MISSED, key, slot=slot)
+
+        self.bus.publish(ALERT_KINDS[kind], user_id=dose.user_id, med_id=key, medication=dose.name,
+                         patient=dose.patient, slot=slot)
+        return 1
+
+    # ---------- persistence ----------
+    def _read_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Reminder state unreadable, starting fresh", error=e)
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        with self.cond:
+            state = {
+                'watermark': self.watermark,
+                'followups': [[due, kind, med_id, slot] for (kind, med_id, slot), due in self.followups.items()],
+            }
+        tmp = self.state_path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            log.error("Could not save reminder state", error=e)
+
+    # ---------- thread ----------
+    def start(self):
+        if self.running:
+            return
+        self.load()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='reminder-scheduler', daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.running:
+                    wait = self.heap[0][0] - self.clock() if self.heap else MAX_WAIT
+                    if wait <= 0:
+                        break
+                    self.cond.wait(min(wait, MAX_WAIT))
+                if not self.running:
+                    return
+            try:
+                self.run_due()
+            except Exception as e:
+                log.error("Reminder dispatch failed", error=e)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self._save_state()
+
+    def stats(self):
+        with self.cond:
+            return {'doses': len(self.doses), 'heap': len(self.heap), 'followups': len(self.followups),
+                    'next_due': self.heap[0][0] if self.heap else None}
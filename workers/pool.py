@@ -0,0 +1,219 @@
+"""
+Worker Process Pool
+CPU-bound work (JPEG encoding and privacy blur, path planning) runs in
+separate processes, so it no longer competes with request handling for the
+GIL and can use every core of the Pi.
+
+    - tasks are routed by kind to a lane: a small process pool of its own,
+      so a burst of planning never queues behind camera frames
+    - frames and maps are handed over in shared memory: the worker maps the
+      parent's block and reads it in place, nothing large is pickled
+    - each lane admits at most WORKER_MAX_PENDING tasks; beyond that submit()
+      raises Backpressure and the caller degrades (the camera serves its last
+      frame, the planner answers 503)
+
+Usage:
+    pool = get_pool()
+    jpeg = pool.run('encode_frame', privacy, resolution, share=[frame])
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from config import Config
+from monitoring.log import get_logger
+from monitoring.metrics import QUEUE_DEPTH, REGISTRY
+from workers import tasks
+
+log = get_logger(__name__)
+
+WORKER_TASK_SECONDS = REGISTRY.histogram('worker_task_seconds', 'Round trip of a task through the worker pool',
+                                         ['kind'])
+WORKER_TASKS = REGISTRY.counter('worker_tasks_total', 'Worker pool tasks by outcome', ['kind', 'outcome'])
+
+# kind -> (lane, function run in the worker)
+ROUTES = {
+    'encode_frame': ('encode', tasks.encode_shared),
+    'plan_path': ('plan', tasks.plan_shared),
+}
+
+
+class Backpressure(Exception):
+    """The task's lane is full; the caller should degrade instead of queueing more work"""
+
+
+class SharedArrays:
+    """
+    Shared memory blocks owned by the parent. Leased blocks carry one task's
+    input and are reused by size once the task finishes; published blocks
+    hold long-lived inputs (saved maps) by key, least recently used evicted.
+    """
+
+    def __init__(self, max_published=Config.WORKER_MAX_PUBLISHED):
+        self.free = {}  # nbytes -> idle blocks
+        self.published = OrderedDict()  # key -> (block, ref)
+        self.max_published = max_published
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _write(block, array):
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def lease(self, array):
+        """Copies `array` into a block; returns (ref, release)"""
+        array = np.ascontiguousarray(array)
+        size = max(array.nbytes, 1)
+        with self.lock:
+            idle = self.free.get(size)
+            block = idle.pop() if idle else None
+        if block is None:
+            block = shared_memory.SharedMemory(create=True, size=size)
+        ref = self._write(block, array)
+
+        def release():
+            with self.lock:
+                self.free.setdefault(size, []).append(block)
+        return ref, release
+
+    def publish(self, key, data):
+        """Ref to a block holding `data` (bytes or array) under `key`, written on first use"""
+        with self.lock:
+            entry = self.published.get(key)
+            if entry is not None:
+                self.published.move_to_end(key)
+                return entry[1]
+        array = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else np.asarray(data)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        ref = self._write(block, array)
+        with self.lock:
+            self.published[key] = (block, ref)
+            while len(self.published) > self.max_published:
+                self._destroy(self.published.popitem(last=False)[1][0])
+        return ref
+
+    @staticmethod
+    def _destroy(block):
+        block.close()
+        block.unlink()
+
+    def close(self):
+        with self.lock:
+            blocks = [b for idle in self.free.values() for b in idle] + [b for b, _ in self.published.values()]
+            self.free.clear()
+            self.published.clear()
+        for block in blocks:
+            self._destroy(block)
+
+
+class WorkerPool:
+    def __init__(self, lanes=Config.WORKER_LANES, max_pending=Config.WORKER_MAX_PENDING, routes=None):
+        """
+        Args:
+            lanes (dict): lane -> worker processes
+            max_pending (dict): lane -> tasks queued or running before submit() refuses
+            routes (dict): kind -> (lane, function); defaults to ROUTES
+        """
+        self.lanes = dict(lanes)
+        self.routes = routes or ROUTES
+        self.context = get_context('spawn')  # Forking a threaded Flask process is unsafe
+        self.executors = {lane: self._executor(lane) for lane in self.lanes}
+        self.slots = {lane: threading.BoundedSemaphore(max_pending[lane]) for lane in self.lanes}
+        self.pending = dict.fromkeys(self.lanes, 0)
+        self.shared = SharedArrays()
+        self.lock = threading.Lock()
+
+    def _executor(self, lane):
+        return ProcessPoolExecutor(max_workers=self.lanes[lane], mp_context=self.context,
+                                   initializer=tasks.init_worker)
+
+    def publish(self, key, data):
+        return self.shared.publish(key, data)
+
+    def submit(self, kind, *args, share=(), wait=0):
+        """
+        Queues `kind` on its lane. Arrays in `share` are copied into shared
+        memory and passed to the task as refs, ahead of `args`.
+
+        Args:
+            wait (float): Seconds to wait for room in the lane before raising Backpressure
+        Returns: concurrent.futures.Future
+        """
+        lane, fn = self.routes[kind]
+        acquired = self.slots[lane].acquire(timeout=wait) if wait else self.slots[lane].acquire(blocking=False)
+        if not acquired:
+            WORKER_TASKS.inc(kind=kind, outcome='rejected')
+            raise Backpressure(f'{lane} lane is full')
+        try:
+            leases = [self.shared.lease(array) for array in share]
+        except Exception:
+            self.slots[lane].release()
+            raise
+        started = time.perf_counter()
+        self._track(lane, 1)
+
+        def done(future):
+            for _, release in leases:
+                release()
+            self.slots[lane].release()
+            self._track(lane, -1)
+            WORKER_TASK_SECONDS.observe(time.perf_counter() - started, kind=kind)
+            WORKER_TASKS.inc(kind=kind, outcome='error' if future.cancelled() or future.exception() else 'ok')
+
+        call_args = [ref for ref, _ in leases] + list(args)
+        try:
+            try:
+                future = self.executors[lane].submit(fn, *call_args)
+            except BrokenProcessPool:
+                # A worker died (OOM, segfault in a codec); replace the lane's pool once
+                log.error("Worker lane broken, restarting", lane=lane)
+                self.executors[lane] = self._executor(lane)
+                future = self.executors[lane].submit(fn, *call_args)
+        except Exception:
+            for _, release in leases:
+                release()
+            self.slots[lane].release()
+            self._track(lane, -1)
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def run(self, kind, *args, share=(), wait=0, timeout=Config.WORKER_TIMEOUT):
+        """submit() and wait for the result; the calling thread releases the GIL while it waits"""
+        return self.submit(kind, *args, share=share, wait=wait).result(timeout)
+
+    def _track(self, lane, delta):
+        with self.lock:
+            self.pending[lane] += delta
+            QUEUE_DEPTH.set(self.pending[lane], queue=f'worker_{lane}')
+
+    def stats(self):
+        with self.lock:
+            return {'lanes': dict(self.lanes), 'pending': dict(self.pending)}
+
+    def close(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.shared.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool, created on first use and shut down at exit"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+            atexit.register(_pool.close)
+    return _pool
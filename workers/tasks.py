@@ -0,0 +1,82 @@
+"""
+Worker-Side Tasks
+Functions the worker processes run. Large inputs arrive as shared memory
+references (name, shape, dtype) and are read in place through numpy views;
+only small arguments and results are pickled.
+
+Kept free of app/Flask imports. Spawned workers also re-import the parent's
+__main__ module, so they only start quickly when the server is launched
+through run.py, whose module body is empty; launched as `python app.py`,
+every worker imports the whole app.
+"""
+
+import io
+import json
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from navigation.hpa import HierarchicalMap
+
+MAX_ATTACHED = 64  # Shared memory blocks a worker keeps mapped
+MAX_PLANNERS = 8  # Hierarchical maps a worker keeps built
+
+_attached = OrderedDict()
+_planners = OrderedDict()
+
+
+def init_worker():
+    # One process per core already; OpenCV's own thread pool would only oversubscribe
+    cv2.setNumThreads(1)
+
+
+def attach(ref):
+    """numpy view of a shared block; mappings are cached because the parent reuses its blocks"""
+    name, shape, dtype = ref
+    shm = _attached.get(name)
+    if shm is None:
+        # Spawned workers share the parent's resource tracker, so attaching
+        # re-registers a name it already holds; the parent alone unlinks it
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)[1].close()
+    else:
+        _attached.move_to_end(name)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def encode_frame(frame_array, privacy, resolution, quality=85):
+    """BGR camera frame -> JPEG bytes: colour convert, privacy blur, resize, encode"""
+    img = Image.fromarray(cv2.cvtColor(frame_array, cv2.COLOR_BGR2RGB))
+    if privacy:
+        img = img.filter(ImageFilter.GaussianBlur(radius=20))
+    if img.size != tuple(resolution):
+        img = img.resize(tuple(resolution))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def encode_shared(frame_ref, privacy, resolution):
+    return encode_frame(attach(frame_ref), privacy, resolution)
+
+
+def plan_shared(map_ref, key, start, end):
+    """
+    Route on a saved map published as UTF-8 JSON in shared memory. The
+    hierarchy is built once per map key and reused for later queries.
+    Returns the path in request coordinates; bad cells raise ValueError.
+    """
+    planner = _planners.get(key)
+    if planner is None:
+        planner = HierarchicalMap.from_map(json.loads(attach(map_ref).tobytes()))
+        _planners[key] = planner
+        while len(_planners) > MAX_PLANNERS:
+            _planners.popitem(last=False)
+    else:
+        _planners.move_to_end(key)
+    return planner.export(planner.find_path(planner.cell(start), planner.cell(end)))